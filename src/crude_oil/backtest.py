@@ -0,0 +1,305 @@
+"""Backtest module.
+
+This module provides the Backtester class, a walk-forward (expanding window)
+evaluation of a regression model over a time-ordered dataset. Fold *k* trains
+on every row before its cut-off and tests on the following ``step`` rows, so
+no fold ever sees the future.
+
+For LinearRegression the folds are not refitted from scratch: the running
+sums of X, y, X^T X and X^T y (LinearSufficientStats) are accumulated once
+and every fold's coefficients are solved from them in one batched call.
+Any other scikit-learn estimator is refitted per fold on a process pool.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Final, Optional
+
+import numpy as np
+import pandas as pd
+
+from logger import Logger
+from metrics import INSTRUMENTATION
+
+
+class LinearSufficientStats:
+    """Cumulative sufficient statistics of an ordinary least-squares fit.
+
+    The statistics are kept on data shifted by a fixed reference point, which
+    leaves the fitted slopes unchanged but keeps the cross products small
+    enough that subtracting them does not lose precision.
+
+    With a *forgetting* factor below 1 every update first decays the existing
+    statistics, so a row that is *k* rows old weighs ``forgetting ** k``; the
+    fit then equals a weighted least-squares refit with those weights.
+    """
+
+    ARRAYS: Final[tuple[str, ...]] = ("shift_x", "shift_y", "n", "sum_x", "sum_y", "xtx", "xty", "forgetting")
+
+    def __init__(
+        self,
+        n_features: int,
+        shift_x: Optional[np.ndarray] = None,
+        shift_y: float = 0.0,
+        forgetting: float = 1.0,
+    ) -> None:
+        if not 0.0 < forgetting <= 1.0:
+            raise ValueError(f"forgetting must be in (0, 1], got {forgetting}")
+        self.shift_x: np.ndarray = np.zeros(n_features) if shift_x is None else np.asarray(shift_x, dtype=float)
+        self.shift_y: float = float(shift_y)
+        self.forgetting: float = float(forgetting)
+        self.n: float = 0.0
+        self.sum_x: np.ndarray = np.zeros(n_features)
+        self.sum_y: float = 0.0
+        self.xtx: np.ndarray = np.zeros((n_features, n_features))
+        self.xty: np.ndarray = np.zeros(n_features)
+
+    def update(self, X: np.ndarray, y: np.ndarray) -> None:
+        """Add the rows of *X* and *y* (oldest first) to the statistics."""
+        Xs: np.ndarray = np.asarray(X, dtype=float) - self.shift_x
+        ys: np.ndarray = np.asarray(y, dtype=float) - self.shift_y
+        weights: np.ndarray = self.weights(len(Xs))
+        decay: float = self.forgetting ** len(Xs)
+        self.n = self.n * decay + float(weights.sum())
+        self.sum_x = self.sum_x * decay + weights @ Xs
+        self.sum_y = self.sum_y * decay + float(weights @ ys)
+        self.xtx = self.xtx * decay + (Xs * weights[:, None]).T @ Xs
+        self.xty = self.xty * decay + (Xs * weights[:, None]).T @ ys
+
+    def weights(self, n_rows: int) -> np.ndarray:
+        """Weight of each of the last *n_rows* rows (oldest first) once all are added."""
+        return self.forgetting ** np.arange(n_rows - 1, -1, -1, dtype=float)
+
+    def solve(self) -> tuple[np.ndarray, float]:
+        """Return the (coefficients, intercept) of the least-squares fit."""
+        coef, intercept = self.solve_batch(
+            np.array([self.n]), self.sum_x[None], np.array([self.sum_y]), self.xtx[None], self.xty[None],
+            self.shift_x, self.shift_y,
+        )
+        return coef[0], float(intercept[0])
+
+    def save(self, path: str, metadata: Optional[dict] = None) -> None:
+        """Write the statistics (and JSON-serialisable *metadata*) to an ``.npz`` file."""
+        tmp_path: str = f"{path}.tmp"
+        with open(tmp_path, "wb") as handle:
+            np.savez(
+                handle,
+                metadata=np.array(json.dumps(metadata or {})),
+                **{name: np.asarray(getattr(self, name)) for name in self.ARRAYS},
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> tuple[LinearSufficientStats, dict]:
+        """Read statistics written by :meth:`save`; return them with their metadata."""
+        with np.load(path) as arrays:
+            stats: LinearSufficientStats = cls(
+                len(arrays["shift_x"]), arrays["shift_x"], float(arrays["shift_y"]), float(arrays["forgetting"])
+            )
+            stats.n = float(arrays["n"])
+            stats.sum_x = arrays["sum_x"].copy()
+            stats.sum_y = float(arrays["sum_y"])
+            stats.xtx = arrays["xtx"].copy()
+            stats.xty = arrays["xty"].copy()
+            metadata: dict = json.loads(str(arrays["metadata"]))
+        return stats, metadata
+
+    @staticmethod
+    def solve_batch(
+        n: np.ndarray,
+        sum_x: np.ndarray,
+        sum_y: np.ndarray,
+        xtx: np.ndarray,
+        xty: np.ndarray,
+        shift_x: np.ndarray,
+        shift_y: float,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Solve many fits at once from stacked statistics (one per leading index)."""
+        mean_x: np.ndarray = sum_x / n[:, None]
+        mean_y: np.ndarray = sum_y / n
+        # Centre the normal equations, as LinearRegression does
+        gram: np.ndarray = xtx - n[:, None, None] * mean_x[:, :, None] * mean_x[:, None, :]
+        cross: np.ndarray = xty - n[:, None] * mean_x * mean_y[:, None]
+        # Pseudo-inverse rather than solve: collinear features (close and its
+        # moving average) must give the minimum-norm answer, not an error
+        coef: np.ndarray = np.einsum("fij,fj->fi", np.linalg.pinv(gram, hermitian=True), cross)
+        # Undo the shift: y = shift_y + mean_y + (x - shift_x - mean_x) . coef
+        intercept: np.ndarray = shift_y + mean_y - np.einsum("fi,fi->f", mean_x + shift_x, coef)
+        return coef, intercept
+
+
+# Worker-side copies of the dataset, set once per process by the pool initialiser
+_WORKER_X: Optional[np.ndarray] = None
+_WORKER_Y: Optional[np.ndarray] = None
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, log_queue: Any, log_settings: dict[str, Any]) -> None:
+    global _WORKER_X, _WORKER_Y
+    _WORKER_X, _WORKER_Y = X, y
+    Logger.configure_worker(log_queue, log_settings)
+
+
+def _fit_fold(estimator: Any, train_end: int, test_end: int) -> np.ndarray:
+    """Refit *estimator* on rows [0, train_end) and predict rows [train_end, test_end)."""
+    from sklearn.base import clone
+
+    model: Any = clone(estimator)
+    model.fit(_WORKER_X[:train_end], _WORKER_Y[:train_end])
+    return model.predict(_WORKER_X[train_end:test_end])
+
+
+class Backtester:
+    CLASS_NAME: Final[str] = "Backtester"
+
+    RESULTS_FOLDER_PATH: Final[str] = "src/crude_oil/static/backtests"
+    RESULTS_FILE_PATH: Final[str] = os.path.join(RESULTS_FOLDER_PATH, "backtest_results.csv")
+    DATE_COLUMN: Final[str] = "date"
+
+    # Defaults: one year of history before the first fold, then refit every week
+    MIN_TRAIN: Final[int] = 250
+    STEP: Final[int] = 5
+
+    def __init__(
+        self,
+        logger: Logger,
+        min_train: int = MIN_TRAIN,
+        step: int = STEP,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self.logger: Logger = logger
+        self.min_train: int = min_train
+        self.step: int = step
+        self.max_workers: Optional[int] = max_workers
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        features: list[str],
+        target: str,
+        estimator: Optional[Any] = None,
+        save: bool = True,
+    ) -> pd.DataFrame:
+        """Walk forward over *df* and return one row of metrics per fold.
+
+        Without an *estimator* (or with a plain LinearRegression) the folds are
+        solved from cumulative sufficient statistics; any other estimator is
+        refitted per fold on a process pool.
+        """
+        if self.DATE_COLUMN in df.columns:
+            df = df.sort_values(self.DATE_COLUMN, kind="stable").reset_index(drop=True)
+        df = df.dropna(subset=[*features, target])
+        X: np.ndarray = df[features].to_numpy(dtype=float)
+        y: np.ndarray = df[target].to_numpy(dtype=float)
+
+        cuts: np.ndarray = self.fold_cuts(len(df))
+        if cuts.size == 0:
+            self.logger.warning(
+                self.CLASS_NAME, "run", f"Not enough rows ({len(df)}) for min_train={self.min_train}."
+            )
+            return pd.DataFrame()
+
+        try:
+            if estimator is None or self._is_plain_linear(estimator):
+                predictions: list[np.ndarray] = self._predict_linear(X, y, cuts)
+                method: str = "sufficient_stats"
+            else:
+                predictions = self._predict_refit(X, y, cuts, estimator)
+                method = "refit"
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "run", f"Backtest failed: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}.run: {error}")
+            return pd.DataFrame()
+
+        results: pd.DataFrame = self._fold_metrics(df, y, cuts, predictions)
+        self.logger.info(
+            self.CLASS_NAME,
+            "run",
+            f"{len(results)} folds ({method}) → mean RMSE={results['rmse'].mean():.4f}, "
+            f"mean MAE={results['mae'].mean():.4f}",
+        )
+        if save:
+            self._save_results(results)
+        return results
+
+    def fold_cuts(self, n_rows: int) -> np.ndarray:
+        """Row index where each fold's test block starts."""
+        return np.arange(self.min_train, n_rows, self.step)
+
+    # ------------------------------------------------------------------
+    # Fold evaluation
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _is_plain_linear(estimator: Any) -> bool:
+        from sklearn.linear_model import LinearRegression
+
+        return type(estimator) is LinearRegression and estimator.fit_intercept and not estimator.positive
+
+    def _predict_linear(self, X: np.ndarray, y: np.ndarray, cuts: np.ndarray) -> list[np.ndarray]:
+        """Solve every fold from prefix sums of the sufficient statistics."""
+        shift_x: np.ndarray = X[: self.min_train].mean(axis=0)
+        shift_y: float = float(y[: self.min_train].mean())
+        # Rows after the last cut-off are only ever tested on, never trained on
+        Xs: np.ndarray = X[: cuts[-1]] - shift_x
+        ys: np.ndarray = y[: cuts[-1]] - shift_y
+
+        # Per-block sums between consecutive cut-offs, then prefix sums over blocks
+        starts: np.ndarray = np.concatenate([[0], cuts[:-1]])
+        n: np.ndarray = cuts.astype(float)
+        sum_x: np.ndarray = np.cumsum(np.add.reduceat(Xs, starts, axis=0), axis=0)
+        sum_y: np.ndarray = np.cumsum(np.add.reduceat(ys, starts))
+        outer: np.ndarray = Xs[:, :, None] * Xs[:, None, :]
+        xtx: np.ndarray = np.cumsum(np.add.reduceat(outer, starts, axis=0), axis=0)
+        xty: np.ndarray = np.cumsum(np.add.reduceat(Xs * ys[:, None], starts, axis=0), axis=0)
+
+        coef, intercept = LinearSufficientStats.solve_batch(n, sum_x, sum_y, xtx, xty, shift_x, shift_y)
+        return [X[cut : cut + self.step] @ coef[fold] + intercept[fold] for fold, cut in enumerate(cuts)]
+
+    def _predict_refit(
+        self, X: np.ndarray, y: np.ndarray, cuts: np.ndarray, estimator: Any
+    ) -> list[np.ndarray]:
+        """Refit a clone of *estimator* for every fold on a process pool."""
+        # Imported before forking, so no worker inherits a lock held by another thread's import
+        import sklearn.base  # noqa: F401
+
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers, initializer=_init_worker, initargs=(X, y, *Logger.worker_initargs())
+        ) as pool:
+            futures = [
+                pool.submit(_fit_fold, estimator, int(cut), int(min(cut + self.step, len(X))))
+                for cut in cuts
+            ]
+            return [future.result() for future in futures]
+
+    def _fold_metrics(
+        self, df: pd.DataFrame, y: np.ndarray, cuts: np.ndarray, predictions: list[np.ndarray]
+    ) -> pd.DataFrame:
+        dates: Optional[pd.Series] = df[self.DATE_COLUMN].reset_index(drop=True) if self.DATE_COLUMN in df.columns else None
+        rows: list[dict] = []
+        for fold, (cut, y_pred) in enumerate(zip(cuts, predictions)):
+            y_true: np.ndarray = y[cut : cut + len(y_pred)]
+            errors: np.ndarray = y_pred - y_true
+            row: dict = {
+                "fold": fold,
+                "n_train": int(cut),
+                "n_test": len(y_true),
+                "rmse": float(np.sqrt(np.mean(errors**2))),
+                "mae": float(np.mean(np.abs(errors))),
+            }
+            if dates is not None:
+                row["train_end"] = dates[cut - 1]
+                row["test_start"] = dates[cut]
+                row["test_end"] = dates[cut + len(y_true) - 1]
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def _save_results(self, results: pd.DataFrame) -> None:
+        try:
+            os.makedirs(self.RESULTS_FOLDER_PATH, exist_ok=True)
+            results.to_csv(self.RESULTS_FILE_PATH, index=False)
+            self.logger.info(self.CLASS_NAME, "_save_results", f"Fold metrics saved at {self.RESULTS_FILE_PATH}")
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "_save_results", f"Error saving fold metrics: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._save_results: {error}")
@@ -0,0 +1,58 @@
+"""Bars module.
+
+Helpers for bar frequencies: the length of a bar given its pandas frequency
+alias ("min", "30min", "h", "D", "B") and the aggregation of OHLCV bars into
+coarser ones (minute bars into hourly or daily bars, for example). Bins are
+labelled by their start and empty bins (nights, weekends) are dropped, so
+daily bars aggregated from intraday ones are dated at midnight like the daily
+bars collected from Yahoo Finance.
+"""
+
+from __future__ import annotations
+
+from typing import Final, Optional
+
+import pandas as pd
+
+
+# How each raw column combines when bars are merged
+OHLCV_AGGREGATION: Final[dict[str, str]] = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "adj_close": "last",
+    "volume": "sum",
+}
+DAY: Final[pd.Timedelta] = pd.Timedelta(days=1)
+
+
+def bar_length(freq: str) -> pd.Timedelta:
+    """Nominal length of one bar of *freq* (a business day counts as one day)."""
+    if freq.upper() == "B":
+        return DAY
+    return pd.Timedelta(pd.tseries.frequencies.to_offset(freq).nanos)
+
+
+def is_intraday(freq: Optional[str]) -> bool:
+    return freq is not None and bar_length(freq) < DAY
+
+
+def resample_ohlcv(df: pd.DataFrame, freq: str, date_column: str = "date") -> pd.DataFrame:
+    """Aggregate the bars of *df* (one symbol, date-sorted) into bars of *freq*."""
+    if df.empty:
+        return df
+    rule: str = "D" if freq.upper() == "B" else freq
+    aggregation: dict[str, str] = {column: how for column, how in OHLCV_AGGREGATION.items() if column in df.columns}
+    bars: pd.DataFrame = (
+        df.resample(rule, on=date_column, label="left", closed="left")
+        .agg(aggregation)
+        .dropna(subset=["close"])
+        .reset_index()
+    )
+    if "volume" in bars.columns:
+        bars["volume"] = bars["volume"].astype(df["volume"].dtype)
+    if "symbol" in df.columns:
+        bars.insert(0, "symbol", df["symbol"].iloc[0])
+        bars["symbol"] = bars["symbol"].astype(df["symbol"].dtype)
+    return bars[[column for column in df.columns if column in bars.columns]]
@@ -0,0 +1,815 @@
+"""Benchmark module.
+
+Offline micro-benchmarks for the pipeline's hot paths. Every benchmark
+builds its own fixtures, so no network access is needed. Run from the
+repository root, for example::
+
+    python src/crude_oil/benchmark.py parser --sizes 1000 10000 50000
+    python src/crude_oil/benchmark.py serving --batch-sizes 1 100 10000
+    python src/crude_oil/benchmark.py backtest --rows 2000 20000
+    python src/crude_oil/benchmark.py scheduler --workers 1 2 4
+    python src/crude_oil/benchmark.py enrich --workers 1 2 4 --symbols 50
+    python src/crude_oil/benchmark.py artifact
+    python src/crude_oil/benchmark.py render --charts 2 8 32 --rows 1000 100000
+    python src/crude_oil/benchmark.py kpi --rows 10000 1000000
+    python src/crude_oil/benchmark.py validate --rows 100000 1000000 --symbols 100
+    python src/crude_oil/benchmark.py startup
+    python src/crude_oil/benchmark.py suite --rows 1000 1000000 --symbols 1 100 --freq min
+
+The ``suite`` benchmark runs each pipeline stage (and the whole pipeline)
+on synthetic OHLCV data in a scratch workspace, one process per stage so
+peak memory is per stage, appends the timings to a results file and
+compares them with a stored baseline; it exits non-zero on regressions.
+``--save-baseline`` records the current numbers as the new baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from backtest import Backtester
+from collector import Collector
+from dashboard import Dashboard
+from enricher import Enricher
+from kpi import KpiEngine
+from logger import Logger
+from main import CrudeOilDataPipeline
+from metrics import INSTRUMENTATION
+from modeller import Modeller
+from registry import ModelRegistry
+from render import ChartSpec, RenderEngine
+from scheduler import TrainingScheduler
+from schema import RAW_SCHEMA
+from store import PartitionedStore
+from serving import ModelCache, ModelServer
+from synthetic import OHLCVGenerator
+from validation import DataValidator
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+HISTORY_HEADERS: list[str] = [
+    "Date",
+    "Open",
+    "High",
+    "Low.",
+    "CloseClose price adjusted for splits.",
+    "Adj CloseAdjusted close price adjusted for splits and dividend and/or capital gain distributions.",
+    "Volume",
+]
+
+# Pipeline stages of the suite benchmark and the stages each one needs first
+SUITE_STAGES: dict[str, tuple[str, ...]] = {
+    "store": (),
+    "enrich": ("store",),
+    "train": ("enrich",),
+    "dashboard": ("train",),
+    "pipeline": (),
+}
+SUITE_RESULTS_PATH: str = "src/crude_oil/static/benchmarks/results.jsonl"
+SUITE_BASELINE_PATH: str = "src/crude_oil/static/benchmarks/baseline.jsonl"
+# Rows generated and upserted at a time by the store stage
+SUITE_CHUNK_ROWS: int = 1_000_000
+# Time differences below this are noise, whatever the tolerance
+SUITE_MIN_SECONDS: float = 0.25
+# Libraries the phases import on first use; the suite loads them before timing
+# so it measures stage work (the startup benchmark measures imports)
+SUITE_WARM_IMPORTS: tuple[str, ...] = ("scipy.signal", "matplotlib.figure", "matplotlib.backends.backend_agg")
+
+# What main.py imported before any stage ran, before imports became lazy
+STARTUP_EAGER_MODULES: tuple[str, ...] = (
+    "collector", "enricher", "modeller", "dashboard", "bs4", "joblib", "scipy.signal",
+    "sklearn.linear_model", "sklearn.metrics", "sklearn.model_selection",
+    "matplotlib.figure", "matplotlib.backends.backend_agg",
+)
+STARTUP_HEAVY_PACKAGES: tuple[str, ...] = ("requests", "bs4", "joblib", "scipy", "sklearn", "matplotlib")
+# Runs in a fresh interpreter: import the CLI and one subcommand's modules
+STARTUP_PROBE: str = """
+import importlib, json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {path!r})
+import cli
+for module in {modules!r}:
+    importlib.import_module(module)
+print(json.dumps({{
+    "import_seconds": time.perf_counter() - start,
+    "modules": len(sys.modules),
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+# ----------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------
+def best_of(function: Callable[[], object], repeat: int) -> float:
+    """Return the fastest wall time of *repeat* calls to *function*, in seconds."""
+    timings: list[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def write_results(results: list[dict], output: Optional[str]) -> None:
+    """Print *results* as a table and optionally append them as JSON lines."""
+    print(pd.DataFrame(results).to_string(index=False))
+    if output:
+        with open(output, "a", encoding="utf-8") as handle:
+            for result in results:
+                handle.write(json.dumps(result) + "\n")
+
+
+def read_results(path: str) -> list[dict]:
+    """Results previously written as JSON lines to *path* (none if it does not exist)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Resident-set high-water mark of this process and its finished children, in MiB."""
+    if resource is None:
+        return None
+    peak: int = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return round(peak / 1024, 1)
+
+
+# ----------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------
+def history_page(rows: int, seed: int = 0) -> str:
+    """Return a Yahoo-like history page with *rows* daily bars (plus dividend rows)."""
+    rng: np.random.Generator = np.random.default_rng(seed)
+    dates: pd.DatetimeIndex = pd.bdate_range(end="2025-05-23", periods=rows)[::-1]
+    close: np.ndarray = 70 + np.cumsum(rng.normal(0, 1, rows))
+    head: str = "".join(f"<th><span>{header}</span></th>" for header in HISTORY_HEADERS)
+    body: list[str] = []
+    for index, (date, price) in enumerate(zip(dates, close)):
+        volume: int = int(rng.integers(100_000, 900_000))
+        cells: list[str] = [
+            date.strftime("%b %-d, %Y"),
+            f"{price + 0.3:.2f}",
+            f"{price + 1.1:.2f}",
+            f"{price - 1.2:.2f}",
+            f"{price:.2f}",
+            f"{price:.2f}",
+            f"{volume:,}",
+        ]
+        body.append("<tr>" + "".join(f"<td><span>{cell}</span></td>" for cell in cells) + "</tr>")
+        if index % 250 == 0:
+            body.append('<tr><td>Sep 1, 2024</td><td colspan="6">0.25 Dividend</td></tr>')
+    return (
+        "<html><head><title>History</title></head><body>"
+        "<div><nav>menu</nav></div>"
+        f'<div data-testid="history-table"><table><thead><tr>{head}</tr></thead>'
+        f"<tbody>{''.join(body)}</tbody></table></div>"
+        "</body></html>"
+    )
+
+
+class OfflinePipeline(CrudeOilDataPipeline):
+    """Pipeline on workspace-relative folders whose collector returns a prepared frame."""
+
+    DATA_DIR: Path = Path(Enricher.RAW_STORE_PATH).parent
+    RAW_STORE_DIR: Path = Path(Enricher.RAW_STORE_PATH)
+    LEGACY_RAW_PATH: Path = DATA_DIR / "crude_oil.csv"
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        super().__init__()
+        self.collector.symbols = [str(symbol) for symbol in frame["symbol"].unique()]
+        self.collector.get_crude_oil_data = lambda watermarks: frame
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+def bench_parser(sizes: list[int], repeat: int, fixtures_dir: Optional[str]) -> list[dict]:
+    """Compare the lxml and BeautifulSoup history-table parsers on saved pages."""
+    collector: Collector = Collector.__new__(Collector)
+    collector.logger = Logger()
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        folder: str = fixtures_dir or tmp_dir
+        os.makedirs(folder, exist_ok=True)
+        for size in sizes:
+            path: str = os.path.join(folder, f"history_{size}.html")
+            if not os.path.exists(path):
+                with open(path, "w", encoding="utf-8") as handle:
+                    handle.write(history_page(size))
+            with open(path, encoding="utf-8") as handle:
+                html: str = handle.read()
+
+            frames: dict[str, pd.DataFrame] = {}
+            for engine in Collector.PARSER_ENGINES:
+                frames[engine] = collector._parse_history(html, engine=engine)
+                seconds: float = best_of(lambda: collector._parse_history(html, engine=engine), repeat)
+                results.append({
+                    "benchmark": "parser",
+                    "engine": engine,
+                    "rows": size,
+                    "page_kib": round(len(html) / 1024, 1),
+                    "seconds": round(seconds, 5),
+                    "rows_per_second": round(size / seconds),
+                })
+            pd.testing.assert_frame_equal(frames["lxml"], frames["bs4"])
+    return results
+
+
+def bench_serving(batch_sizes: list[int], calls: int, repeat: int) -> list[dict]:
+    """Compare cold predictions (model unpickled per call) with cached warm ones."""
+    features: list[str] = Modeller.FEATURES
+    rng: np.random.Generator = np.random.default_rng(0)
+    X_train: pd.DataFrame = pd.DataFrame(rng.normal(size=(1_000, len(features))), columns=features)
+    model: LinearRegression = LinearRegression().fit(X_train, rng.normal(size=1_000))
+
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path: str = os.path.join(tmp_dir, "model.pkl")
+        joblib.dump(model, path)
+        server: ModelServer = ModelServer(ModelCache(path, logger=Logger()), features, logger=Logger())
+
+        modes: dict[str, Callable[[pd.DataFrame], np.ndarray]] = {
+            "cold": lambda X: joblib.load(path).predict(X[features]),
+            "warm": server.predict_batch,
+        }
+        for size in batch_sizes:
+            X: pd.DataFrame = pd.DataFrame(rng.normal(size=(size, len(features))), columns=features)
+            np.testing.assert_allclose(modes["cold"](X), modes["warm"](X))
+            for mode, predict in modes.items():
+                seconds: float = best_of(lambda: [predict(X) for _ in range(calls)], repeat) / calls
+                results.append({
+                    "benchmark": "serving",
+                    "mode": mode,
+                    "batch": size,
+                    "latency_ms": round(seconds * 1_000, 4),
+                    "rows_per_second": round(size / seconds),
+                })
+    return results
+
+
+def bench_backtest(sizes: list[int], step: int, workers: Optional[int]) -> list[dict]:
+    """Compare walk-forward folds solved from sufficient statistics with per-fold refits."""
+    features: list[str] = Modeller.FEATURES
+    rng: np.random.Generator = np.random.default_rng(0)
+    results: list[dict] = []
+    for size in sizes:
+        X: np.ndarray = rng.normal(size=(size, len(features)))
+        y: np.ndarray = X @ rng.normal(size=len(features)) + rng.normal(size=size)
+        backtester: Backtester = Backtester(Logger(), step=step, max_workers=workers)
+        cuts: np.ndarray = backtester.fold_cuts(size)
+
+        start: float = time.perf_counter()
+        fast: list[np.ndarray] = backtester._predict_linear(X, y, cuts)
+        timings: dict[str, float] = {"sufficient_stats": time.perf_counter() - start}
+        start = time.perf_counter()
+        refit: list[np.ndarray] = backtester._predict_refit(X, y, cuts, LinearRegression())
+        timings["process_pool_refit"] = time.perf_counter() - start
+        np.testing.assert_allclose(np.concatenate(fast), np.concatenate(refit), rtol=1e-9, atol=1e-9)
+
+        for method, seconds in timings.items():
+            results.append({
+                "benchmark": "backtest",
+                "method": method,
+                "rows": size,
+                "folds": len(cuts),
+                "seconds": round(seconds, 4),
+                "folds_per_second": round(len(cuts) / seconds),
+            })
+    return results
+
+
+def bench_scheduler(workers: list[int], symbols: int, rows: int) -> list[dict]:
+    """Wall time of the full training grid for several process pool sizes."""
+    logger: Logger = Logger()
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_store: PartitionedStore = PartitionedStore(
+            os.path.join(tmp_dir, "raw"), "crude_oil", logger, schema=RAW_SCHEMA
+        )
+        generator: OHLCVGenerator = OHLCVGenerator()
+        for number in range(symbols):
+            raw_store.upsert(generator.history(f"SYM{number}", rows, index=number))
+
+        for count in workers:
+            registry: ModelRegistry = ModelRegistry(logger, root=os.path.join(tmp_dir, f"registry_{count}"))
+            scheduler: TrainingScheduler = TrainingScheduler(
+                logger, max_workers=count, registry=registry, raw_store=raw_store
+            )
+            start: float = time.perf_counter()
+            trained: pd.DataFrame = scheduler.run()
+            seconds: float = time.perf_counter() - start
+            results.append({
+                "benchmark": "scheduler",
+                "workers": count,
+                "jobs": len(trained),
+                "seconds": round(seconds, 3),
+                "cpu_seconds": round(float(trained["seconds"].sum()), 3),
+                "speedup": round(results[0]["seconds"] / seconds, 2) if results else 1.0,
+            })
+    return results
+
+
+def bench_enrich(workers: list[int], symbols: int, rows: int) -> list[dict]:
+    """Full enrichment of a multi-symbol store: in-process loop versus per-symbol shards per pool size."""
+    results: list[dict] = []
+    cwd: str = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The Enricher's store paths are relative to the repository root
+        os.chdir(tmp_dir)
+        try:
+            logger: Logger = Logger()
+            raw_store: PartitionedStore = PartitionedStore(
+                Enricher.RAW_STORE_PATH, "crude_oil", logger, schema=RAW_SCHEMA
+            )
+            generator: OHLCVGenerator = OHLCVGenerator()
+            names: list[str] = generator.symbols(symbols)
+            for chunk in generator.chunks(names, rows):
+                raw_store.upsert(chunk)
+
+            start: float = time.perf_counter()
+            for symbol in names:
+                Enricher(logger, symbol=symbol).enrich(full=True)
+            serial: float = time.perf_counter() - start
+            results.append({"benchmark": "enrich", "mode": "loop", "workers": 1, "symbols": symbols,
+                            "seconds": round(serial, 3), "rows_per_second": round(symbols * rows / serial),
+                            "speedup": 1.0})
+            for count in workers:
+                start = time.perf_counter()
+                summary: pd.DataFrame = Enricher(logger).enrich_symbols(names, full=True, max_workers=count)
+                seconds: float = time.perf_counter() - start
+                if not summary["ok"].all():
+                    raise RuntimeError(f"Shards failed: {summary.loc[~summary['ok'], 'symbol'].tolist()}")
+                results.append({"benchmark": "enrich", "mode": "shards", "workers": count, "symbols": symbols,
+                                "seconds": round(seconds, 3), "rows_per_second": round(symbols * rows / seconds),
+                                "speedup": round(serial / seconds, 2)})
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def bench_startup(repeat: int) -> list[dict]:
+    """Cold start of every CLI subcommand versus the former eager imports, in fresh interpreters."""
+    from cli import COMMAND_MODULES
+
+    package_dir: str = os.path.dirname(os.path.abspath(__file__))
+    plans: dict[str, tuple[str, ...]] = {**COMMAND_MODULES, "eager": STARTUP_EAGER_MODULES}
+    results: list[dict] = []
+    for command, modules in plans.items():
+        code: str = STARTUP_PROBE.format(path=package_dir, modules=modules, heavy=STARTUP_HEAVY_PACKAGES)
+        runs: list[tuple[float, dict]] = []
+        for _ in range(repeat):
+            start: float = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+            runs.append((time.perf_counter() - start, json.loads(completed.stdout.splitlines()[-1])))
+        wall, probe = min(runs, key=lambda run: run[0])
+        results.append({
+            "benchmark": "startup",
+            "command": command,
+            "process_seconds": round(wall, 3),
+            "import_seconds": round(min(run[1]["import_seconds"] for run in runs), 3),
+            "modules": probe["modules"],
+            "heavy_imports": ",".join(probe["heavy"]) or "-",
+        })
+    eager: float = results[-1]["process_seconds"]
+    for result in results:
+        result["speedup"] = round(eager / result["process_seconds"], 2)
+    return results
+
+
+def bench_artifact(repeat: int) -> list[dict]:
+    """Load cost of a pickled LinearRegression versus the registry's compact artifact.
+
+    ``load_ms`` is measured in-process; ``startup_ms`` is a fresh interpreter
+    that imports what it needs, loads the model and predicts one row.
+    """
+    features: list[str] = Modeller.FEATURES
+    rng: np.random.Generator = np.random.default_rng(0)
+    X: pd.DataFrame = pd.DataFrame(rng.normal(size=(1_000, len(features))), columns=features)
+    model: LinearRegression = LinearRegression().fit(X, rng.normal(size=1_000))
+
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path: str = os.path.join(tmp_dir, "model.pkl")
+        joblib.dump(model, pickle_path)
+        registry: ModelRegistry = ModelRegistry(Logger(), root=os.path.join(tmp_dir, "registry"))
+        registry.save(Modeller.MODEL_KEY, model, {"features": features})
+        np.testing.assert_allclose(registry.load(Modeller.MODEL_KEY).predict(X), model.predict(X))
+
+        row: str = repr([0.0] * len(features))
+        source_dir: str = os.path.dirname(os.path.abspath(__file__))
+        scripts: dict[str, tuple[Callable[[], object], str]] = {
+            "pickle": (
+                lambda: joblib.load(pickle_path),
+                f"import joblib; joblib.load({pickle_path!r}).predict([{row}])",
+            ),
+            "compact": (
+                lambda: registry.load(Modeller.MODEL_KEY),
+                f"import sys; sys.path.insert(0, {source_dir!r}); from logger import Logger; "
+                "from registry import ModelRegistry; "
+                f"ModelRegistry(Logger(), root={registry.root!r}).load({Modeller.MODEL_KEY!r}).predict([{row}])",
+            ),
+        }
+        for artifact, (load, script) in scripts.items():
+            command: list[str] = [sys.executable, "-c", script]
+            startup: float = best_of(
+                lambda: subprocess.run(command, check=True, cwd=tmp_dir, capture_output=True), repeat
+            )
+            results.append({
+                "benchmark": "artifact",
+                "artifact": artifact,
+                "load_ms": round(best_of(load, max(repeat, 20)) * 1_000, 3),
+                "startup_ms": round(startup * 1_000, 1),
+            })
+    return results
+
+
+def bench_render(charts: list[int], sizes: list[int], workers: Optional[int]) -> list[dict]:
+    """Render time versus number of charts and rows: cold, unchanged (skipped) and one chart changed."""
+    results: list[dict] = []
+    for size in sizes:
+        history: pd.DataFrame = OHLCVGenerator(freq="h").history("SYM", size)
+        for count in charts:
+            specs: list[ChartSpec] = [
+                ChartSpec(
+                    name=f"chart_{number}",
+                    title=f"Chart {number}",
+                    data=history.assign(close=history["close"] * (1 + number / 100)),
+                    series=(("close", "Close", None),),
+                    ylabel="Price",
+                )
+                for number in range(count)
+            ]
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                engine: RenderEngine = RenderEngine(tmp_dir, Logger(), max_workers=workers)
+                timings: dict[str, float] = {}
+                start: float = time.perf_counter()
+                engine.render(specs)
+                timings["cold_s"] = time.perf_counter() - start
+                start = time.perf_counter()
+                engine.render(specs)
+                timings["unchanged_s"] = time.perf_counter() - start
+                specs[0].data = specs[0].data.assign(close=specs[0].data["close"] + 1)
+                start = time.perf_counter()
+                engine.render(specs)
+                timings["one_changed_s"] = time.perf_counter() - start
+            results.append({
+                "benchmark": "render",
+                "charts": count,
+                "rows": size,
+                **{name: round(seconds, 3) for name, seconds in timings.items()},
+            })
+    return results
+
+
+def bench_kpi(sizes: list[int], repeat: int) -> list[dict]:
+    """Cost of one new bar: full-history pandas rescan versus the running KPI state."""
+    appends: int = 100
+    results: list[dict] = []
+    for size in sizes:
+        history: pd.DataFrame = OHLCVGenerator(freq="min").history("SYM", size + appends)
+        engine: KpiEngine = KpiEngine(Logger(), path=None)
+        engine.update(history.iloc[:size])
+
+        def rescan() -> dict[str, float]:
+            close: pd.Series = history["close"]
+            sessions: np.ndarray = history["date"].dt.normalize().unique()
+            return {
+                "tasa_variacion": (close.iloc[-1] - close.iloc[-2]) / close.iloc[-2] * 100,
+                "media_movil": close[history["date"].dt.normalize() >= sessions[-7]].mean(),
+                "volatilidad": close[history["date"].dt.normalize() >= sessions[-7]].std(),
+                "retorno_acumulado": (close.iloc[-1] / close.iloc[0] - 1) * 100,
+                "desviacion_estandar": close.std(),
+            }
+
+        # Mean of single-bar appends, so buffer doublings are amortised as in production
+        start: float = time.perf_counter()
+        for row in range(size, size + appends):
+            engine.update(history.iloc[row:row + 1])
+        append_s: float = (time.perf_counter() - start) / appends
+        results.append({
+            "benchmark": "kpi",
+            "rows": size,
+            "rescan_s": best_of(rescan, repeat),
+            "append_s": append_s,
+            "query_s": best_of(lambda: engine.kpis("SYM"), repeat),
+            "windows_s": best_of(lambda: engine.window_table(), repeat),
+            "max_rel_diff": max(
+                abs(engine.kpis("SYM")[name] / value - 1) for name, value in rescan().items() if value
+            ),
+        })
+    return results
+
+
+def bench_validate(sizes: list[int], symbols: int, repeat: int) -> list[dict]:
+    """Full validation of a batch with injected faults, and of a small batch on top of stored context."""
+    batch: int = 20
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as workspace:
+        validator: DataValidator = DataValidator(Logger(), quarantine_path=os.path.join(workspace, "quarantine.csv"))
+        for size in sizes:
+            frame: pd.DataFrame = OHLCVGenerator().frame(symbols, max(size // symbols, batch + 1))
+            # One bad tick and one inconsistent bar in every 10,000 rows
+            faults: np.ndarray = np.arange(5_050, len(frame) - 1, 10_000)
+            frame.loc[faults, ["open", "high", "low", "close"]] *= 10
+            frame.loc[faults + 1, "high"] = frame.loc[faults + 1, "low"] * 0.9
+
+            counts: dict[str, int] = validator.validate(frame).counts
+            full_s: float = best_of(lambda: validator.validate(frame), repeat)
+            tail: pd.DataFrame = frame.groupby("symbol", observed=True).tail(batch)
+            # The stored bars the pipeline would load as context
+            context: pd.DataFrame = frame.drop(tail.index)[["symbol", "date", "close"]]
+            context = context[context["date"] >= tail["date"].min() - validator.CONTEXT_SPAN]
+            results.append({
+                "benchmark": "validate",
+                "rows": len(frame),
+                "symbols": symbols,
+                "injected": 2 * len(faults),
+                **{f"{check}_rows": count for check, count in counts.items()},
+                "full_s": full_s,
+                "ms_per_million_rows": full_s * 1e9 / len(frame),
+                "incremental_rows": len(tail),
+                "incremental_s": best_of(lambda: validator.validate(tail, context), repeat),
+            })
+    return results
+
+
+def bench_suite(
+    sizes: list[int],
+    symbol_counts: list[int],
+    freqs: list[str],
+    stages: list[str],
+    seed: int,
+) -> list[dict]:
+    """Time and peak memory of each pipeline stage on synthetic data, one child process per stage.
+
+    *sizes* are total rows, split evenly over the symbols. Every size runs in
+    a fresh scratch workspace, so the stores start empty; stages a requested
+    stage depends on run first but are only reported when requested too.
+    """
+    script: str = os.path.abspath(__file__)
+    results: list[dict] = []
+    for freq in freqs:
+        for symbols in symbol_counts:
+            for size in sizes:
+                with tempfile.TemporaryDirectory() as workspace:
+                    for stage in _suite_plan(stages):
+                        result_path: str = os.path.join(workspace, f"{stage}.json")
+                        command: list[str] = [
+                            sys.executable, script, "suite-stage", stage,
+                            "--rows", str(size), "--symbols", str(symbols),
+                            "--freq", freq, "--seed", str(seed), "--result", result_path,
+                        ]
+                        cwd: str = os.path.join(workspace, "pipeline" if stage == "pipeline" else "stages")
+                        os.makedirs(cwd, exist_ok=True)
+                        completed = subprocess.run(command, cwd=cwd, capture_output=True, text=True)
+                        if completed.returncode != 0:
+                            raise RuntimeError(f"Suite stage {stage} failed:\n{completed.stderr[-2000:]}")
+                        if stage in stages:
+                            with open(result_path, encoding="utf-8") as handle:
+                                results.append(json.load(handle))
+    return results
+
+
+def run_suite_stage(stage: str, rows: int, symbols: int, freq: str, seed: int) -> dict:
+    """Run one suite stage in the current directory and return its measurements."""
+    INSTRUMENTATION.configure(report_path=None)
+    for module in SUITE_WARM_IMPORTS:
+        importlib.import_module(module)
+    logger: Logger = Logger()
+    generator: OHLCVGenerator = OHLCVGenerator(seed=seed, freq=freq)
+    names: list[str] = generator.symbols(symbols)
+    rows_per_symbol: int = max(rows // symbols, 1)
+    name: str = f"suite.{stage}"
+
+    if stage == "store":
+        raw_store: PartitionedStore = PartitionedStore(
+            Enricher.RAW_STORE_PATH, "crude_oil", logger, schema=RAW_SCHEMA
+        )
+        # Only the upserts are timed, not the generation of each chunk
+        for chunk in generator.chunks(names, rows_per_symbol, chunk_rows=SUITE_CHUNK_ROWS):
+            with INSTRUMENTATION.stage(name, "benchmark"):
+                raw_store.upsert(chunk)
+    elif stage == "pipeline":
+        frame: pd.DataFrame = generator.frame(symbols, rows_per_symbol)
+        with INSTRUMENTATION.stage(name, "benchmark"):
+            status: dict[str, str] = OfflinePipeline(frame).run()
+        if set(status.values()) != {"ran"}:
+            raise RuntimeError(f"Pipeline stages did not all run: {status}")
+    else:
+        with INSTRUMENTATION.stage(name, "benchmark"):
+            if stage == "enrich":
+                Enricher(logger).enrich(full=True)
+            elif stage == "train":
+                Modeller(logger).train()
+            elif stage == "dashboard":
+                Dashboard(logger).run()
+
+    summary: pd.DataFrame = INSTRUMENTATION.summary()
+    records: pd.DataFrame = summary[summary["stage"] == name]
+    if (records["status"] != "ok").any():
+        raise RuntimeError(records["error"].dropna().iloc[0])
+    wall: float = float(records["wall_seconds"].sum())
+    # Pipeline stages run on DAG worker threads, which count their own bytes
+    io: pd.DataFrame = records if stage != "pipeline" else summary[summary["stage"].str.startswith("dag.")]
+    return {
+        "benchmark": "suite",
+        "stage": stage,
+        "freq": freq,
+        "rows": rows_per_symbol * symbols,
+        "symbols": symbols,
+        "run_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "rows_per_second": round(rows_per_symbol * symbols / wall) if wall else None,
+        "read_mb": round(float(io["bytes_read"].sum()) / 2**20, 2),
+        "written_mb": round(float(io["bytes_written"].sum()) / 2**20, 2),
+    }
+
+
+def compare_baseline(results: list[dict], baseline_path: str, tolerance: float) -> list[dict]:
+    """Annotate suite *results* with their baseline ratios; a regression is > 1 + *tolerance*."""
+    baseline: dict[tuple, dict] = {_suite_key(record): record for record in read_results(baseline_path)}
+    for result in results:
+        reference: Optional[dict] = baseline.get(_suite_key(result))
+        if reference is None:
+            result.update({"wall_ratio": None, "rss_ratio": None, "regression": None})
+            continue
+        wall_ratio: float = result["wall_s"] / max(reference["wall_s"], 1e-9)
+        rss_ratio: Optional[float] = (
+            result["peak_rss_mb"] / reference["peak_rss_mb"]
+            if result["peak_rss_mb"] and reference.get("peak_rss_mb") else None
+        )
+        slower: bool = wall_ratio > 1 + tolerance and result["wall_s"] - reference["wall_s"] > SUITE_MIN_SECONDS
+        heavier: bool = rss_ratio is not None and rss_ratio > 1 + tolerance
+        result.update({
+            "wall_ratio": round(wall_ratio, 2),
+            "rss_ratio": None if rss_ratio is None else round(rss_ratio, 2),
+            "regression": slower or heavier,
+        })
+    return results
+
+
+def save_baseline(results: list[dict], baseline_path: str) -> None:
+    """Replace the baseline entries of the measured configurations with *results*."""
+    measured: dict[tuple, dict] = {_suite_key(result): result for result in results}
+    kept: list[dict] = [record for record in read_results(baseline_path) if _suite_key(record) not in measured]
+    os.makedirs(os.path.dirname(baseline_path) or ".", exist_ok=True)
+    tmp_path: str = f"{baseline_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        for record in [*kept, *measured.values()]:
+            fields: dict = {key: value for key, value in record.items() if key not in ("wall_ratio", "rss_ratio", "regression")}
+            handle.write(json.dumps(fields) + "\n")
+    os.replace(tmp_path, baseline_path)
+
+
+def _suite_plan(stages: list[str]) -> list[str]:
+    """*stages* plus the stages they depend on, in pipeline order."""
+    needed: set[str] = set()
+    pending: list[str] = list(stages)
+    while pending:
+        stage: str = pending.pop()
+        if stage not in needed:
+            needed.add(stage)
+            pending.extend(SUITE_STAGES[stage])
+    return [stage for stage in SUITE_STAGES if stage in needed]
+
+
+def _suite_key(record: dict) -> tuple:
+    return record["stage"], record["freq"], record["rows"], record["symbols"]
+
+
+# ----------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------
+def main(argv: Optional[list[str]] = None) -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is kept)")
+    parser.add_argument("--output", help="append results as JSON lines to this file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_bench = commands.add_parser("parser", help="history table parsing engines")
+    parser_bench.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser_bench.add_argument("--fixtures-dir", help="keep the generated pages in this folder")
+
+    serving_bench = commands.add_parser("serving", help="cold versus cached model predictions")
+    serving_bench.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    serving_bench.add_argument("--calls", type=int, default=200, help="predictions per timed run")
+
+    backtest_bench = commands.add_parser("backtest", help="walk-forward folds: sufficient statistics vs refits")
+    backtest_bench.add_argument("--rows", type=int, nargs="+", default=[2_000, 20_000])
+    backtest_bench.add_argument("--step", type=int, default=5, help="rows per fold")
+    backtest_bench.add_argument("--workers", type=int, help="process pool size (default: all cores)")
+
+    scheduler_bench = commands.add_parser("scheduler", help="training grid wall time per pool size")
+    scheduler_bench.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    scheduler_bench.add_argument("--symbols", type=int, default=3)
+    scheduler_bench.add_argument("--rows", type=int, default=2_500, help="daily rows per symbol")
+
+    enrich_bench = commands.add_parser("enrich", help="multi-symbol enrichment wall time per pool size")
+    enrich_bench.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    enrich_bench.add_argument("--symbols", type=int, default=20)
+    enrich_bench.add_argument("--rows", type=int, default=2_500, help="daily rows per symbol")
+
+    commands.add_parser("artifact", help="pickled versus compact model artifact load time")
+    commands.add_parser("startup", help="cold start of each CLI subcommand versus eager imports")
+
+    render_bench = commands.add_parser("render", help="chart render time per number of charts and rows")
+    render_bench.add_argument("--charts", type=int, nargs="+", default=[2, 8, 32])
+    render_bench.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    render_bench.add_argument("--workers", type=int, help="process pool size (default: all cores)")
+
+    kpi_bench = commands.add_parser("kpi", help="KPI refresh after one new bar: rescan vs running state")
+    kpi_bench.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+
+    validate_bench = commands.add_parser("validate", help="data-quality checks per batch size, with injected faults")
+    validate_bench.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    validate_bench.add_argument("--symbols", type=int, default=100, help="symbols sharing the rows")
+
+    suite_bench = commands.add_parser("suite", help="pipeline stages on synthetic data, against a baseline")
+    suite_bench.add_argument("--rows", type=int, nargs="+", default=[1_000, 50_000], help="total rows (10^3 .. 10^8)")
+    suite_bench.add_argument("--symbols", type=int, nargs="+", default=[1], help="symbols sharing the rows (1 .. 1000)")
+    suite_bench.add_argument("--freq", nargs="+", default=["B"], choices=list(OHLCVGenerator.SESSIONS))
+    suite_bench.add_argument("--stages", nargs="+", default=list(SUITE_STAGES), choices=list(SUITE_STAGES))
+    suite_bench.add_argument("--seed", type=int, default=0)
+    suite_bench.add_argument("--baseline", default=SUITE_BASELINE_PATH, help="baseline results to compare with")
+    suite_bench.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown or memory growth")
+    suite_bench.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+
+    stage_bench = commands.add_parser("suite-stage", help="one suite stage in the current directory (used by suite)")
+    stage_bench.add_argument("stage", choices=list(SUITE_STAGES))
+    stage_bench.add_argument("--rows", type=int, required=True)
+    stage_bench.add_argument("--symbols", type=int, default=1)
+    stage_bench.add_argument("--freq", default="B", choices=list(OHLCVGenerator.SESSIONS))
+    stage_bench.add_argument("--seed", type=int, default=0)
+    stage_bench.add_argument("--result", required=True, help="write the measurements to this JSON file")
+
+    args: argparse.Namespace = parser.parse_args(argv)
+    if args.command == "parser":
+        results: list[dict] = bench_parser(args.sizes, args.repeat, args.fixtures_dir)
+    elif args.command == "serving":
+        results = bench_serving(args.batch_sizes, args.calls, args.repeat)
+    elif args.command == "backtest":
+        results = bench_backtest(args.rows, args.step, args.workers)
+    elif args.command == "scheduler":
+        results = bench_scheduler(args.workers, args.symbols, args.rows)
+    elif args.command == "enrich":
+        results = bench_enrich(args.workers, args.symbols, args.rows)
+    elif args.command == "artifact":
+        results = bench_artifact(args.repeat)
+    elif args.command == "startup":
+        results = bench_startup(args.repeat)
+    elif args.command == "render":
+        results = bench_render(args.charts, args.rows, args.workers)
+    elif args.command == "kpi":
+        results = bench_kpi(args.rows, args.repeat)
+    elif args.command == "validate":
+        results = bench_validate(args.rows, args.symbols, args.repeat)
+    elif args.command == "suite-stage":
+        result: dict = run_suite_stage(args.stage, args.rows, args.symbols, args.freq, args.seed)
+        with open(args.result, "w", encoding="utf-8") as handle:
+            json.dump(result, handle)
+        return 0
+    elif args.command == "suite":
+        results = bench_suite(args.rows, args.symbols, args.freq, args.stages, args.seed)
+        if args.save_baseline:
+            save_baseline(results, args.baseline)
+        else:
+            results = compare_baseline(results, args.baseline, args.tolerance)
+        write_results(results, args.output or SUITE_RESULTS_PATH)
+        regressions: list[dict] = [result for result in results if result.get("regression")]
+        for result in regressions:
+            print(
+                f"REGRESSION {result['stage']} ({result['rows']} {result['freq']} rows, {result['symbols']} symbols): "
+                f"time x{result['wall_ratio']}, memory x{result['rss_ratio']}"
+            )
+        return 1 if regressions else 0
+    write_results(results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""CLI module.
+
+Command-line entry point with one subcommand per pipeline phase. Run from
+the repository root, for example::
+
+    python src/crude_oil/cli.py collect
+    python src/crude_oil/cli.py enrich --full
+    python src/crude_oil/cli.py enrich --symbols CL=F BZ=F --workers 4
+    python src/crude_oil/cli.py train --backtest
+    python src/crude_oil/cli.py train --verify
+    python src/crude_oil/cli.py predict --rows 5
+    python src/crude_oil/cli.py dashboard
+    python src/crude_oil/cli.py run --force
+
+Start-up only imports argparse, the logger and the metrics recorder; every
+subcommand imports the modules it needs when it runs (``COMMAND_MODULES``),
+and the phase modules load their heavy libraries (SciPy, scikit-learn,
+Matplotlib, joblib) on first use. ``predict`` therefore never loads requests,
+SciPy or Matplotlib. ``python src/crude_oil/benchmark.py startup`` measures
+the cold start of every subcommand.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import Callable, Final, Optional
+
+from logger import Logger
+from metrics import INSTRUMENTATION
+
+
+# Modules each subcommand imports when it runs (benchmark.py startup imports the same)
+COMMAND_MODULES: Final[dict[str, tuple[str, ...]]] = {
+    "collect": ("main", "collector"),
+    "enrich": ("enricher",),
+    "train": ("modeller",),
+    "predict": ("modeller",),
+    "dashboard": ("dashboard",),
+    "run": ("main",),
+}
+
+
+# ----------------------------------------------------------------------
+# Subcommands
+# ----------------------------------------------------------------------
+def collect(args: argparse.Namespace, logger: Logger) -> int:
+    from main import CrudeOilDataPipeline
+
+    df = CrudeOilDataPipeline().collect()
+    print(f"{len(df)} new rows collected.")
+    return 0
+
+
+def enrich(args: argparse.Namespace, logger: Logger) -> int:
+    from enricher import Enricher
+
+    enricher = Enricher(logger)
+    if args.symbols is None:
+        df = enricher.enrich(full=args.full)
+        print(f"{len(df)} rows enriched.")
+        return 0
+    summary = enricher.enrich_symbols(args.symbols or None, full=args.full, max_workers=args.workers)
+    print(summary.to_string(index=False))
+    return 0 if summary["ok"].all() else 1
+
+
+def train(args: argparse.Namespace, logger: Logger) -> int:
+    from modeller import Modeller
+
+    modeller = Modeller(logger)
+    if args.full:
+        modeller.train()
+    else:
+        modeller.train_incremental()
+    if args.backtest:
+        modeller.backtest()
+    # The incremental statistics must give the same coefficients as a full refit
+    if args.verify and not modeller.verify_incremental():
+        return 1
+    return 0
+
+
+def predict(args: argparse.Namespace, logger: Logger) -> int:
+    from modeller import Modeller
+
+    predictions = Modeller(logger).predict_latest(rows=args.rows)
+    if predictions.empty:
+        return 1
+    print(predictions.to_string(index=False))
+    return 0
+
+
+def dashboard(args: argparse.Namespace, logger: Logger) -> int:
+    from dashboard import Dashboard
+
+    Dashboard(logger, max_workers=args.workers).run()
+    return 0
+
+
+def run(args: argparse.Namespace, logger: Logger) -> int:
+    from main import CrudeOilDataPipeline
+
+    status: dict[str, str] = CrudeOilDataPipeline().run(force=args.force)
+    return 1 if any(state in ("failed", "blocked") for state in status.values()) else 0
+
+
+COMMANDS: Final[dict[str, Callable[[argparse.Namespace, Logger], int]]] = {
+    "collect": collect,
+    "enrich": enrich,
+    "train": train,
+    "predict": predict,
+    "dashboard": dashboard,
+    "run": run,
+}
+
+
+# ----------------------------------------------------------------------
+# Script entry point
+# ----------------------------------------------------------------------
+def build_parser() -> argparse.ArgumentParser:
+    # Logging and run-report options, accepted after every subcommand
+    common: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--report", default=INSTRUMENTATION.REPORT_PATH, help="JSON-lines run report to append to")
+    common.add_argument("--prometheus", help="also write stage metrics to this Prometheus textfile")
+    common.add_argument("--profile", metavar="STAGE", help="profile one stage, e.g. enrich or dag.train")
+    common.add_argument("--trace-memory", action="store_true", help="measure peak Python allocations with tracemalloc")
+    common.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    common.add_argument("--log-json", action="store_true", help="write the log as JSON lines")
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Crude-oil pipeline, one phase at a time.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("collect", parents=[common], help="fetch, validate and store bars newer than the stored ones")
+
+    enrich_command = commands.add_parser("enrich", parents=[common], help="enrich the new raw bars")
+    enrich_command.add_argument("--full", action="store_true", help="recompute the whole history")
+    enrich_command.add_argument(
+        "--symbols", nargs="*", help="enrich these symbols (every stored one when empty) on a process pool"
+    )
+    enrich_command.add_argument("--workers", type=int, help="process pool size for --symbols (default: all cores)")
+
+    train_command = commands.add_parser("train", parents=[common], help="update the next-day model")
+    train_command.add_argument("--full", action="store_true", help="retrain on a chronological hold-out split")
+    train_command.add_argument("--backtest", action="store_true", help="also run the walk-forward backtest")
+    train_command.add_argument(
+        "--verify", action="store_true", help="check the incremental model against a full refit (exit 1 if not equal)"
+    )
+
+    predict_command = commands.add_parser("predict", parents=[common], help="predict from the latest enriched rows")
+    predict_command.add_argument("--rows", type=int, default=1, help="number of latest rows to score")
+
+    dashboard_command = commands.add_parser("dashboard", parents=[common], help="render charts and KPI tables")
+    dashboard_command.add_argument("--workers", type=int, help="chart render pool size (default: all cores)")
+
+    run_command = commands.add_parser("run", parents=[common], help="run the whole stage graph")
+    run_command.add_argument("--force", action="store_true", help="run every stage even if its inputs are unchanged")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args: argparse.Namespace = build_parser().parse_args(argv)
+
+    Logger.configure(level=args.log_level, json_format=args.log_json)
+    INSTRUMENTATION.configure(
+        report_path=args.report,
+        prometheus_path=args.prometheus,
+        profile_stage=args.profile,
+        trace_memory=args.trace_memory,
+    )
+    code: int = COMMANDS[args.command](args, Logger())
+    # The whole graph writes its own report at the end of CrudeOilDataPipeline.run
+    if args.command != "run":
+        INSTRUMENTATION.write_report()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,115 @@
+"""Collector module.
+
+This module provides the Collector class, which downloads daily price history
+tables from Yahoo Finance. Several symbols and date ranges are fetched
+concurrently over one pooled keep-alive session, with per-host rate limiting,
+timeouts and exponential backoff, and returned as one long-format DataFrame
+keyed by (symbol, date). Only the dates missing from the local store are
+requested: each symbol starts the day after its stored watermark, and long
+backfills are split into chunks that download in parallel.
+
+History tables are parsed with lxml and a targeted XPath when it is
+installed, falling back to BeautifulSoup, and are normalised to the raw
+schema (see ``schema.py``) before they leave the collector.
+"""
+
+from __future__ import annotations
+
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Final, Optional
+from urllib.parse import quote, urlsplit
+
 import requests
 import pandas as pd
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from logger import Logger
+from metrics import INSTRUMENTATION
+from schema import RAW_SCHEMA
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover - optional dependency
+    etree = None
+    lxml_html = None
+
+
+@dataclass(frozen=True)
+class FetchJob:
+    """One history page to download: *symbol* between two POSIX timestamps."""
+
+    symbol: str
+    period1: int
+    period2: int
+
+
+class HostRateLimiter:
+    """Space out requests to the same host by at least ``1 / rate`` seconds."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval: float = 1.0 / rate if rate > 0 else 0.0
+        self._lock: threading.Lock = threading.Lock()
+        self._next_slot: dict[str, float] = {}
+
+    def wait(self, host: str) -> None:
+        with self._lock:
+            now: float = time.monotonic()
+            slot: float = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay: float = slot - now
+        if delay > 0:
+            time.sleep(delay)
 
 
 class Collector:
     CLASS_NAME = "Collector"
     DATA_FOLDER_PATH = 'src/crude_oil/static/data'
     STATIC_FOLDER_PATH = 'src/crude_oil/static'
-    BASE_URL = 'https://finance.yahoo.com/quote/CL%3DF/history/?period1=1590452357&period2=1748218465'
+    BASE_URL = 'https://finance.yahoo.com'
+    HISTORY_PATH = '/quote/{symbol}/history/?period1={period1}&period2={period2}'
+    HEADERS: Final[dict[str, str]] = {'User-Agent': 'Mozilla/5.0'}
+
+    # WTI, Brent and Henry Hub natural gas front-month futures
+    DEFAULT_SYMBOLS: Final[tuple[str, ...]] = ('CL=F', 'BZ=F', 'NG=F')
+    # Start of the history for symbols with nothing stored yet (2020-05-26)
+    BACKFILL_START: Final[int] = 1590452357
+    # Longest date range requested in a single page
+    CHUNK_DAYS: Final[int] = 365
+
+    # Networking
+    MAX_WORKERS: Final[int] = 4
+    TIMEOUT: Final[tuple[float, float]] = (5.0, 30.0)  # connect, read
+    MAX_RETRIES: Final[int] = 4
+    BACKOFF_SECONDS: Final[float] = 0.5
+    RETRY_STATUSES: Final[frozenset[int]] = frozenset({429, 500, 502, 503, 504})
+    REQUESTS_PER_SECOND: Final[float] = 2.0
 
-    def __init__(self, logger: Logger):
+    # Parsing
+    PARSER_ENGINES: Final[tuple[str, ...]] = ('lxml', 'bs4')
+    HISTORY_TABLE_XPATH: Final[str] = '//div[@data-testid="history-table"]//table[1]'
+
+    def __init__(
+        self,
+        logger: Logger,
+        symbols: Optional[list[str]] = None,
+        base_url: str = BASE_URL,
+        max_workers: int = MAX_WORKERS,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+    ):
         self.logger = logger
-        self.url = self.BASE_URL
+        self.symbols: list[str] = list(symbols or self.DEFAULT_SYMBOLS)
+        self.base_url: str = base_url.rstrip('/')
+        self.max_workers: int = max_workers
+        self.rate_limiter: HostRateLimiter = HostRateLimiter(requests_per_second)
+        self.session: requests.Session = self._build_session()
+        # Response bytes received by the download workers, for the stage metrics
+        self._bytes_received: int = 0
+        self._bytes_lock: threading.Lock = threading.Lock()
         self._verify_folder(self.STATIC_FOLDER_PATH)
         self._verify_folder(self.DATA_FOLDER_PATH)
 
@@ -22,50 +118,202 @@ class Collector:
             os.makedirs(path)
             self.logger.info(self.CLASS_NAME, "_verify_folder", f"Created missing folder at {path}")
 
-    def get_crude_oil_data(self) -> pd.DataFrame:
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(self.url, headers=headers)
+    def _build_session(self) -> requests.Session:
+        """Session whose connection pool is large enough for every worker."""
+        session = requests.Session()
+        session.headers.update(self.HEADERS)
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self) -> None:
+        self.session.close()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def get_crude_oil_data(self, watermarks: Optional[dict[str, Optional[pd.Timestamp]]] = None) -> pd.DataFrame:
+        """Fetch, for every configured symbol, the dates after its watermark up to now.
 
-            if not self._is_successful_response(response):
-                self.logger.error(self.CLASS_NAME, "get_crude_oil_data", f"Error fetching data: HTTP {response.status_code}")
+        *watermarks* maps a symbol to its latest stored date; symbols without
+        one are backfilled from ``BACKFILL_START``.
+        """
+        with INSTRUMENTATION.stage("collect", self.CLASS_NAME) as probe:
+            jobs = self.plan_jobs(watermarks or {}, until=pd.Timestamp.now(tz='UTC'))
+            if not jobs:
+                self.logger.info(self.CLASS_NAME, "get_crude_oil_data", "Every symbol is up to date; nothing to fetch.")
                 return pd.DataFrame()
+            received = self._bytes_received
+            df = self.fetch_jobs(jobs)
+            probe.bytes_read += self._bytes_received - received
+            probe.add_rows(rows_out=len(df))
+            probe.extra["requests"] = len(jobs)
+            return df
+
+    def plan_jobs(self, watermarks: dict[str, Optional[pd.Timestamp]], until: pd.Timestamp) -> list[FetchJob]:
+        """Build the chunked jobs covering ``[watermark + 1 day, until]`` per symbol."""
+        period2 = int(until.timestamp())
+        jobs: list[FetchJob] = []
+        for symbol in self.symbols:
+            last_date = watermarks.get(symbol)
+            if last_date is None:
+                period1 = self.BACKFILL_START
+            else:
+                next_day = pd.Timestamp(last_date).normalize() + pd.Timedelta(days=1)
+                period1 = int(next_day.tz_localize('UTC').timestamp() if next_day.tzinfo is None else next_day.timestamp())
+            jobs.extend(self._chunk(symbol, period1, period2))
+        return jobs
+
+    def _chunk(self, symbol: str, period1: int, period2: int) -> list[FetchJob]:
+        """Split ``[period1, period2)`` into consecutive ranges of at most CHUNK_DAYS."""
+        step = self.CHUNK_DAYS * 86400
+        return [
+            FetchJob(symbol, start, min(start + step, period2))
+            for start in range(period1, period2, step)
+        ]
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            table = soup.select_one('div[data-testid="history-table"] table')
+    def fetch(self, symbols: list[str], period1: int, period2: int) -> pd.DataFrame:
+        """Fetch the same date range for several symbols."""
+        return self.fetch_jobs([FetchJob(symbol, period1, period2) for symbol in symbols])
+
+    def fetch_jobs(self, jobs: list[FetchJob]) -> pd.DataFrame:
+        """Download *jobs* concurrently and return a long frame keyed by (symbol, date)."""
+        if not jobs:
+            return pd.DataFrame()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            frames: list[pd.DataFrame] = list(executor.map(INSTRUMENTATION.propagate(self._fetch_job), jobs))
 
-            if table is None:
-                self.logger.error(self.CLASS_NAME, "get_crude_oil_data", "Table with data-testid=history-table not found")
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        # Yahoo lists bars newest first: hand each symbol over oldest first, so only real
+        # disorder reaches the validator. Chunks of the same symbol may share a boundary day,
+        # and the stable sort keeps the later chunk's copy last
+        df = pd.concat(frames, ignore_index=True)
+        df = (
+            df.sort_values(['symbol', 'date'], kind='stable')
+            .drop_duplicates(subset=['symbol', 'date'], keep='last')
+            .reset_index(drop=True)
+        )
+        self.logger.info(
+            self.CLASS_NAME,
+            "fetch_jobs",
+            f"Data successfully retrieved for {df['symbol'].nunique()} symbols with shape {df.shape}",
+        )
+        return df
+
+    # ------------------------------------------------------------------
+    # Download
+    # ------------------------------------------------------------------
+    def _history_url(self, job: FetchJob) -> str:
+        path = self.HISTORY_PATH.format(symbol=quote(job.symbol, safe=''), period1=job.period1, period2=job.period2)
+        return f"{self.base_url}{path}"
+
+    def _fetch_job(self, job: FetchJob) -> pd.DataFrame:
+        try:
+            html = self._get_with_retries(self._history_url(job))
+            if html is None:
                 return pd.DataFrame()
 
-            headers = [th.get_text(strip=True) for th in table.thead.find_all('th')]
-            rows = [
-                [td.get_text(strip=True) for td in tr.find_all('td')]
-                for tr in table.tbody.find_all('tr')
-                if len(tr.find_all('td')) == len(headers)
-            ]
+            df = self._parse_history(html)
+            if df is None:
+                self.logger.error(self.CLASS_NAME, "_fetch_job", f"Table with data-testid=history-table not found for {job.symbol}")
+                return pd.DataFrame()
+            if df.empty:
+                # A range without sessions (a weekend, a holiday) renders an empty table
+                self.logger.info(self.CLASS_NAME, "_fetch_job", f"{job.symbol}: no bars in the requested range")
+                return df
 
-            df = self._build_dataframe(headers, rows)
-            self.logger.info(self.CLASS_NAME, "get_crude_oil_data", f"Data successfully retrieved with shape {df.shape}")
+            df.insert(0, 'symbol', pd.Categorical([job.symbol] * len(df)))
+            self.logger.info(self.CLASS_NAME, "_fetch_job", f"{job.symbol}: retrieved {len(df)} rows")
             return df
 
         except Exception as error:
-            self.logger.error(self.CLASS_NAME, "get_crude_oil_data", f"Error retrieving data from the URL: {error}")
+            self.logger.error(self.CLASS_NAME, "_fetch_job", f"Error retrieving {job.symbol}: {error}")
             return pd.DataFrame()
 
+    def _get_with_retries(self, url: str) -> Optional[str]:
+        """GET *url*, retrying timeouts, connection errors and retryable statuses."""
+        host = urlsplit(url).netloc
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.rate_limiter.wait(host)
+            try:
+                response = self.session.get(url, timeout=self.TIMEOUT)
+                if self._is_successful_response(response):
+                    with self._bytes_lock:
+                        self._bytes_received += len(response.content)
+                    return response.text
+                if response.status_code not in self.RETRY_STATUSES:
+                    self.logger.error(self.CLASS_NAME, "_get_with_retries", f"Error fetching {url}: HTTP {response.status_code}")
+                    return None
+                reason = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as error:
+                reason = type(error).__name__
+
+            if attempt < self.MAX_RETRIES:
+                delay = self.BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random())
+                self.logger.warning(
+                    self.CLASS_NAME,
+                    "_get_with_retries",
+                    f"{reason} for {url}; retry {attempt + 1}/{self.MAX_RETRIES} in {delay:.1f}s",
+                )
+                time.sleep(delay)
+
+        self.logger.error(self.CLASS_NAME, "_get_with_retries", f"Giving up on {url} after {self.MAX_RETRIES} retries")
+        return None
+
     @staticmethod
     def _is_successful_response(response: requests.Response) -> bool:
         return response.status_code == 200
 
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+    def _parse_history(self, html: str, engine: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Parse the history table of *html* with *engine* (lxml when available); ``None`` if it has none."""
+        engine = engine or ('lxml' if lxml_html is not None else 'bs4')
+        if engine == 'lxml':
+            try:
+                parsed = self._parse_history_lxml(html)
+                if parsed is not None:
+                    return self._build_dataframe(*parsed)
+            except (etree.ParserError, ValueError) as error:
+                self.logger.warning(self.CLASS_NAME, "_parse_history", f"lxml parsing failed, using BeautifulSoup: {error}")
+        parsed = self._parse_history_bs4(html)
+        return None if parsed is None else self._build_dataframe(*parsed)
+
+    def _parse_history_lxml(self, html: str) -> Optional[tuple[list[str], list[list[str]]]]:
+        """Extract headers and column-major cell text with a single XPath per section."""
+        tree = lxml_html.fromstring(html)
+        tables = tree.xpath(self.HISTORY_TABLE_XPATH)
+        if not tables:
+            return None
+        table = tables[0]
+        headers = [''.join(text.strip() for text in th.itertext()) for th in table.xpath('./thead//th')]
+        width = len(headers)
+        # Rows with another cell count (dividends, splits) are skipped by the predicate
+        cells = table.xpath(f'./tbody/tr[count(td) = {width}]/td')
+        texts = [''.join(text.strip() for text in td.itertext()) for td in cells]
+        return headers, [texts[index::width] for index in range(width)]
+
+    def _parse_history_bs4(self, html: str) -> Optional[tuple[list[str], list[list[str]]]]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+        table = soup.select_one('div[data-testid="history-table"] table')
+        if table is None:
+            return None
+
+        headers = [th.get_text(strip=True) for th in table.thead.find_all('th')]
+        rows = []
+        for tr in table.tbody.find_all('tr') if table.tbody is not None else []:
+            cells = tr.find_all('td')
+            if len(cells) == len(headers):
+                rows.append([td.get_text(strip=True) for td in cells])
+        columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in headers]
+        return headers, columns
+
     @staticmethod
-    def _build_dataframe(headers: list[str], rows: list[list[str]]) -> pd.DataFrame:
-        column_mapping = {
-            'Date': 'date',
-            'Open': 'open',
-            'High': 'high',
-            'Low.': 'low',
-            'CloseClose price adjusted for splits.': 'close',
-            'Adj CloseAdjusted close price adjusted for splits and dividend and/or capital gain distributions.': 'adj_close',
-            'Volume': 'volume'
-        }
-        return pd.DataFrame(rows, columns=headers).rename(columns=column_mapping)
\ No newline at end of file
+    def _build_dataframe(headers: list[str], columns: list[list[str]]) -> pd.DataFrame:
+        return RAW_SCHEMA.normalise(pd.DataFrame(dict(zip(headers, columns)), columns=headers))
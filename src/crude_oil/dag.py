@@ -0,0 +1,254 @@
+"""DAG module.
+
+This module provides the Stage dataclass and the PipelineDAG class, which run
+a pipeline as a graph of stages connected by named, typed artifacts. Stage
+outputs are handed to downstream stages in memory. Independent stages run
+concurrently on a thread pool, since frames are shared without pickling.
+
+Every artifact's content hash is recorded in a small JSON manifest. A stage
+is skipped when the hashes of its inputs match its last successful run; the
+recorded hashes of its outputs then flow downstream, so an unchanged source
+short-circuits the whole graph without reading or recomputing anything.
+A stage that raises, or whose components report an error they handled
+(``INSTRUMENTATION.record_error``), fails and is not recorded, so the next
+run retries it.
+Outputs flagged for persistence are also written through a Storage backend,
+so a downstream stage that must run can still read the output of a skipped
+stage.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Final, Optional
+
+import pandas as pd
+
+from logger import Logger
+from metrics import INSTRUMENTATION
+from storage import Storage, get_storage
+
+
+class StageFailed(RuntimeError):
+    """A stage's components reported errors they handled without raising."""
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One pipeline step: ``func(**inputs)`` returns a dict with every declared output."""
+
+    name: str
+    func: Callable[..., Optional[dict[str, Any]]]
+    inputs: tuple[str, ...] = ()
+    # Output artifact name -> expected type
+    outputs: dict[str, type] = field(default_factory=dict)
+    # DataFrame outputs to write to the DAG cache, readable after a skip
+    persist: tuple[str, ...] = ()
+    # Bump to invalidate previous runs when the stage's logic changes
+    version: str = "1"
+
+
+def content_hash(value: Any) -> str:
+    """SHA-256 of an artifact's content (row hashes and columns for DataFrames)."""
+    digest = hashlib.sha256()
+    if isinstance(value, pd.DataFrame):
+        digest.update(json.dumps([str(column) for column in value.columns]).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PipelineDAG:
+    CLASS_NAME: Final[str] = "PipelineDAG"
+
+    CACHE_PATH: Final[str] = "src/crude_oil/static/data/dag"
+    MANIFEST_NAME: Final[str] = "dag_manifest.json"
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        logger: Logger,
+        cache_path: str = CACHE_PATH,
+        max_workers: Optional[int] = None,
+        storage: Optional[Storage] = None,
+    ) -> None:
+        """Validate the graph: unique stages and outputs, known inputs and no cycles."""
+        self.logger: Logger = logger
+        self.cache_path: str = cache_path
+        self.manifest_path: str = os.path.join(cache_path, self.MANIFEST_NAME)
+        self.max_workers: Optional[int] = max_workers
+        self.storage: Storage = storage or get_storage()
+        os.makedirs(cache_path, exist_ok=True)
+        self.stages: dict[str, Stage] = {}
+        self.producers: dict[str, str] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Artifact {output} produced by {self.producers[output]} and {stage.name}")
+                self.producers[output] = stage.name
+            unknown: list[str] = [name for name in stage.persist if name not in stage.outputs]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} persists undeclared outputs: {unknown}")
+            self.stages[stage.name] = stage
+        for stage in stages:
+            missing: list[str] = [name for name in stage.inputs if name not in self.producers]
+            if missing:
+                raise ValueError(f"Stage {stage.name} has inputs nobody produces: {missing}")
+        self.order: list[str] = self._topological_order()
+        self._lock: threading.Lock = threading.Lock()
+        self._values: dict[str, Any] = {}
+
+    def upstream(self, name: str) -> set[str]:
+        """Names of the stages *name* directly depends on."""
+        return {self.producers[artifact] for artifact in self.stages[name].inputs}
+
+    def run(self, force: bool = False) -> dict[str, str]:
+        """Run the graph and return {stage: "ran" | "skipped" | "failed" | "blocked"}.
+
+        With *force* every stage runs regardless of its input hashes.
+        """
+        manifest: dict[str, dict] = self._load_manifest()
+        self._values = {}
+        status: dict[str, str] = {}
+        pending: set[str] = set(self.order)
+        running: dict[Future, str] = {}
+        # Stage metrics also count toward whatever stage (e.g. "pipeline") is open in the caller
+        run_stage: Callable = INSTRUMENTATION.propagate(self._run_stage)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in [name for name in self.order if name in pending]:
+                    parents: set[str] = self.upstream(name)
+                    if any(status.get(parent) in ("failed", "blocked") for parent in parents):
+                        status[name] = "blocked"
+                        pending.discard(name)
+                    elif all(parent in status for parent in parents):
+                        pending.discard(name)
+                        running[pool.submit(run_stage, self.stages[name], manifest, force)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception as error:  # noqa: BLE001
+                        self.logger.error(self.CLASS_NAME, "run", f"Stage {name} failed: {error}")
+                        status[name] = "failed"
+                    # Persist progress so a crash later on does not repeat this stage
+                    with self._lock:
+                        self._save_manifest(manifest)
+
+        summary: str = ", ".join(f"{name}={status[name]}" for name in self.order)
+        self.logger.info(self.CLASS_NAME, "run", f"Pipeline DAG finished: {summary}")
+        return status
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+    def _run_stage(self, stage: Stage, manifest: dict[str, dict], force: bool) -> str:
+        with self._lock:
+            artifacts: dict[str, str] = manifest.setdefault("artifacts", {})
+            recorded: dict = manifest.setdefault("stages", {}).get(stage.name, {})
+            key: str = self._stage_key(stage, artifacts)
+        if not force and stage.inputs and recorded.get("key") == key and all(
+            name in artifacts for name in stage.outputs
+        ):
+            self.logger.info(self.CLASS_NAME, "_run_stage", f"Stage {stage.name} skipped: inputs unchanged.")
+            return "skipped"
+
+        inputs: dict[str, Any] = {name: self._value(name, manifest, force) for name in stage.inputs}
+        start: float = time.perf_counter()
+        with INSTRUMENTATION.stage(f"dag.{stage.name}", self.CLASS_NAME) as probe:
+            outputs: dict[str, Any] = stage.func(**inputs) or {}
+            probe.add_rows(
+                rows_in=sum(len(value) for value in inputs.values() if isinstance(value, pd.DataFrame)),
+                rows_out=sum(len(value) for value in outputs.values() if isinstance(value, pd.DataFrame)),
+            )
+        seconds: float = time.perf_counter() - start
+        if probe.errors:
+            raise StageFailed("; ".join(probe.errors))
+        for name, expected in stage.outputs.items():
+            if name not in outputs:
+                raise ValueError(f"Stage {stage.name} did not return output {name}")
+            if not isinstance(outputs[name], expected):
+                raise TypeError(
+                    f"Stage {stage.name} output {name} is {type(outputs[name]).__name__}, expected {expected.__name__}"
+                )
+        for name in stage.persist:
+            self.storage.write(outputs[name], os.path.join(self.cache_path, name))
+
+        with self._lock:
+            for name in stage.outputs:
+                self._values[name] = outputs[name]
+                artifacts[name] = content_hash(outputs[name])
+            manifest["stages"][stage.name] = {"key": key, "seconds": round(seconds, 3)}
+        self.logger.info(self.CLASS_NAME, "_run_stage", f"Stage {stage.name} ran in {seconds:.2f}s.")
+        return "ran"
+
+    def _value(self, name: str, manifest: dict[str, dict], force: bool) -> Any:
+        """In-memory value of artifact *name*, read from the cache or recomputed after a skip."""
+        with self._lock:
+            if name in self._values:
+                return self._values[name]
+        producer: Stage = self.stages[self.producers[name]]
+        stem: str = os.path.join(self.cache_path, name)
+        if name in producer.persist and self.storage.exists(stem):
+            value: Any = self.storage.read(stem)
+            with self._lock:
+                self._values[name] = value
+            return value
+        # Not kept anywhere: rerun the producer that was skipped
+        self.logger.info(self.CLASS_NAME, "_value", f"Recomputing {name} from stage {producer.name}.")
+        self._run_stage(producer, manifest, force=True)
+        with self._lock:
+            return self._values[name]
+
+    def _stage_key(self, stage: Stage, artifacts: dict[str, str]) -> str:
+        """Hash of the stage identity and its input artifacts' content hashes."""
+        digest = hashlib.sha256(f"{stage.name}:{stage.version}".encode("utf-8"))
+        for name in stage.inputs:
+            digest.update(f"{name}={artifacts.get(name, '')}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _topological_order(self) -> list[str]:
+        order: list[str] = []
+        state: dict[str, str] = {}
+
+        def visit(name: str) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle through stage {name}")
+            state[name] = "visiting"
+            for parent in sorted(self.upstream(name)):
+                visit(parent)
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    # ------------------------------------------------------------------
+    # Manifest I/O
+    # ------------------------------------------------------------------
+    def _load_manifest(self) -> dict[str, dict]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _save_manifest(self, manifest: dict[str, dict]) -> None:
+        tmp_path: str = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
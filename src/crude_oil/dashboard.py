@@ -2,90 +2,229 @@
 
 This module generates a static dashboard using Matplotlib to visualize key
 indicators related to crude-oil pricing. Charts and KPIs are saved to the
-static folder.
+static folder. Charts are declared as ChartSpec objects and drawn by the
+RenderEngine, which skips charts whose data did not change. KPIs come from
+the KpiEngine's running state, so only new raw bars are read.
 """
 
 from __future__ import annotations
 
-from typing import Final
+from typing import Any, Final
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import os
 
+from features import FEATURE_REGISTRY
+from kpi import KpiEngine
+from logger import Logger
+from metrics import INSTRUMENTATION
+from modeller import Modeller
+from registry import ModelRegistry
+from render import ChartSpec, RenderEngine
+from schema import RAW_SCHEMA
+from store import PartitionedStore
+
 
 class Dashboard:
     CLASS_NAME: Final[str] = "Dashboard"
-    DATA_PATH: Final[str] = "src/crude_oil/static/data/crude_oil_enriched.csv"
+    DATA_STORE_PATH: Final[str] = "src/crude_oil/static/data/enriched"
+    RAW_STORE_PATH: Final[str] = "src/crude_oil/static/data/raw"
     OUTPUT_FOLDER: Final[str] = "src/crude_oil/static/dashboard"
+    # Windows of the close-price moving averages declared in the feature registry
+    WINDOWS: Final[list[int]] = [
+        int(spec.params["window"]) for spec in FEATURE_REGISTRY.specs.values()
+        if spec.kind == "rolling_mean" and spec.inputs == ("close",)
+    ]
+    COLUMNS: Final[list[str]] = list(dict.fromkeys([
+        "date", "close", "log_return", "target", *Modeller.FEATURES,
+        *(f"rolling_{stat}_{window}" for window in WINDOWS for stat in ("mean", "std")),
+    ]))
 
-    def __init__(self) -> None:
+    def __init__(self, logger: Logger, max_workers: int | None = None) -> None:
+        self.logger: Logger = logger
         self.data: pd.DataFrame = pd.DataFrame()
-        os.makedirs(self.OUTPUT_FOLDER, exist_ok=True)
+        self.data_store: PartitionedStore = PartitionedStore(
+            root=self.DATA_STORE_PATH, name="crude_oil_enriched", logger=logger, schema=RAW_SCHEMA
+        )
+        self.raw_store: PartitionedStore = PartitionedStore(
+            root=self.RAW_STORE_PATH, name="crude_oil", logger=logger, schema=RAW_SCHEMA
+        )
+        self.registry: ModelRegistry = ModelRegistry(logger)
+        self.engine: RenderEngine = RenderEngine(self.OUTPUT_FOLDER, logger, max_workers=max_workers)
+        self.kpi_engine: KpiEngine = KpiEngine(logger)
 
-    def run(self) -> None:
-        """Generate static visual dashboard and save charts and KPIs to disk."""
-        self.data = self._load_data()
-        if self.data.empty:
-            print("[Dashboard] Dataset is empty. Dashboard not generated.")
-            return
+    def run(
+        self,
+        dataset: pd.DataFrame | None = None,
+        model_version: str | None = None,
+        residuals: bool = True,
+    ) -> None:
+        """Generate static visual dashboard and save charts and KPIs to disk.
+
+        An in-memory enriched *dataset* replaces the read of the store; the
+        residuals use *model_version* of the model (the latest by default).
+        Without *residuals* the model is not touched, so the charts can be
+        drawn while it trains (see :meth:`run_residuals`).
+        """
+        with INSTRUMENTATION.stage("dashboard", self.CLASS_NAME) as probe:
+            self.data = self._dataset(dataset)
+            probe.add_rows(rows_in=len(self.data))
+            if self.data.empty:
+                print("[Dashboard] Dataset is empty. Dashboard not generated.")
+                return
+
+            kpis = self._compute_kpis()
+            self._save_kpis_table(kpis)
+            self._save_window_table()
+            specs: list[ChartSpec] = self.chart_specs(self.data, model_version, residuals=residuals)
+            self._render(specs, probe)
+
+    def run_residuals(self, dataset: pd.DataFrame | None = None, model_version: str | None = None) -> None:
+        """Render only the residual chart of *model_version* (the latest by default)."""
+        with INSTRUMENTATION.stage("dashboard_residuals", self.CLASS_NAME) as probe:
+            data: pd.DataFrame = self._dataset(dataset)
+            probe.add_rows(rows_in=len(data))
+            if data.empty:
+                print("[Dashboard] Dataset is empty. Residual chart not generated.")
+                return
+            self._render(self._residual_specs(data, model_version), probe)
+
+    def _dataset(self, dataset: pd.DataFrame | None) -> pd.DataFrame:
+        return self._load_data() if dataset is None else dataset[self.COLUMNS].reset_index(drop=True)
+
+    def _render(self, specs: list[ChartSpec], probe: Any) -> None:
+        status: dict[str, str] = self.engine.render(specs)
+        rendered: list[str] = [name for name, state in status.items() if state == "rendered"]
+        probe.extra.update(charts=len(status), charts_rendered=len(rendered))
+        print(f"[Dashboard] {len(rendered)} of {len(status)} charts rendered to: {self.OUTPUT_FOLDER}")
+
+    def chart_specs(
+        self,
+        df: pd.DataFrame,
+        model_version: str | None = None,
+        residuals: bool = True,
+    ) -> list[ChartSpec]:
+        """Every dashboard chart: price, log return, one per window, one per symbol and residuals."""
+        specs: list[ChartSpec] = [
+            ChartSpec(
+                name="close_price_chart",
+                title="Evolución del Precio de Cierre",
+                data=df,
+                series=(("close", "Precio de Cierre", None),),
+                ylabel="Precio",
+            ),
+            ChartSpec(
+                name="log_return_chart",
+                title="Retorno Logarítmico Diario",
+                data=df,
+                series=(("log_return", "Retorno Logarítmico Diario", "orange"),),
+                ylabel="Log Return",
+                hline=0.0,
+                decimation="minmax",
+            ),
+        ]
+        for window in self.WINDOWS:
+            mean, std = df[f"rolling_mean_{window}"], df[f"rolling_std_{window}"]
+            specs.append(ChartSpec(
+                name=f"rolling_mean_{window}_chart",
+                title=f"Media Móvil {window} días ± 1 desviación",
+                data=pd.DataFrame({"date": df["date"], "close": df["close"], "mean": mean,
+                                   "low": mean - std, "high": mean + std}),
+                series=(("close", "Precio de Cierre", "lightgrey"), ("mean", f"Media {window} días", None)),
+                ylabel="Precio",
+                band=("low", "high"),
+            ))
+        specs.extend(self._symbol_specs())
+        if residuals:
+            specs.extend(self._residual_specs(df, model_version))
+        return specs
 
-        kpis = self._compute_kpis(self.data)
-        self._save_kpis_table(kpis)
-        self._save_price_chart(self.data)
-        self._save_log_return_chart(self.data)
+    def _residual_specs(self, df: pd.DataFrame, model_version: str | None = None) -> list[ChartSpec]:
+        residuals: pd.DataFrame = self._residuals(df, model_version)
+        if residuals.empty:
+            return []
+        return [ChartSpec(
+            name="model_residuals_chart",
+            title="Residuos del Modelo (real − predicción)",
+            data=residuals,
+            series=(("residual", "Residuo", "purple"),),
+            ylabel="Precio",
+            hline=0.0,
+            decimation="minmax",
+        )]
+
+    def _symbol_specs(self) -> list[ChartSpec]:
+        """One close-price chart per raw symbol; only symbols whose partitions changed are read."""
+        try:
+            specs: dict[str, ChartSpec] = {
+                symbol: ChartSpec(
+                    name=f"close_price_chart_{ModelRegistry.safe_name(symbol)}",
+                    title=f"Precio de Cierre – {symbol}",
+                    data=pd.DataFrame(),
+                    series=(("close", "Precio de Cierre", None),),
+                    ylabel="Precio",
+                    source=self.raw_store.fingerprint(symbol),
+                )
+                for symbol in self.raw_store.symbols()
+            }
+            # Charts drawn from the current partitions are skipped by the engine without their data
+            changed: set[str] = {spec.name for spec in self.engine.stale(list(specs.values()))}
+            stale: list[str] = [symbol for symbol, spec in specs.items() if spec.name in changed]
+            raw: pd.DataFrame = self.raw_store.load(columns=["close"], symbols=stale) if stale else pd.DataFrame()
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "_symbol_specs", f"Error loading raw data: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._symbol_specs: {error}")
+            return []
+        if not raw.empty:
+            for symbol, group in raw.groupby(raw["symbol"].astype(str), sort=True):
+                specs[symbol].data = group.reset_index(drop=True)
+        return [spec for symbol, spec in specs.items() if symbol not in stale or not spec.data.empty]
+
+    def _residuals(self, df: pd.DataFrame, model_version: str | None = None) -> pd.DataFrame:
+        """Target minus the prediction of *model_version* (the latest registered one by default), per date."""
+        version: str | None = model_version or self.registry.latest(Modeller.MODEL_KEY)
+        model: Any = self.registry.load(Modeller.MODEL_KEY, version) if version else None
+        if model is None:
+            return pd.DataFrame()
+        try:
+            predictions = model.predict(df[Modeller.FEATURES])
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "_residuals", f"Prediction error: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._residuals: {error}")
+            return pd.DataFrame()
+        return pd.DataFrame({"date": df["date"], "residual": df[Modeller.TARGET] - predictions})
 
     def _load_data(self) -> pd.DataFrame:
         try:
-            df: pd.DataFrame = pd.read_csv(self.DATA_PATH)
-            df["date"] = pd.to_datetime(df["date"])
-            df = df.sort_values("date")
-            return df
-        except Exception:
+            # The store keeps parsed dates in chronological order
+            return self.data_store.load(columns=self.COLUMNS, symbols=[Modeller.SYMBOL])
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "_load_data", f"Error loading enriched data: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._load_data: {error}")
             return pd.DataFrame()
 
-    def _compute_kpis(self, df: pd.DataFrame) -> dict[str, float]:
-        return {
-            "Tasa de Variación (%)": ((df["close"].iloc[-1] - df["close"].iloc[-2]) / df["close"].iloc[-2]) * 100,
-            "Media Móvil 7 días": df["rolling_mean_7"].iloc[-1],
-            "Volatilidad 7 días": df["rolling_std_7"].iloc[-1],
-            "Retorno Acumulado (%)": ((df["close"].iloc[-1] / df["close"].iloc[0]) - 1) * 100,
-            "Desviación Estándar Precio": df["close"].std(),
-        }
+    def _compute_kpis(self) -> dict[str, float]:
+        """Whole-history KPIs of the modelled symbol, after folding in new raw bars."""
+        self.kpi_engine.refresh(self.raw_store)
+        return KpiEngine.labelled(self.kpi_engine.kpis(Modeller.SYMBOL))
 
     def _save_kpis_table(self, kpis: dict[str, float]) -> None:
         df_kpis = pd.DataFrame(kpis.items(), columns=["Indicador", "Valor"])
         output_path = os.path.join(self.OUTPUT_FOLDER, "kpis.csv")
         df_kpis.to_csv(output_path, index=False)
+        INSTRUMENTATION.record_written(os.path.getsize(output_path))
         print(f"[Dashboard] KPIs saved to: {output_path}")
 
-    def _save_price_chart(self, df: pd.DataFrame) -> None:
-        plt.figure(figsize=(10, 4))
-        plt.plot(df["date"], df["close"], label="Precio de Cierre")
-        plt.title("Evolución del Precio de Cierre")
-        plt.xlabel("Fecha")
-        plt.ylabel("Precio")
-        plt.grid(True)
-        plt.tight_layout()
-        output_path = os.path.join(self.OUTPUT_FOLDER, "close_price_chart.png")
-        plt.savefig(output_path)
-        plt.close()
-        print(f"[Dashboard] Precio de cierre chart saved to: {output_path}")
-
-    def _save_log_return_chart(self, df: pd.DataFrame) -> None:
-        plt.figure(figsize=(10, 4))
-        plt.plot(df["date"], df["log_return"], label="Retorno Logarítmico Diario", color="orange")
-        plt.title("Retorno Logarítmico Diario")
-        plt.xlabel("Fecha")
-        plt.ylabel("Log Return")
-        plt.grid(True)
-        plt.tight_layout()
-        output_path = os.path.join(self.OUTPUT_FOLDER, "log_return_chart.png")
-        plt.savefig(output_path)
-        plt.close()
-        print(f"[Dashboard] Log return chart saved to: {output_path}")
+    def _save_window_table(self) -> None:
+        """KPIs of every symbol over the YTD, 1Y, 5Y and full-history windows."""
+        table: pd.DataFrame = self.kpi_engine.window_table()
+        if table.empty:
+            return
+        output_path = os.path.join(self.OUTPUT_FOLDER, "kpis_windows.csv")
+        table.rename(columns=KpiEngine.LABELS).to_csv(output_path, index=False)
+        INSTRUMENTATION.record_written(os.path.getsize(output_path))
+        print(f"[Dashboard] Window KPIs saved to: {output_path}")
 
 
 # Optional script entry point
 if __name__ == "__main__":
-    Dashboard().run()
+    Dashboard(Logger()).run()
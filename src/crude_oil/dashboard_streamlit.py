@@ -1,45 +1,122 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
 import os
+from io import BytesIO
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
-# Cargar datos
-DATA_PATH = "src/crude_oil/static/data/crude_oil_enriched.csv"
-df = pd.read_csv(DATA_PATH)
-df["date"] = pd.to_datetime(df["date"])
+from downsample import SeriesPyramid
+from kpi import KpiEngine
+from logger import Logger
+from schema import RAW_SCHEMA
+from store import PartitionedStore
+
+# Datos: el almacén crudo (todos los símbolos); solo se leen las columnas que usa el tablero
+DATA_STORE_PATH = "src/crude_oil/static/data/raw"
+COLUMNS = ["date", "close"]
+DEFAULT_SYMBOL = "CL=F"
+# Puntos máximos por gráfico; la pirámide elige el nivel de agregación y LTTB recorta el resto
+MAX_POINTS = 1_000
+
+
+def store_signature(root: str) -> str:
+    """Huella del almacén (mtime + tamaño del manifest): cambia con cada escritura."""
+    stat = os.stat(os.path.join(root, PartitionedStore.MANIFEST_NAME))
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+@st.cache_resource(show_spinner="Cargando datos…", max_entries=1)
+def load_pyramid(signature: str) -> SeriesPyramid:
+    """Lee el almacén y precalcula los niveles de zoom; se comparte entre sesiones hasta que cambie *signature*."""
+    store = PartitionedStore(root=DATA_STORE_PATH, name="crude_oil", logger=Logger(), schema=RAW_SCHEMA)
+    # Precios float32 del almacén como su valor decimal (37.41, no 37.40999984741211)
+    return SeriesPyramid(RAW_SCHEMA.widen(store.load(columns=COLUMNS)))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_kpis(signature: str) -> KpiEngine:
+    """Estado de KPIs compartido; al cambiar *signature* solo se leen las barras nuevas.
+
+    El estado guardado por el pipeline se abre en solo lectura: las barras que
+    aún no recoge se suman en memoria y los ficheros de kpi_state no se tocan.
+    """
+    logger = Logger()
+    engine = KpiEngine(logger, read_only=True)
+    engine.refresh(PartitionedStore(root=DATA_STORE_PATH, name="crude_oil", logger=logger, schema=RAW_SCHEMA))
+    return engine
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def compute_kpis(signature: str, symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> dict[str, float]:
+    return load_kpis(signature).kpis(symbol, start, end)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def render_chart(signature: str, symbol: str, start: pd.Timestamp, end: pd.Timestamp, column: str) -> tuple[bytes, str]:
+    """PNG del gráfico de *column* (API orientada a objetos de Agg) y el nivel de agregación usado."""
+    level, rows = load_pyramid(signature).query(symbol, start, end, MAX_POINTS)
+    fig = Figure(figsize=(10, 4))
+    ax = fig.add_subplot()
+    if column == "close":
+        ax.plot(rows["date"], rows["close"], label="Precio de cierre")
+        if level != "raw":
+            ax.fill_between(rows["date"], rows["low"], rows["high"], alpha=0.2, label="Mínimo / máximo")
+        ax.set_ylabel("Precio")
+    else:
+        ax.plot(rows["date"], rows["log_return"], color="orange", label="Retorno Logarítmico")
+        ax.set_ylabel("Log Return")
+    ax.set_xlabel("Fecha")
+    ax.grid(True)
+    fig.tight_layout()
+    buffer = BytesIO()
+    FigureCanvasAgg(fig).print_png(buffer)
+    return buffer.getvalue(), level
+
+
+signature = store_signature(DATA_STORE_PATH)
+pyramid = load_pyramid(signature)
+
+# Selectores
+symbols = pyramid.symbols
+symbol = st.sidebar.selectbox("Símbolo", symbols, index=symbols.index(DEFAULT_SYMBOL) if DEFAULT_SYMBOL in symbols else 0)
+first_date, last_date = pyramid.date_range(symbol)
+selected = st.sidebar.date_input(
+    "Rango de fechas",
+    value=(first_date.date(), last_date.date()),
+    min_value=first_date.date(),
+    max_value=last_date.date(),
+)
+start_date, end_date = selected if len(selected) == 2 else (selected[0], last_date.date())
+start = pd.Timestamp(start_date)
+end = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
 
 # KPIs
 st.title(" Precio del Petróleo")
 
 st.subheader("Indicadores Clave (KPIs)")
+kpis = compute_kpis(signature, symbol, start, end)
+if not kpis:
+    st.warning("El rango seleccionado no tiene suficientes datos.")
+    st.stop()
 col1, col2, col3 = st.columns(3)
 
-tasa_variacion = ((df["close"].iloc[-1] - df["close"].iloc[-2]) / df["close"].iloc[-2]) * 100
-media_movil = df["rolling_mean_7"].iloc[-1]
-volatilidad = df["rolling_std_7"].iloc[-1]
-retorno_acum = ((df["close"].iloc[-1] / df["close"].iloc[0]) - 1) * 100
+col1.metric("Tasa de variación (%)", f"{kpis['tasa_variacion']:.2f}")
+col2.metric("Media móvil 7 días", f"{kpis['media_movil']:.2f}")
+col3.metric("Volatilidad 7 días", f"{kpis['volatilidad']:.2f}")
 
-col1.metric("Tasa de variación (%)", f"{tasa_variacion:.2f}")
-col2.metric("Media móvil 7 días", f"{media_movil:.2f}")
-col3.metric("Volatilidad 7 días", f"{volatilidad:.2f}")
+st.metric("Retorno acumulado (%)", f"{kpis['retorno_acumulado']:.2f}")
 
-st.metric("Retorno acumulado (%)", f"{retorno_acum:.2f}")
+# KPIs por ventana (YTD, 1 año, 5 años, histórico), leídos de las sumas prefijas
+st.subheader("KPIs por Ventana")
+windows = load_kpis(signature).window_table([symbol])
+st.dataframe(windows.drop(columns="symbol").rename(columns=KpiEngine.LABELS).set_index("window"))
 
 # Gráfico de precios
 st.subheader("Evolución del Precio de Cierre")
-fig1, ax1 = plt.subplots()
-ax1.plot(df["date"], df["close"], label="Precio de cierre")
-ax1.set_xlabel("Fecha")
-ax1.set_ylabel("Precio")
-ax1.grid(True)
-st.pyplot(fig1)
+png, level = render_chart(signature, symbol, start, end, "close")
+st.image(png, caption=f"Nivel de agregación: {level}")
 
 # Gráfico de retornos logarítmicos
 st.subheader("Retorno Logarítmico Diario")
-fig2, ax2 = plt.subplots()
-ax2.plot(df["date"], df["log_return"], color="orange", label="Retorno Logarítmico")
-ax2.set_xlabel("Fecha")
-ax2.set_ylabel("Log Return")
-ax2.grid(True)
-st.pyplot(fig2)
+png, level = render_chart(signature, symbol, start, end, "log_return")
+st.image(png, caption=f"Nivel de agregación: {level}")
@@ -0,0 +1,159 @@
+"""Downsample module.
+
+This module reduces long price series to what a chart can actually show.
+It provides two point-selection algorithms (Largest-Triangle-Three-Buckets
+and per-bucket min/max) and the SeriesPyramid class, which precomputes one
+aggregated copy of every symbol's series per zoom level (raw, daily, weekly,
+monthly, quarterly). A date-range query picks the finest level that fits
+the point budget, so charts never touch the full history.
+"""
+
+from __future__ import annotations
+
+from typing import Final, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of *threshold* points chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    selected point and the average of the next bucket.
+    """
+    n: int = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    edges: np.ndarray = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected: np.ndarray = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor: int = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start: int = edges[bucket + 1]
+        next_end: int = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        mean_x: float = x[next_start:next_end].mean()
+        mean_y: float = y[next_start:next_end].mean()
+        area: np.ndarray = np.abs(
+            (x[anchor] - mean_x) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (mean_y - y[anchor])
+        )
+        anchor = int(start + np.argmax(area))
+        selected[bucket + 1] = anchor
+    return selected
+
+
+def minmax(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Sorted indices of the minimum and maximum of *y* in each of *buckets* equal slices.
+
+    Keeps every spike, which LTTB can smooth away on very noisy series.
+    """
+    n: int = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    bucket_ids: np.ndarray = np.arange(n) * buckets // n
+    order: np.ndarray = np.lexsort((y, bucket_ids))
+    starts: np.ndarray = np.searchsorted(bucket_ids[order], np.arange(buckets))
+    ends: np.ndarray = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+class SeriesPyramid:
+    """Per-symbol close/log-return series pre-aggregated at several zoom levels."""
+
+    DATE_COLUMN: Final[str] = "date"
+    SYMBOL_COLUMN: Final[str] = "symbol"
+    # Finest first; None is the stored resolution (daily today, intraday later)
+    LEVELS: Final[tuple[Optional[str], ...]] = (None, "D", "W", "ME", "QE")
+    # A level is used while it has at most this many times the point budget;
+    # LTTB then trims it to the budget
+    OVERSAMPLING: Final[int] = 4
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        """Build every level from a long frame with ``date``, ``close`` and optionally ``symbol``."""
+        if self.SYMBOL_COLUMN not in df.columns:
+            df = df.assign(**{self.SYMBOL_COLUMN: ""})
+        self.levels: dict[str, list[tuple[str, pd.DataFrame]]] = {}
+        for symbol, series in df.groupby(df[self.SYMBOL_COLUMN].astype(str), sort=True):
+            self.levels[symbol] = self._build_levels(series)
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self.levels)
+
+    def date_range(self, symbol: str) -> tuple[pd.Timestamp, pd.Timestamp]:
+        raw: pd.DataFrame = self.levels[symbol][0][1]
+        return raw[self.DATE_COLUMN].iloc[0], raw[self.DATE_COLUMN].iloc[-1]
+
+    def raw(self, symbol: str, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Stored-resolution rows of *symbol* between *start* and *end* (inclusive)."""
+        return self._slice(self.levels[symbol][0][1], start, end)
+
+    def query(
+        self,
+        symbol: str,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+        max_points: int = 1_000,
+        method: str = "lttb",
+    ) -> tuple[str, pd.DataFrame]:
+        """Return (level name, rows) for a chart of *symbol* with at most *max_points* points.
+
+        *method* ("lttb" or "minmax") decides which rows survive when the
+        chosen level still has more rows than the budget.
+        """
+        levels: list[tuple[str, pd.DataFrame]] = self.levels[symbol]
+        name, rows = levels[-1][0], self._slice(levels[-1][1], start, end)
+        for level_name, level in levels:
+            candidate: pd.DataFrame = self._slice(level, start, end)
+            if len(candidate) <= max_points * self.OVERSAMPLING:
+                name, rows = level_name, candidate
+                break
+        if len(rows) > max_points:
+            close: np.ndarray = rows["close"].to_numpy(dtype=float)
+            if method == "minmax":
+                keep: np.ndarray = minmax(close, max_points // 2)
+            else:
+                dates: np.ndarray = rows[self.DATE_COLUMN].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+                keep = lttb(dates, close, max_points)
+            rows = rows.iloc[keep]
+        return name, rows.reset_index(drop=True)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _build_levels(self, series: pd.DataFrame) -> list[tuple[str, pd.DataFrame]]:
+        series = series.sort_values(self.DATE_COLUMN).dropna(subset=["close"])
+        close: np.ndarray = series["close"].to_numpy(dtype=float)
+        raw: pd.DataFrame = pd.DataFrame({
+            self.DATE_COLUMN: series[self.DATE_COLUMN].to_numpy(),
+            "close": close,
+            "low": close,
+            "high": close,
+            "log_return": np.concatenate([[np.nan], np.diff(np.log(close))]),
+        })
+
+        levels: list[tuple[str, pd.DataFrame]] = [("raw", raw)]
+        for rule in self.LEVELS[1:]:
+            level: pd.DataFrame = (
+                raw.resample(rule, on=self.DATE_COLUMN)
+                .agg({"close": "last", "low": "min", "high": "max", "log_return": "sum"})
+                .dropna(subset=["close"])
+                .reset_index()
+            )
+            # Daily bars of daily data add nothing
+            if len(level) < len(levels[-1][1]):
+                levels.append((rule, level))
+        return levels
+
+    def _slice(self, level: pd.DataFrame, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> pd.DataFrame:
+        """Rows between *start* and *end* by binary search on the sorted dates."""
+        dates: np.ndarray = level[self.DATE_COLUMN].to_numpy()
+        first: int = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start), side="left"))
+        last: int = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end), side="right"))
+        return level.iloc[first:last]
@@ -2,18 +2,46 @@
 
 This module provides the Enricher class, responsible for taking raw crude‐oil
 price data and generating an enriched dataset with additional engineered
-features.
+features. The features themselves are declared in ``features.py``.
+
+Enrichment is incremental: the last enriched rows of the previous run (with
+the engine's running sums) are kept as state, so a run only computes features
+for dates appended since then and backfills the ``target`` of the row that was
+pending the next close.
+
+Bars need not be daily. With a bar frequency ("h", "D", ...) the raw bars
+(e.g. minute bars) are aggregated to it on the fly and the features use
+time-based windows. The last bar may still be open, so it is rebuilt on the
+next run, and the bar before it (whose target is that close) is published
+only once a later bar exists: published rows are never rewritten. Full
+runs read and enrich the raw store one partition at a time, carrying the
+same state between chunks as between runs, so memory stays bounded by one
+year of bars.
+
+Features never mix symbols, so ``enrich_symbols`` shards a multi-symbol
+store by symbol across a process pool. Each worker memory-maps only its own
+raw partitions (nothing is pickled to it) and writes its own enriched
+partitions and state; the parent then commits every shard's manifest
+entries at once.
 """
 
 from __future__ import annotations
 
 import os
-from typing import Final
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Final, Iterator, Optional
 
 import numpy as np
 import pandas as pd
 
+from bars import DAY, bar_length, resample_ohlcv
+from features import FEATURE_REGISTRY, FeatureEngine, FeatureRegistry, build_default_registry
 from logger import Logger
+from metrics import INSTRUMENTATION
+from storage import CsvStorage, Storage
+from schema import RAW_SCHEMA
+from store import PartitionedStore
 
 
 class Enricher:
@@ -22,31 +50,201 @@ class Enricher:
     # ------------------------------------------------------------------
     # File system constants
     # ------------------------------------------------------------------
-    RAW_DATA_PATH: Final[str] = "src/crude_oil/static/data/crude_oil.csv"
+    RAW_STORE_PATH: Final[str] = "src/crude_oil/static/data/raw"
+    ENRICHED_STORE_PATH: Final[str] = "src/crude_oil/static/data/enriched"
+    # Human-readable export of the enriched dataset (the store is the source of truth)
     ENRICHED_DATA_PATH: Final[str] = "src/crude_oil/static/data/crude_oil_enriched.csv"
+    EXPORT_CSV: bool = True
+    STATE_NAME: Final[str] = "enricher_state"
+    # Symbol whose history is enriched and modelled
+    SYMBOL: Final[str] = "CL=F"
+    # Bar frequency of the enriched data ("min", "h", "D", ...); None keeps the raw bars as stored
+    BAR_FREQUENCY: Optional[str] = os.environ.get("CRUDE_OIL_BAR_FREQUENCY") or None
+    FREQ_COLUMN: Final[str] = "_freq"
 
-    def __init__(self, logger: Logger) -> None:
-        """Instantiate an Enricher and ensure output folder exists."""
+    # Rows missing any of these are not published (the rest may be NaN early on)
+    TARGET: Final[str] = "target"
+
+    def __init__(self, logger: Logger, freq: Optional[str] = BAR_FREQUENCY, symbol: str = SYMBOL) -> None:
+        """Instantiate an Enricher of *symbol* for bars of *freq* and ensure output folder exists."""
+        if freq is not None and bar_length(freq) > DAY:
+            raise ValueError(f"Bar frequency {freq!r} is longer than a day")
         self.logger: Logger = logger
+        self.freq: Optional[str] = freq
+        self.symbol: str = symbol
+        # Only the modelled symbol gets the human-readable CSV export
+        self.export_csv: bool = self.EXPORT_CSV and symbol == self.SYMBOL
         self._verify_folder(os.path.dirname(self.ENRICHED_DATA_PATH))
+        self.raw_store: PartitionedStore = PartitionedStore(
+            root=self.RAW_STORE_PATH, name="crude_oil", logger=self.logger, schema=RAW_SCHEMA
+        )
+        self.enriched_store: PartitionedStore = PartitionedStore(
+            root=self.ENRICHED_STORE_PATH, name="crude_oil_enriched", logger=self.logger, schema=RAW_SCHEMA
+        )
+        self.state_storage: Storage = self.enriched_store.storage
+        suffix: str = "" if symbol == self.SYMBOL else "_" + "".join(char if char.isalnum() else "_" for char in symbol)
+        self.state_stem: str = os.path.join(self.ENRICHED_STORE_PATH, f"{self.STATE_NAME}{suffix}")
+        self.registry: FeatureRegistry = FEATURE_REGISTRY if freq is None else build_default_registry(freq)
+        self.engine: FeatureEngine = FeatureEngine(self.registry)
+        self.required_columns: list[str] = [*self.registry.model_features(), self.TARGET]
+        # Trailing bars held back from publishing: the last one lacks its target and, with
+        # aggregated bars, the one before it too, since the last bar may still be open and
+        # its close (that bar's target) may change. Published rows are never rewritten.
+        self.pending_bars: int = 1 if freq is None else 2
 
 
-    def enrich(self) -> pd.DataFrame:
-        """Load raw data, engineer features, persist, and return DataFrame."""
-        df: pd.DataFrame = self._load_raw_data()
-        if df.empty:
+    def enrich(
+        self,
+        full: bool = False,
+        new_rows: pd.DataFrame | None = None,
+        since: pd.Timestamp | None = None,
+    ) -> pd.DataFrame:
+        """Engineer features for new raw rows, persist, and return them.
+
+        Without saved state (or with *full*) the whole raw history is
+        recomputed and the enriched store is rewritten. Raw rows revised in
+        place for dates that were already enriched need a *full* run.
+        When the caller already holds every raw row dated after *since*
+        (e.g. the rows it just collected), passing them as *new_rows*
+        replaces the incremental read of the raw store; they are ignored if
+        the saved state is older than *since*, and when bars are aggregated
+        (the last bar is rebuilt from every raw bar in its bin).
+        """
+        with INSTRUMENTATION.stage("enrich", self.CLASS_NAME) as probe:
+            state: pd.DataFrame = pd.DataFrame()
+            if not full and not self.enriched_store.is_empty():
+                state = self._load_state()
+            if not state.empty and not self._state_is_compatible(state):
+                self.logger.info(self.CLASS_NAME, "enrich", "Feature set changed since last run – recomputing.")
+                state = pd.DataFrame()
+            if state.empty:
+                df: pd.DataFrame = self._enrich_full()
+            else:
+                if new_rows is not None and (self.freq is not None or since is None or state["date"].max() < since):
+                    new_rows = None
+                df = self._enrich_incremental(state, new_rows)
+            probe.add_rows(rows_out=len(df))
+            return df
+
+    def enrich_symbols(
+        self,
+        symbols: Optional[list[str]] = None,
+        full: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Enrich every symbol of the raw store (or *symbols*), one process per shard.
+
+        Returns one row per symbol with the rows published, the worker's wall
+        time and whether it succeeded. Failed shards keep their previous
+        manifest entries.
+        """
+        symbols = symbols if symbols is not None else self.raw_store.symbols()
+        results: list[dict] = []
+        with INSTRUMENTATION.stage("enrich_symbols", self.CLASS_NAME) as probe:
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=Logger.configure_worker,
+                initargs=Logger.worker_initargs(),
+            ) as pool:
+                futures = {symbol: pool.submit(_enrich_shard, symbol, self.freq, full) for symbol in symbols}
+                entries: dict[str, dict] = {}
+                for symbol, future in futures.items():
+                    try:
+                        result, shard_entries = future.result()
+                    except Exception as error:  # noqa: BLE001
+                        self.logger.error(self.CLASS_NAME, "enrich_symbols", f"Enriching {symbol} failed: {error}")
+                        results.append({"symbol": symbol, "rows": 0, "seconds": None, "ok": False})
+                        continue
+                    if result["ok"]:
+                        entries.update(shard_entries)
+                    results.append(result)
+            done: list[str] = [result["symbol"] for result in results if result["ok"]]
+            self.enriched_store.merge_manifest(entries, done)
+            probe.add_rows(rows_out=sum(result["rows"] for result in results))
+            probe.extra.update({"symbols": len(symbols), "failed": len(symbols) - len(done)})
+
+        self.logger.info(
+            self.CLASS_NAME,
+            "enrich_symbols",
+            f"{len(done)}/{len(symbols)} symbols enriched with up to {max_workers or os.cpu_count()} workers.",
+        )
+        return pd.DataFrame(results)
+
+    def dataset(self) -> pd.DataFrame:
+        """Return the whole enriched dataset of the symbol from the store."""
+        try:
+            return self.enriched_store.load(symbols=[self.symbol])
+        except Exception as error:
+            self.logger.error(self.CLASS_NAME, "dataset", f"Failed to load enriched dataset: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}.dataset: {error}")
+            return pd.DataFrame()
+
+    def _enrich_full(self) -> pd.DataFrame:
+        """Recompute every feature over the whole raw history, one raw partition at a time."""
+        state: Optional[pd.DataFrame] = None
+        published: list[pd.DataFrame] = []
+        for raw in self._raw_chunks():
+            INSTRUMENTATION.add_rows(rows_in=len(raw))
+            df: pd.DataFrame = self._add_features(raw, state)
+            if df.empty:
+                return df
+            carried: int = 0 if state is None else len(state)
+            state = self.engine.state_tail(df)
+            # The carried rows held back by the previous chunk are complete now
+            df = self._publishable(df.iloc[max(carried - self.pending_bars, 0):max(len(df) - self.pending_bars, 0)])
+            if not published:
+                self._save_enriched(df)
+            else:
+                self._append_enriched(df)
+            published.append(df)
+
+        if state is None:
             self.logger.error(self.CLASS_NAME, "enrich", "Raw dataset is empty – aborting.")
+            return pd.DataFrame()
+        df = pd.concat(published, ignore_index=True)
+        self.logger.info(
+            self.CLASS_NAME,
+            "enrich",
+            f"Data enriched in {len(published)} chunks. Final shape after dropna: {df.shape}",
+        )
+        self._save_state(state)
+        return df
+
+    def _enrich_incremental(self, state: pd.DataFrame, new_rows: pd.DataFrame | None = None) -> pd.DataFrame:
+        """Compute features only for raw rows newer than the saved state."""
+        last_date: pd.Timestamp = state["date"].max()
+        if self.freq is not None:
+            new_rows = self._rebuild_last_bar(state)
+            if new_rows.empty:
+                self.logger.info(self.CLASS_NAME, "enrich", f"No raw rows after {last_date} – nothing to enrich.")
+                return pd.DataFrame()
+            # The last saved bar may have been incomplete; it is replaced by its rebuilt bin
+            state = state.iloc[:-1]
+        elif new_rows is None:
+            new_rows = self._load_raw_data(after=last_date)
+        else:
+            new_rows = self._select_new_rows(new_rows, last_date)
+        INSTRUMENTATION.add_rows(rows_in=len(new_rows))
+        if new_rows.empty:
+            self.logger.info(self.CLASS_NAME, "enrich", f"No raw rows after {last_date} – nothing to enrich.")
+            return pd.DataFrame()
+
+        df: pd.DataFrame = self._add_features(new_rows[self._raw_columns(state)], state)
+        if df.empty:
             return df
+        new_state: pd.DataFrame = self.engine.state_tail(df)
 
-        df = self._add_features(df)
-        df = df.dropna()
+        # One carried row was still held back (with aggregated bars, the other one
+        # is the rebuilt last bar); it is complete now
+        df = self._publishable(df.iloc[max(len(state) - 1, 0):max(len(df) - self.pending_bars, 0)])
         self.logger.info(
             self.CLASS_NAME,
             "enrich",
-            f"Data enriched. Final shape after dropna: {df.shape}",
+            f"Incrementally enriched {len(new_rows)} new raw rows; {len(df)} rows completed.",
         )
 
-        self._save_enriched(df)
+        self._append_enriched(df)
+        self._save_state(new_state)
         return df
 
 
@@ -60,18 +258,18 @@ class Enricher:
                 f"Created missing folder at {path}",
             )
 
-    def _load_raw_data(self) -> pd.DataFrame:
-        """Read the raw CSV into a DataFrame."""
+    def _load_raw_data(self, after: pd.Timestamp | None = None) -> pd.DataFrame:
+        """Read the partitioned raw store (only rows later than *after* if given)."""
         try:
-            df: pd.DataFrame = pd.read_csv(self.RAW_DATA_PATH)
+            df: pd.DataFrame = self.raw_store.load(start=after, symbols=[self.symbol])
+            if after is not None and not df.empty:
+                df = df[df["date"] > after].reset_index(drop=True)
             self.logger.info(
                 self.CLASS_NAME,
                 "_load_raw_data",
                 f"Raw dataset loaded with shape {df.shape}",
             )
-            # Ensure date column has correct dtype and sorted order
-            df["date"] = pd.to_datetime(df["date"], errors="coerce")
-            df = df.sort_values("date")
+            # Partitions are stored in date order with parsed dates already
             return df
         except Exception as error:
             self.logger.error(
@@ -79,16 +277,64 @@ class Enricher:
                 "_load_raw_data",
                 f"Failed to load raw dataset: {error}",
             )
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._load_raw_data: {error}")
             return pd.DataFrame()
 
-    def _add_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Engineer additional columns on *df* and return it."""
+    def _raw_chunks(self) -> Iterator[pd.DataFrame]:
+        """Raw bars of the symbol, one store partition at a time, aggregated to the bar frequency.
+
+        Partitions span calendar years, so no bar of a day or shorter straddles two chunks.
+        """
         try:
-            df["day_of_week"] = df["date"].dt.dayofweek
-            df["rolling_mean_7"] = df["close"].rolling(window=7).mean()
-            df["rolling_std_7"] = df["close"].rolling(window=7).std()
-            df["log_return"] = np.log(df["close"] / df["close"].shift(1))
-            df["target"] = df["close"].shift(-1)
+            for df in self.raw_store.chunks(symbols=[self.symbol]):
+                if df.empty:
+                    continue
+                yield df if self.freq is None else resample_ohlcv(df, self.freq)
+        except Exception as error:
+            self.logger.error(self.CLASS_NAME, "_raw_chunks", f"Failed to load raw dataset: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._raw_chunks: {error}")
+
+    def _rebuild_last_bar(self, state: pd.DataFrame) -> pd.DataFrame:
+        """Bars from the last saved one onwards, aggregated from the raw store (empty if unchanged)."""
+        try:
+            raw: pd.DataFrame = self.raw_store.load(start=state["date"].iloc[-1], symbols=[self.symbol])
+        except Exception as error:
+            self.logger.error(self.CLASS_NAME, "_rebuild_last_bar", f"Failed to load raw dataset: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._rebuild_last_bar: {error}")
+            return pd.DataFrame()
+        bars: pd.DataFrame = resample_ohlcv(raw, self.freq) if not raw.empty else raw
+        columns: list[str] = ["open", "high", "low", "close", "volume"]
+        if len(bars) == 1 and np.array_equal(
+            bars[columns].to_numpy(dtype=float, na_value=np.nan),
+            state[columns].tail(1).to_numpy(dtype=float, na_value=np.nan),
+            equal_nan=True,
+        ):
+            return pd.DataFrame()
+        return bars
+
+    def _select_new_rows(self, df: pd.DataFrame, after: pd.Timestamp) -> pd.DataFrame:
+        """Rows of the enriched symbol in an in-memory raw frame, dated after *after*."""
+        if df.empty:
+            return df
+        df = RAW_SCHEMA.enforce(df, check_required=False)
+        if "symbol" in df.columns:
+            df = df[df["symbol"].astype(str) == self.symbol]
+        df = df[df["date"] > after].drop_duplicates(subset="date", keep="last")
+        return df.sort_values("date").reset_index(drop=True)
+
+    def _add_features(self, df: pd.DataFrame, state: pd.DataFrame | None = None) -> pd.DataFrame:
+        """Engineer the registry's features on *df* (after *state*) and return the combined frame."""
+        try:
+            # Compact float32 prices would leak their rounding error into every feature and the target
+            if state is not None:
+                state = RAW_SCHEMA.widen(state)
+            df, skipped = self.engine.compute(RAW_SCHEMA.widen(df), state)
+            if skipped:
+                self.logger.warning(
+                    self.CLASS_NAME,
+                    "_add_features",
+                    f"Skipped features with missing inputs: {skipped}",
+                )
             self.logger.info(self.CLASS_NAME, "_add_features", "Feature engineering complete.")
             return df
         except Exception as error:
@@ -97,20 +343,111 @@ class Enricher:
                 "_add_features",
                 f"Error during feature engineering: {error}",
             )
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._add_features: {error}")
             return pd.DataFrame()
 
+    def _publishable(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Drop engine state columns and rows lacking a model input or the target."""
+        df = df.drop(columns=self.engine.hidden_columns(df))
+        return df.dropna(subset=self.required_columns)
+
+    def _raw_columns(self, state: pd.DataFrame) -> list[str]:
+        return [
+            column for column in state.columns
+            if column not in self.registry.specs and not column.startswith("_")
+        ]
+
+    def _state_is_compatible(self, state: pd.DataFrame) -> bool:
+        """True when *state* has the current bar frequency and every feature the registry can compute."""
+        freq: str = str(state[self.FREQ_COLUMN].iloc[-1]) if self.FREQ_COLUMN in state.columns else ""
+        if freq != (self.freq or ""):
+            return False
+        specs, _ = self.engine.plan(self._raw_columns(state))
+        return self.engine.ROW_COLUMN in state.columns and all(spec.name in state.columns for spec in specs)
+
     def _save_enriched(self, df: pd.DataFrame) -> None:
-        """Persist the enriched DataFrame."""
+        """Persist the enriched DataFrame to the store and, optionally, as CSV."""
         try:
-            df.to_csv(self.ENRICHED_DATA_PATH, index=False)
+            self.enriched_store.overwrite(df, symbols=[self.symbol])
             self.logger.info(
                 self.CLASS_NAME,
                 "_save_enriched",
-                f"Enriched data saved to {self.ENRICHED_DATA_PATH}",
+                f"Enriched data saved to {self.ENRICHED_STORE_PATH}",
             )
+            if self.export_csv:
+                CsvStorage().write(df, os.path.splitext(self.ENRICHED_DATA_PATH)[0])
+                self.logger.info(
+                    self.CLASS_NAME,
+                    "_save_enriched",
+                    f"Enriched data exported to {self.ENRICHED_DATA_PATH}",
+                )
         except Exception as error:
             self.logger.error(
                 self.CLASS_NAME,
                 "_save_enriched",
                 f"Failed to save enriched data: {error}",
             )
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._save_enriched: {error}")
+
+    def _append_enriched(self, df: pd.DataFrame) -> None:
+        """Merge newly completed rows into the store and append them to the CSV export."""
+        try:
+            exported: Optional[pd.Timestamp] = self.enriched_store.max_date(self.symbol)
+            self.enriched_store.upsert(df)
+            if self.export_csv:
+                csv_storage: CsvStorage = CsvStorage()
+                csv_stem: str = os.path.splitext(self.ENRICHED_DATA_PATH)[0]
+                if csv_storage.exists(csv_stem):
+                    # Rows are published once, but never append a date the export already holds
+                    csv_storage.append(df if exported is None else df[df["date"] > exported], csv_stem)
+                else:
+                    csv_storage.write(self.enriched_store.load(symbols=[self.symbol]), csv_stem)
+            self.logger.info(
+                self.CLASS_NAME,
+                "_append_enriched",
+                f"{len(df)} enriched rows appended to {self.ENRICHED_STORE_PATH}",
+            )
+        except Exception as error:
+            self.logger.error(
+                self.CLASS_NAME,
+                "_append_enriched",
+                f"Failed to append enriched data: {error}",
+            )
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._append_enriched: {error}")
+
+    def _load_state(self) -> pd.DataFrame:
+        """Return the raw rows carried over from the previous run (empty if none)."""
+        if not self.state_storage.exists(self.state_stem):
+            return pd.DataFrame()
+        try:
+            return self.state_storage.read(self.state_stem)
+        except Exception as error:
+            self.logger.warning(
+                self.CLASS_NAME,
+                "_load_state",
+                f"Unreadable enrichment state, falling back to full run: {error}",
+            )
+            return pd.DataFrame()
+
+    def _save_state(self, state: pd.DataFrame) -> None:
+        """Persist the trailing rows (and running sums) needed to continue the features."""
+        state = state.assign(**{self.FREQ_COLUMN: self.freq or ""})
+        self.state_storage.write(state.reset_index(drop=True), self.state_stem)
+
+
+def _enrich_shard(symbol: str, freq: Optional[str], full: bool) -> tuple[dict, dict[str, dict]]:
+    """Enrich one symbol in a worker; return its summary and its uncommitted manifest entries."""
+    start: float = time.perf_counter()
+    enricher: Enricher = Enricher(Logger(), freq=freq, symbol=symbol)
+    # Shards write concurrently; only the parent writes the shared manifest
+    enricher.enriched_store.autocommit = False
+    # Errors the enricher handles itself still fail the shard, so its entries are not committed
+    with INSTRUMENTATION.stage("enrich_shard", Enricher.CLASS_NAME) as probe:
+        df: pd.DataFrame = enricher.enrich(full=full)
+    result: dict = {
+        "symbol": symbol,
+        "rows": len(df),
+        "seconds": round(time.perf_counter() - start, 3),
+        "ok": not probe.errors,
+    }
+    return result, enricher.enriched_store.entries([symbol])
@@ -0,0 +1,447 @@
+"""Features module.
+
+This module provides a declarative feature registry and the engine that
+computes it. Features are declared by name, kind and parameters; the engine
+resolves their dependencies and evaluates them in shared vectorised passes.
+Every rolling mean/std over the same column is served by one cumulative-sum
+pass, so adding windows does not add full scans of the data.
+
+Rolling windows are either a number of rows or a time span ("7D",
+"30min"); time windows cover the bars dated within the span up to and
+including the current one, as pandas' offset-based rolling does, so they
+keep their meaning for intraday bars.
+
+The engine can also continue from a saved tail of previously enriched rows.
+Running sums and exponential averages are seeded from that tail instead of
+restarting, which keeps incremental output identical to a full recompute.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Final, Optional
+
+import numpy as np
+import pandas as pd
+
+from bars import bar_length, is_intraday
+from schema import Schema
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """Declaration of one engineered column."""
+
+    name: str
+    kind: str
+    inputs: tuple[str, ...]
+    params: dict = field(default_factory=dict)
+    model: bool = False
+
+    @property
+    def time_window(self) -> Optional[pd.Timedelta]:
+        """Span of a time-based window ("7D", "30min"); None for row counts."""
+        window = self.params.get("window")
+        return pd.Timedelta(window) if isinstance(window, str) else None
+
+    @property
+    def lookback(self) -> int:
+        """Rows of history this feature needs before the current one."""
+        if self.time_window is not None:
+            return 1
+        return int(self.params.get("window", 1))
+
+
+class FeatureRegistry:
+    """Ordered collection of FeatureSpec with dependency resolution."""
+
+    def __init__(self, model_inputs: Optional[list[str]] = None) -> None:
+        """Create an empty registry; *model_inputs* are raw columns fed to the model as-is."""
+        self.specs: dict[str, FeatureSpec] = {}
+        self.model_inputs: list[str] = list(model_inputs or [])
+
+    def register(
+        self,
+        name: str,
+        kind: str,
+        inputs: tuple[str, ...] | str,
+        model: bool = False,
+        **params,
+    ) -> FeatureSpec:
+        if name in self.specs:
+            raise ValueError(f"Feature already registered: {name}")
+        if isinstance(inputs, str):
+            inputs = (inputs,)
+        spec: FeatureSpec = FeatureSpec(name=name, kind=kind, inputs=tuple(inputs), params=params, model=model)
+        self.specs[name] = spec
+        return spec
+
+    def names(self) -> list[str]:
+        return list(self.specs)
+
+    def model_features(self) -> list[str]:
+        """Raw model inputs followed by the features flagged as model inputs."""
+        return [*self.model_inputs, *(name for name, spec in self.specs.items() if spec.model)]
+
+    def max_lookback(self) -> int:
+        return max((spec.lookback for spec in self.specs.values()), default=1)
+
+    def max_time_window(self) -> Optional[pd.Timedelta]:
+        return max((spec.time_window for spec in self.specs.values() if spec.time_window is not None), default=None)
+
+    def resolve(self, names: Optional[list[str]] = None) -> list[FeatureSpec]:
+        """Return the specs for *names* and their dependencies in evaluation order."""
+        ordered: list[FeatureSpec] = []
+        visiting: set[str] = set()
+        done: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in done or name not in self.specs:
+                return  # raw input column
+            if name in visiting:
+                raise ValueError(f"Circular feature dependency at {name}")
+            visiting.add(name)
+            for dependency in self.specs[name].inputs:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(self.specs[name])
+
+        for name in names if names is not None else self.names():
+            if name not in self.specs:
+                raise KeyError(f"Unknown feature: {name}")
+            visit(name)
+        return ordered
+
+
+class FeatureEngine:
+    """Evaluate a FeatureRegistry over a DataFrame."""
+
+    ROW_COLUMN: Final[str] = "_row"
+    DATE_COLUMN: Final[str] = "date"
+    ROLLING_KINDS: Final[tuple[str, ...]] = ("rolling_mean", "rolling_std")
+
+    def __init__(self, registry: FeatureRegistry) -> None:
+        self.registry: FeatureRegistry = registry
+        self._kernels: dict[str, Callable[[pd.DataFrame, FeatureSpec, int, pd.DataFrame], np.ndarray]] = {
+            "day_of_week": self._day_of_week,
+            "minute_of_day": self._minute_of_day,
+            "log_return": self._log_return,
+            "lead": self._lead,
+            "ewm_mean": self._ewm_mean,
+            "true_range": self._true_range,
+            "zscore": self._zscore,
+            "ratio": self._ratio,
+        }
+
+    @property
+    def state_rows(self) -> int:
+        """Rows that must be carried between incremental runs."""
+        return self.registry.max_lookback() + 1
+
+    def state_tail(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Trailing rows of *df* to carry into the next run.
+
+        That is the longest row lookback plus, for time-based windows, every
+        row dated within the longest span before the second-to-last row (and
+        one more, since running sums are differenced), so the last row can
+        still be dropped and rebuilt when it was an incomplete bar.
+        """
+        rows: int = self.state_rows
+        span: Optional[pd.Timedelta] = self.registry.max_time_window()
+        if span is not None and len(df):
+            dates: np.ndarray = df[self.DATE_COLUMN].to_numpy()
+            anchor: np.datetime64 = dates[max(len(dates) - 2, 0)]
+            first: int = int(np.searchsorted(dates, anchor - span.to_timedelta64(), side="right"))
+            rows = max(rows, len(df) - first + 1)
+        return df.tail(rows)
+
+    @staticmethod
+    def hidden_columns(df: pd.DataFrame) -> list[str]:
+        """Running-state columns kept in the carried tail but never published."""
+        return [column for column in df.columns if column.startswith("_")]
+
+    def plan(
+        self,
+        columns: list[str],
+        names: Optional[list[str]] = None,
+    ) -> tuple[list[FeatureSpec], list[str]]:
+        """Split the resolved specs into computable ones and names lacking inputs."""
+        available: set[str] = set(columns)
+        specs: list[FeatureSpec] = []
+        skipped: list[str] = []
+        for spec in self.registry.resolve(names):
+            if all(column in available for column in spec.inputs):
+                specs.append(spec)
+                available.add(spec.name)
+            else:
+                skipped.append(spec.name)
+        return specs, skipped
+
+    def compute(
+        self,
+        df: pd.DataFrame,
+        state: Optional[pd.DataFrame] = None,
+        names: Optional[list[str]] = None,
+    ) -> tuple[pd.DataFrame, list[str]]:
+        """Add features to *df*, continuing from *state* when given.
+
+        Returns the combined frame (state rows first) and the names of the
+        features that were skipped because their input columns are missing.
+        """
+        carried: int = 0 if state is None else len(state)
+        if carried:
+            df = pd.concat([state, df], ignore_index=True)
+        else:
+            df = df.reset_index(drop=True).copy()
+        first_row: int = 0 if not carried else int(state[self.ROW_COLUMN].iloc[-1]) + 1
+        rows: np.ndarray = np.arange(len(df), dtype=np.int64) + first_row - carried
+        df[self.ROW_COLUMN] = rows
+
+        specs, skipped = self.plan(list(df.columns), names)
+        deferred: dict[str, list[FeatureSpec]] = {}
+        for spec in specs:
+            self._flush_rolling(df, deferred, spec.inputs, carried, state)
+            if spec.kind in self.ROLLING_KINDS:
+                # Defer so every window over the same column shares one pass
+                deferred.setdefault(spec.inputs[0], []).append(spec)
+                continue
+            df[spec.name] = self._kernels[spec.kind](df, spec, carried, state)
+        self._flush_rolling(df, deferred, None, carried, state)
+        return df, skipped
+
+    # ------------------------------------------------------------------
+    # Shared rolling pass
+    # ------------------------------------------------------------------
+    def _flush_rolling(
+        self,
+        df: pd.DataFrame,
+        pending: dict[str, list[FeatureSpec]],
+        needed: Optional[tuple[str, ...]],
+        carried: int,
+        state: Optional[pd.DataFrame],
+    ) -> None:
+        """Evaluate the deferred rolling groups producing any of *needed* (all if None)."""
+        columns: set[str] = {
+            column for column, specs in pending.items()
+            if needed is None or any(spec.name in needed for spec in specs)
+        }
+        for column in sorted(columns):
+            self._rolling_pass(df, column, pending.pop(column), carried, state)
+
+    def _rolling_pass(
+        self,
+        df: pd.DataFrame,
+        column: str,
+        specs: list[FeatureSpec],
+        carried: int,
+        state: Optional[pd.DataFrame],
+    ) -> None:
+        """Compute every rolling mean/std of *column* from one set of running sums.
+
+        Row windows need a full window without missing values; time windows
+        average the non-missing values they contain (std needs two).
+        """
+        values: np.ndarray = self._numeric(df[column])[carried:]
+        missing: np.ndarray = np.isnan(values)
+        # Centre on a fixed reference to keep the running sums small
+        reference: float = self._reference(df, column, values, carried, state)
+        clean: np.ndarray = np.where(missing, 0.0, values - reference)
+
+        sums: np.ndarray = self._running(df, f"_sum_{column}", clean, carried, state)
+        squares: np.ndarray = self._running(df, f"_sumsq_{column}", clean * clean, carried, state)
+        nans: np.ndarray = self._running(df, f"_nan_{column}", missing.astype(float), carried, state)
+
+        n: int = len(df)
+        index: np.ndarray = np.arange(n)
+        rows: np.ndarray = df[self.ROW_COLUMN].to_numpy()
+        starts_at_history: bool = n > 0 and rows[0] == 0
+        padded_sums: np.ndarray = np.concatenate([[0.0], sums])
+        padded_squares: np.ndarray = np.concatenate([[0.0], squares])
+        padded_nans: np.ndarray = np.concatenate([[0.0], nans])
+
+        for window in sorted({int(spec.params["window"]) for spec in specs if spec.time_window is None}):
+            before: np.ndarray = np.clip(index - window + 1, 0, None)
+            valid: np.ndarray = (rows >= window - 1) & ((before >= 1) | starts_at_history)
+            window_sum: np.ndarray = padded_sums[index + 1] - padded_sums[before]
+            window_nans: np.ndarray = padded_nans[index + 1] - padded_nans[before]
+            valid &= window_nans == 0
+            mean: np.ndarray = np.where(valid, reference + window_sum / window, np.nan)
+            for spec in specs:
+                if spec.time_window is not None or int(spec.params["window"]) != window:
+                    continue
+                if spec.kind == "rolling_mean":
+                    df[spec.name] = mean
+                else:
+                    window_squares: np.ndarray = padded_squares[index + 1] - padded_squares[before]
+                    variance: np.ndarray = (window_squares - window_sum * window_sum / window) / (window - 1)
+                    df[spec.name] = np.where(valid, np.sqrt(np.clip(variance, 0.0, None)), np.nan)
+
+        spans: set[pd.Timedelta] = {spec.time_window for spec in specs if spec.time_window is not None}
+        dates: np.ndarray = df[self.DATE_COLUMN].to_numpy() if spans else np.empty(0)
+        for span in sorted(spans):
+            # First row inside (date - span, date]; carried state covers the longest span
+            before = np.searchsorted(dates, dates - span.to_timedelta64(), side="right")
+            window_sum = padded_sums[index + 1] - padded_sums[before]
+            count: np.ndarray = index + 1 - before - (padded_nans[index + 1] - padded_nans[before])
+            # Carried rows whose span reaches past the state are not recomputable
+            count = np.where((before >= 1) | starts_at_history, count, 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = np.where(count >= 1, reference + window_sum / count, np.nan)
+                for spec in specs:
+                    if spec.time_window != span:
+                        continue
+                    if spec.kind == "rolling_mean":
+                        df[spec.name] = mean
+                    else:
+                        window_squares = padded_squares[index + 1] - padded_squares[before]
+                        variance = (window_squares - window_sum * window_sum / count) / (count - 1)
+                        df[spec.name] = np.where(count >= 2, np.sqrt(np.clip(variance, 0.0, None)), np.nan)
+
+    def _reference(
+        self,
+        df: pd.DataFrame,
+        column: str,
+        values: np.ndarray,
+        carried: int,
+        state: Optional[pd.DataFrame],
+    ) -> float:
+        """Centring constant for *column*: the first valid value of the history."""
+        name: str = f"_ref_{column}"
+        if carried and state is not None and name in state.columns:
+            reference: float = float(state[name].iloc[-1])
+        else:
+            valid: np.ndarray = values[~np.isnan(values)]
+            reference = float(valid[0]) if len(valid) else 0.0
+        df[name] = reference
+        return reference
+
+    def _running(
+        self,
+        df: pd.DataFrame,
+        name: str,
+        values: np.ndarray,
+        carried: int,
+        state: Optional[pd.DataFrame],
+    ) -> np.ndarray:
+        """Cumulative sum of *values* continuing the one saved in *state*."""
+        seed: float = 0.0
+        head: np.ndarray = np.empty(0)
+        if carried and state is not None and name in state.columns:
+            head = state[name].to_numpy(dtype=float)
+            seed = float(head[-1])
+        elif carried:
+            raise ValueError(f"Carried state is missing running column {name}")
+        tail: np.ndarray = np.cumsum(np.concatenate([[seed], values]))[1:]
+        result: np.ndarray = np.concatenate([head, tail])
+        df[name] = result
+        return result
+
+    # ------------------------------------------------------------------
+    # Kernels
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _numeric(series: pd.Series) -> np.ndarray:
+        """Return *series* as float, accepting thousands-separated text."""
+        return Schema.to_number(series).to_numpy(dtype=float, na_value=np.nan)
+
+    def _day_of_week(self, df: pd.DataFrame, spec: FeatureSpec, carried: int, state) -> np.ndarray:
+        return df[spec.inputs[0]].dt.dayofweek.to_numpy()
+
+    def _minute_of_day(self, df: pd.DataFrame, spec: FeatureSpec, carried: int, state) -> np.ndarray:
+        dates: pd.Series = df[spec.inputs[0]]
+        return (dates.dt.hour * 60 + dates.dt.minute).to_numpy()
+
+    def _log_return(self, df: pd.DataFrame, spec: FeatureSpec, carried: int, state) -> np.ndarray:
+        values: np.ndarray = self._numeric(df[spec.inputs[0]])
+        previous: np.ndarray = np.concatenate([[np.nan], values[:-1]])
+        return np.log(values / previous)
+
+    def _lead(self, df: pd.DataFrame, spec: FeatureSpec, carried: int, state) -> np.ndarray:
+        periods: int = int(spec.params.get("periods", 1))
+        values: np.ndarray = self._numeric(df[spec.inputs[0]])
+        return np.concatenate([values[periods:], np.full(min(periods, len(values)), np.nan)])
+
+    def _ewm_mean(self, df: pd.DataFrame, spec: FeatureSpec, carried: int, state) -> np.ndarray:
+        """Exponential moving average (pandas ``adjust=False``) seeded from *state*."""
+        alpha: float = 2.0 / (float(spec.params["span"]) + 1.0)
+        values: np.ndarray = self._numeric(df[spec.inputs[0]])
+        head: np.ndarray = values[:0]
+        if carried:
+            head = state[spec.name].to_numpy(dtype=float)
+            previous: float = float(head[-1])
+        elif len(values):
+            previous = float(values[0])
+        else:
+            return values
+        # SciPy takes over a second to import; only enrichment runs need it
+        from scipy.signal import lfilter
+
+        denominator: list[float] = [1.0, alpha - 1.0]
+        tail, _ = lfilter([alpha], denominator, values[carried:], zi=[-denominator[1] * previous])
+        return np.concatenate([head, tail])
+
+    def _true_range(self, df: pd.DataFrame, spec: FeatureSpec, carried: int, state) -> np.ndarray:
+        high, low, close = (self._numeric(df[column]) for column in spec.inputs)
+        previous_close: np.ndarray = np.concatenate([[np.nan], close[:-1]])
+        ranges: np.ndarray = np.fmax(np.abs(high - previous_close), np.abs(low - previous_close))
+        return np.fmax(high - low, ranges)
+
+    def _zscore(self, df: pd.DataFrame, spec: FeatureSpec, carried: int, state) -> np.ndarray:
+        value, mean, std = (self._numeric(df[column]) for column in spec.inputs)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(std > 0, (value - mean) / std, np.nan)
+
+    def _ratio(self, df: pd.DataFrame, spec: FeatureSpec, carried: int, state) -> np.ndarray:
+        numerator, denominator = (self._numeric(df[column]) for column in spec.inputs)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def build_default_registry(freq: Optional[str] = None) -> FeatureRegistry:
+    """Return the feature set produced by the Enricher for bars of *freq*.
+
+    Daily bars (the default) use row windows, so ``rolling_mean_7`` spans 7
+    sessions. Intraday bars keep the same feature names with time windows
+    of as many calendar days (``"7D"``), add the time of day and short
+    intraday windows longer than one bar.
+    """
+    registry: FeatureRegistry = FeatureRegistry(model_inputs=["close"])
+    intraday: bool = is_intraday(freq)
+
+    def days(window: int) -> int | str:
+        return f"{window}D" if intraday else window
+
+    for window in (5, 7, 10, 20, 60, 120):
+        registry.register(f"rolling_mean_{window}", "rolling_mean", "close", model=window == 7, window=days(window))
+        registry.register(f"rolling_std_{window}", "rolling_std", "close", model=window == 7, window=days(window))
+    registry.register("log_return", "log_return", "close", model=True, window=2)
+    registry.register("day_of_week", "day_of_week", "date", model=True)
+    if intraday:
+        registry.register("minute_of_day", "minute_of_day", "date")
+        for span in ("30min", "4h"):
+            if pd.Timedelta(span) > bar_length(freq):
+                registry.register(f"rolling_mean_{span}", "rolling_mean", "close", window=span)
+                registry.register(f"rolling_std_{span}", "rolling_std", "close", window=span)
+
+    for window in (20, 60):
+        registry.register(
+            f"zscore_{window}",
+            "zscore",
+            ("close", f"rolling_mean_{window}", f"rolling_std_{window}"),
+            window=days(window),
+        )
+    for span in (12, 26):
+        registry.register(f"ewm_{span}", "ewm_mean", "close", span=span)
+
+    registry.register("true_range", "true_range", ("high", "low", "close"), window=2)
+    registry.register("atr_14", "rolling_mean", "true_range", window=days(14))
+
+    registry.register("volume_mean_20", "rolling_mean", "volume", window=days(20))
+    registry.register("volume_ratio_20", "ratio", ("volume", "volume_mean_20"), window=days(20))
+
+    registry.register("target", "lead", "close", periods=1)
+    return registry
+
+
+FEATURE_REGISTRY: Final[FeatureRegistry] = build_default_registry()
@@ -0,0 +1,369 @@
+"""KPI module.
+
+This module provides the KpiEngine class, which keeps running KPI state for
+every symbol of the raw store so that dashboards never rescan the history.
+Per symbol it stores the closes with prefix sums of the (shifted) close and
+its square, plus Welford mean/variance accumulators over the whole series.
+Appending bars only extends those arrays, and the KPIs of any date window
+(YTD, 1Y, 5Y or an explicit range) are read from two prefix-sum lookups
+found by binary search. The state is persisted append-only: one raw binary
+file per symbol and array, extended with the new rows only, plus a small
+JSON file with the committed row counts and accumulators.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Final, Optional
+
+import numpy as np
+import pandas as pd
+
+from logger import Logger
+from metrics import INSTRUMENTATION
+from schema import RAW_SCHEMA
+from store import PartitionedStore
+
+
+class RunningKpis:
+    """Running KPI state of one symbol's close series."""
+
+    DTYPES: Final[dict[str, str]] = {
+        "dates": "datetime64[ns]",
+        "close": "float64",
+        "prefix_sum": "float64",
+        "prefix_sq": "float64",
+    }
+    ARRAYS: Final[tuple[str, ...]] = tuple(DTYPES)
+
+    def __init__(self, shift: float) -> None:
+        # Prefix sums are taken of close - shift (the first close) so that
+        # window variances do not cancel catastrophically
+        self.shift: float = shift
+        # Arrays grow by doubling, so appending a bar is amortised O(1);
+        # only the first `size` rows (size + 1 prefix entries) are valid
+        self.size: int = 0
+        self._dates: np.ndarray = np.empty(0, dtype="datetime64[ns]")
+        self._close: np.ndarray = np.empty(0)
+        self._prefix_sum: np.ndarray = np.zeros(1)
+        self._prefix_sq: np.ndarray = np.zeros(1)
+        # Welford accumulators of the whole series
+        self.n: int = 0
+        self.mean: float = 0.0
+        self.m2: float = 0.0
+        # Rows already written to the state files
+        self.persisted: int = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates[:self.size]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._close[:self.size]
+
+    @property
+    def prefix_sum(self) -> np.ndarray:
+        return self._prefix_sum[:self.size + 1]
+
+    @property
+    def prefix_sq(self) -> np.ndarray:
+        return self._prefix_sq[:self.size + 1]
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(self._dates[self.size - 1]) if self.size else None
+
+    @staticmethod
+    def extra(name: str) -> int:
+        """Entries an array holds beyond one per bar (prefix sums start with a zero)."""
+        return 1 if name.startswith("prefix") else 0
+
+    def restore(self, arrays: dict[str, np.ndarray]) -> None:
+        """Adopt saved (trimmed) arrays as the state's buffers."""
+        self.size = len(arrays["close"])
+        self.persisted = self.size
+        for name in self.ARRAYS:
+            setattr(self, f"_{name}", np.array(arrays[name]))
+
+    def append(self, dates: np.ndarray, close: np.ndarray) -> None:
+        """Add bars newer than :attr:`last_date`; cost depends only on the new bars."""
+        close = np.asarray(close, dtype=float)
+        count: int = len(close)
+        if not count:
+            return
+        self._reserve(self.size + count)
+        old, new = self.size, self.size + count
+        shifted: np.ndarray = close - self.shift
+        self._dates[old:new] = np.asarray(dates, dtype="datetime64[ns]")
+        self._close[old:new] = close
+        self._prefix_sum[old + 1:new + 1] = self._prefix_sum[old] + np.cumsum(shifted)
+        self._prefix_sq[old + 1:new + 1] = self._prefix_sq[old] + np.cumsum(shifted**2)
+        self.size = new
+
+        # Welford update, merging the batch's own mean/M2 (Chan et al.)
+        batch_mean: float = float(close.mean())
+        batch_m2: float = float(((close - batch_mean) ** 2).sum())
+        total: int = self.n + count
+        delta: float = batch_mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += batch_m2 + delta**2 * self.n * count / total
+        self.n = total
+
+    def bounds(self, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> tuple[int, int]:
+        """Row range [first, last) of the bars between *start* and *end* (inclusive)."""
+        first: int = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, "ns"), side="left"))
+        last: int = len(self) if end is None else int(np.searchsorted(self.dates, np.datetime64(end, "ns"), side="right"))
+        return first, max(first, last)
+
+    def session_start(self, last: int, sessions: int) -> int:
+        """Index of the first bar of the last *sessions* trading days of bars[:last]."""
+        first: int = last
+        for _ in range(sessions):
+            if first == 0:
+                break
+            day: np.datetime64 = self._dates[first - 1].astype("datetime64[D]").astype("datetime64[ns]")
+            first = int(np.searchsorted(self.dates[:first], day, side="left"))
+        return first
+
+    def mean_std(self, first: int, last: int) -> tuple[float, float]:
+        """Mean and sample standard deviation of closes[first:last] from the prefix sums."""
+        count: int = last - first
+        if count == 0:
+            return np.nan, np.nan
+        total: float = self.prefix_sum[last] - self.prefix_sum[first]
+        mean: float = total / count + self.shift
+        if count < 2:
+            return mean, np.nan
+        squares: float = self.prefix_sq[last] - self.prefix_sq[first]
+        variance: float = max(squares - total**2 / count, 0.0) / (count - 1)
+        return mean, float(np.sqrt(variance))
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of the whole series (Welford)."""
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else np.nan
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the buffers (at least doubling) to hold *rows* bars."""
+        if rows <= len(self._close):
+            return
+        capacity: int = max(rows, 2 * len(self._close), 16)
+        for name in self.ARRAYS:
+            buffer: np.ndarray = getattr(self, f"_{name}")
+            extra: int = self.extra(name)
+            grown: np.ndarray = np.empty(capacity + extra, dtype=buffer.dtype)
+            grown[:self.size + extra] = buffer[:self.size + extra]
+            setattr(self, f"_{name}", grown)
+
+
+class KpiEngine:
+    CLASS_NAME: Final[str] = "KpiEngine"
+
+    STATE_FILE_PATH: Final[str] = "src/crude_oil/static/dashboard/kpi_state"
+    METADATA_NAME: Final[str] = "metadata.json"
+    # Trading days of the short moving average and volatility (every intraday bar of a day counts)
+    SHORT_WINDOW: Final[int] = 7
+    WINDOWS: Final[tuple[str, ...]] = ("YTD", "1Y", "5Y", "MAX")
+    # Display names, as written to the dashboard tables
+    LABELS: Final[dict[str, str]] = {
+        "tasa_variacion": "Tasa de Variación (%)",
+        "media_movil": "Media Móvil 7 días",
+        "volatilidad": "Volatilidad 7 días",
+        "retorno_acumulado": "Retorno Acumulado (%)",
+        "desviacion_estandar": "Desviación Estándar Precio",
+    }
+
+    def __init__(self, logger: Logger, path: Optional[str] = STATE_FILE_PATH, read_only: bool = False) -> None:
+        """Create an engine backed by the state folder at *path* (``None`` keeps it in memory).
+
+        A *read_only* engine loads the saved state but keeps the bars it folds
+        in memory, so readers never write the files the pipeline appends to.
+        """
+        self.logger: Logger = logger
+        self.path: Optional[str] = path
+        self.read_only: bool = read_only
+        self.states: dict[str, RunningKpis] = self._load_state()
+
+    @property
+    def symbols(self) -> list[str]:
+        return sorted(self.states)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def update(self, df: pd.DataFrame) -> int:
+        """Append the bars of a long ``symbol``/``date``/``close`` frame; return the rows added.
+
+        Bars dated on or before a symbol's last bar are ignored (restated
+        history needs :meth:`refresh` with ``full=True``).
+        """
+        added: int = 0
+        if df.empty:
+            return added
+        if "symbol" not in df.columns:
+            df = df.assign(symbol="")
+        # Closes stored as float32 are read back as their decimal value
+        df = RAW_SCHEMA.widen(df.dropna(subset=["close"]))
+        for symbol, group in df.groupby(df["symbol"].astype(str), sort=True):
+            group = group.sort_values("date", kind="stable")
+            state: Optional[RunningKpis] = self.states.get(symbol)
+            if state is None:
+                state = self.states[symbol] = RunningKpis(float(group["close"].iloc[0]))
+            if state.last_date is not None:
+                group = group[group["date"] > state.last_date]
+            state.append(group["date"].to_numpy(), group["close"].to_numpy(dtype=float))
+            added += len(group)
+        return added
+
+    def refresh(self, store: PartitionedStore, full: bool = False) -> int:
+        """Read only the bars *store* gained since the last refresh, append them and persist.
+
+        Up-to-date symbols are detected from the store manifest without
+        reading any partition. With *full* every symbol is rebuilt.
+        """
+        if full:
+            self.states = {}
+        added: int = 0
+        try:
+            for symbol in store.symbols():
+                state: Optional[RunningKpis] = self.states.get(symbol)
+                watermark: Optional[pd.Timestamp] = state.last_date if state is not None else None
+                latest: Optional[pd.Timestamp] = store.max_date(symbol)
+                if latest is None or (watermark is not None and latest <= watermark):
+                    continue
+                added += self.update(store.load(start=watermark, columns=["close"], symbols=[symbol]))
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "refresh", f"Error reading new bars: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}.refresh: {error}")
+            return added
+        if added or full:
+            self._save_state()
+        self.logger.info(self.CLASS_NAME, "refresh", f"{added} new bars folded into the KPI state.")
+        return added
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def kpis(
+        self,
+        symbol: str,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> dict[str, float]:
+        """KPIs of *symbol* between *start* and *end* (inclusive); empty with fewer than two bars."""
+        state: Optional[RunningKpis] = self.states.get(symbol)
+        if state is None:
+            return {}
+        first, last = state.bounds(start, end)
+        if last - first < 2:
+            return {}
+        close: np.ndarray = state.close
+        short_mean, short_std = state.mean_std(max(first, state.session_start(last, self.SHORT_WINDOW)), last)
+        if first == 0 and last == len(state):
+            deviation: float = state.std
+        else:
+            deviation = state.mean_std(first, last)[1]
+        return {
+            "tasa_variacion": float((close[last - 1] - close[last - 2]) / close[last - 2] * 100),
+            "media_movil": float(short_mean),
+            "volatilidad": float(short_std),
+            "retorno_acumulado": float((close[last - 1] / close[first] - 1) * 100),
+            "desviacion_estandar": float(deviation),
+        }
+
+    def window_range(self, symbol: str, window: str) -> tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """Date range of a named *window* ending at the last bar of *symbol*."""
+        end: Optional[pd.Timestamp] = self.states[symbol].last_date if symbol in self.states else None
+        if end is None or window == "MAX":
+            return None, end
+        if window == "YTD":
+            return pd.Timestamp(year=end.year, month=1, day=1), end
+        if window.endswith("Y") and window[:-1].isdigit():
+            return end - pd.DateOffset(years=int(window[:-1])), end
+        raise ValueError(f"Unknown KPI window: {window}")
+
+    def window_table(
+        self,
+        symbols: Optional[list[str]] = None,
+        windows: tuple[str, ...] = WINDOWS,
+    ) -> pd.DataFrame:
+        """One row of KPIs per (symbol, window)."""
+        rows: list[dict] = []
+        for symbol in symbols if symbols is not None else self.symbols:
+            for window in windows:
+                kpis: dict[str, float] = self.kpis(symbol, *self.window_range(symbol, window))
+                if kpis:
+                    rows.append({"symbol": symbol, "window": window, **kpis})
+        return pd.DataFrame(rows)
+
+    @classmethod
+    def labelled(cls, kpis: dict[str, float]) -> dict[str, float]:
+        """*kpis* keyed by their display names."""
+        return {cls.LABELS[name]: value for name, value in kpis.items()}
+
+    # ------------------------------------------------------------------
+    # State I/O
+    # ------------------------------------------------------------------
+    def _array_path(self, symbol: str, name: str) -> str:
+        safe_symbol: str = "".join(char if char.isalnum() else "_" for char in symbol)
+        return os.path.join(self.path, f"{safe_symbol}_{name}.bin")
+
+    def _load_state(self) -> dict[str, RunningKpis]:
+        metadata_path: Optional[str] = None if self.path is None else os.path.join(self.path, self.METADATA_NAME)
+        if metadata_path is None or not os.path.exists(metadata_path):
+            return {}
+        try:
+            states: dict[str, RunningKpis] = {}
+            with open(metadata_path, encoding="utf-8") as handle:
+                metadata: dict = json.load(handle)
+            for entry in metadata["symbols"]:
+                state: RunningKpis = RunningKpis(entry["shift"])
+                state.n, state.mean, state.m2 = entry["n"], entry["mean"], entry["m2"]
+                # Rows appended after the last committed metadata (an interrupted save) are ignored
+                state.restore({
+                    name: np.fromfile(self._array_path(entry["symbol"], name), dtype=dtype)[
+                        :entry["rows"] + RunningKpis.extra(name)
+                    ]
+                    for name, dtype in RunningKpis.DTYPES.items()
+                })
+                if len(state) != entry["rows"]:
+                    raise ValueError(f"{entry['symbol']} state files hold {len(state)} of {entry['rows']} rows")
+                states[entry["symbol"]] = state
+            return states
+        except Exception as error:  # noqa: BLE001
+            self.logger.warning(self.CLASS_NAME, "_load_state", f"Unreadable KPI state, rebuilding: {error}")
+            return {}
+
+    def _save_state(self) -> None:
+        """Append each symbol's new rows to its array files, then commit the row counts.
+
+        Only the rows added since the last save are written, so a refresh
+        costs I/O proportional to the new bars rather than to the history.
+        """
+        if self.path is None or self.read_only:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for symbol, state in self.states.items():
+            for name in RunningKpis.ARRAYS:
+                values: np.ndarray = getattr(state, name)
+                stored: int = state.persisted + RunningKpis.extra(name) if state.persisted else 0
+                with open(self._array_path(symbol, name), "ab") as handle:
+                    # Drops rows of an interrupted save (or everything, for a rebuilt state)
+                    handle.truncate(stored * values.itemsize)
+                    values[stored:].tofile(handle)
+                    INSTRUMENTATION.record_written((len(values) - stored) * values.itemsize)
+            state.persisted = len(state)
+        metadata: dict = {"symbols": [
+            {"symbol": symbol, "rows": len(state), "shift": state.shift, "n": state.n, "mean": state.mean, "m2": state.m2}
+            for symbol, state in self.states.items()
+        ]}
+        metadata_path: str = os.path.join(self.path, self.METADATA_NAME)
+        tmp_path: str = f"{metadata_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(metadata, handle, indent=2)
+        os.replace(tmp_path, metadata_path)
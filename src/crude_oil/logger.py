@@ -1,6 +1,58 @@
-import os
-import datetime
+"""Logger module.
+
+This module provides the Logger class, the pipeline's logging facade. All
+Logger instances share one process-wide, non-blocking backend: the calling
+thread only puts the record on a queue and a QueueListener thread formats
+and writes it, so hot paths never wait on file I/O. Worker processes forward
+their records to the parent's listener through a multiprocessing queue
+(``initializer=Logger.configure_worker, initargs=Logger.worker_initargs()``),
+which keeps a single writer per log file.
+
+The backend writes plain text or JSON lines, rotates the file by size or
+time, and can sample high-frequency levels (e.g. keep one DEBUG record in
+every 100).
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import threading
+from itertools import count
+from typing import Any, Optional
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the caller's class and function."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'class_name': getattr(record, 'class_name', None),
+            'function_name': getattr(record, 'function_name', None),
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one record in every N of each sampled level; other levels always pass."""
+
+    def __init__(self, sampling: dict[str, int]) -> None:
+        super().__init__()
+        self.every: dict[int, int] = {logging.getLevelName(level.upper()): int(n) for level, n in sampling.items()}
+        self._counters: dict[int, count] = {level: count() for level in self.every}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every: int = self.every.get(record.levelno, 1)
+        return every <= 1 or next(self._counters[record.levelno]) % every == 0
 
 
 class Logger:
@@ -9,34 +61,167 @@ class Logger:
     LOG_NAME = 'CrudeOilAnalysis'
     LOG_FORMAT = '[%(asctime)s | %(name)s | %(class_name)s | %(function_name)s | %(levelname)s] %(message)s'
     DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+    DEFAULTS: dict[str, Any] = {
+        'folder': LOG_FOLDER,
+        'level': 'INFO',
+        'json_format': False,
+        # Size-based rotation; a TimedRotatingFileHandler interval (e.g. 'midnight') replaces it
+        'max_bytes': 10 * 1024 * 1024,
+        'when': None,
+        'backup_count': 5,
+        # Level name -> keep one record in this many
+        'sampling': {},
+    }
+
+    # Process-wide backend shared by every instance
+    _settings: dict[str, Any] = dict(DEFAULTS)
+    _handler: Optional[logging.handlers.QueueHandler] = None
+    _listeners: list[logging.handlers.QueueListener] = []
+    _worker_queue: Any = None
+    _pid: Optional[int] = None
+    _lock: threading.Lock = threading.Lock()
 
     def __init__(self):
-        self._ensure_log_folder()
-        self.log_file = self._generate_log_filename()
-        self._configure_logging()
+        self._ensure_backend()
+        self.log_file: str = self.log_path()
         self.logger = logging.getLogger(self.LOG_NAME)
 
-    def _ensure_log_folder(self) -> None:
-        if not os.path.exists(self.LOG_FOLDER):
-            os.makedirs(self.LOG_FOLDER)
+    @classmethod
+    def configure(cls, **settings: Any) -> None:
+        """Restart the backend with *settings* (keys of DEFAULTS); applies to every instance."""
+        unknown: list[str] = [key for key in settings if key not in cls.DEFAULTS]
+        if unknown:
+            raise ValueError(f"Unknown logger settings: {unknown}")
+        with cls._lock:
+            cls._stop()
+            cls._settings = {**cls.DEFAULTS, **settings}
+            cls._start()
 
-    def _generate_log_filename(self) -> str:
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        return os.path.join(self.LOG_FOLDER, f"{self.LOG_PREFIX}_{timestamp}.log")
+    @classmethod
+    def log_path(cls) -> str:
+        extension: str = 'jsonl' if cls._settings['json_format'] else 'log'
+        return os.path.join(cls._settings['folder'], f"{cls.LOG_PREFIX}.{extension}")
 
-    def _configure_logging(self) -> None:
-        logging.basicConfig(
-            filename=self.log_file,
-            level=logging.INFO,
-            format=self.LOG_FORMAT,
-            datefmt=self.DATE_FORMAT
-        )
+    @classmethod
+    def worker_initargs(cls) -> tuple[Any, dict[str, Any]]:
+        """Initializer arguments of ``configure_worker``: the worker queue and the current settings."""
+        return cls.worker_queue(), dict(cls._settings)
+
+    @classmethod
+    def worker_queue(cls) -> Any:
+        """Queue whose records the parent's listener writes, started on first use."""
+        cls._ensure_backend()
+        with cls._lock:
+            if cls._worker_queue is None:
+                cls._worker_queue = multiprocessing.Queue()
+                listener = logging.handlers.QueueListener(cls._worker_queue, *cls._listeners[0].handlers)
+                listener.start()
+                cls._listeners.append(listener)
+            return cls._worker_queue
+
+    @classmethod
+    def configure_worker(cls, log_queue: Any, settings: Optional[dict[str, Any]] = None) -> None:
+        """Process pool initializer: send this process's records to the parent's listener."""
+        with cls._lock:
+            # Listener threads are not inherited by forked children; never stop them from here
+            cls._listeners = []
+            cls._worker_queue = None
+            cls._settings = {**cls.DEFAULTS, **(settings or cls._settings)}
+            cls._attach(logging.handlers.QueueHandler(log_queue))
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Flush queued records and stop the listeners."""
+        with cls._lock:
+            cls._stop()
+
+    def debug(self, class_name: str, function_name: str, message: str) -> None:
+        self._log(logging.DEBUG, class_name, function_name, message)
 
     def info(self, class_name: str, function_name: str, message: str) -> None:
-        self.logger.info(message, extra={"class_name": class_name, "function_name": function_name})
+        self._log(logging.INFO, class_name, function_name, message)
 
     def warning(self, class_name: str, function_name: str, message: str) -> None:
-        self.logger.warning(message, extra={"class_name": class_name, "function_name": function_name})
+        self._log(logging.WARNING, class_name, function_name, message)
 
     def error(self, class_name: str, function_name: str, message: str) -> None:
-        self.logger.error(message, extra={"class_name": class_name, "function_name": function_name})
\ No newline at end of file
+        self._log(logging.ERROR, class_name, function_name, message)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _log(self, level: int, class_name: str, function_name: str, message: str) -> None:
+        # A forked child inherits the handler but not the listener thread
+        if Logger._pid != os.getpid():
+            self._ensure_backend()
+        self.logger.log(level, message, extra={"class_name": class_name, "function_name": function_name})
+
+    @classmethod
+    def _ensure_backend(cls) -> None:
+        with cls._lock:
+            if cls._pid != os.getpid():
+                cls._listeners = []
+                cls._worker_queue = None
+                cls._start()
+
+    @classmethod
+    def _start(cls) -> None:
+        settings: dict[str, Any] = cls._settings
+        os.makedirs(settings['folder'], exist_ok=True)
+        if settings['when']:
+            file_handler: logging.Handler = logging.handlers.TimedRotatingFileHandler(
+                cls.log_path(), when=settings['when'], backupCount=settings['backup_count'],
+                encoding='utf-8', delay=True,
+            )
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(
+                cls.log_path(), maxBytes=settings['max_bytes'], backupCount=settings['backup_count'],
+                encoding='utf-8', delay=True,
+            )
+        if settings['json_format']:
+            file_handler.setFormatter(JsonFormatter(datefmt=cls.DATE_FORMAT))
+        else:
+            file_handler.setFormatter(logging.Formatter(cls.LOG_FORMAT, cls.DATE_FORMAT))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, file_handler)
+        listener.start()
+        cls._listeners = [listener]
+        cls._attach(logging.handlers.QueueHandler(log_queue))
+
+    @classmethod
+    def _attach(cls, handler: logging.handlers.QueueHandler) -> None:
+        """Make *handler* the only handler of the pipeline logger (sampling runs before queueing)."""
+        if cls._settings['sampling']:
+            handler.addFilter(SamplingFilter(cls._settings['sampling']))
+        logger: logging.Logger = logging.getLogger(cls.LOG_NAME)
+        for previous in list(logger.handlers):
+            logger.removeHandler(previous)
+        logger.addHandler(handler)
+        logger.setLevel(cls._settings['level'])
+        logger.propagate = False
+        cls._handler = handler
+        cls._pid = os.getpid()
+
+    @classmethod
+    def _stop(cls) -> None:
+        if cls._pid != os.getpid():
+            return
+        for listener in reversed(cls._listeners):
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        if cls._worker_queue is not None:
+            cls._worker_queue.close()
+        cls._listeners = []
+        cls._worker_queue = None
+        cls._pid = None
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        # The lock may have been held by another thread at fork time
+        cls._lock = threading.Lock()
+
+
+atexit.register(Logger.shutdown)
+os.register_at_fork(after_in_child=Logger._after_fork)
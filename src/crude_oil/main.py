@@ -1,78 +1,213 @@
 from __future__ import annotations
+from functools import cached_property
 from pathlib import Path
-from typing import Final
+from typing import TYPE_CHECKING, Final, Optional
 
 import pandas as pd
 
 from logger import Logger
-from collector import Collector
-from enricher import Enricher
-from modeller import Modeller
-from dashboard import Dashboard
+from dag import PipelineDAG, Stage
+from metrics import INSTRUMENTATION
+from schema import RAW_SCHEMA
+from store import PartitionedStore
+from validation import DataValidator, ValidationResult
+
+# The phase components pull in requests, SciPy, scikit-learn and Matplotlib;
+# they are imported when a stage first needs them, so single-stage runs start fast
+if TYPE_CHECKING:
+    from collector import Collector
+    from dashboard import Dashboard
+    from enricher import Enricher
+    from modeller import Modeller
 
 
 class CrudeOilDataPipeline:
     CLASS_NAME: Final[str] = "CrudeOilDataPipeline"
     PACKAGE_DIR: Path = Path(__file__).resolve().parent
     DATA_DIR: Path = PACKAGE_DIR / "static" / "data"
-    RAW_OUTPUT_PATH: Path = DATA_DIR / "crude_oil.csv"
+    RAW_STORE_DIR: Path = DATA_DIR / "raw"
+    # Single-file raw CSV used before the partitioned store; only read to seed it
+    LEGACY_RAW_PATH: Path = DATA_DIR / "crude_oil.csv"
+    LEGACY_SYMBOL: Final[str] = "CL=F"
 
     def __init__(self) -> None:
         self.logger: Logger = Logger()
-        self.collector: Collector = Collector(logger=self.logger)
-        self.enricher: Enricher = Enricher(logger=self.logger)
-        self.modeller: Modeller = Modeller(logger=self.logger)
-        self.dashboard: Dashboard = Dashboard()
+        self.validator: DataValidator = DataValidator(logger=self.logger)
 
         self.DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.raw_store: PartitionedStore = PartitionedStore(
+            root=str(self.RAW_STORE_DIR), name="crude_oil", logger=self.logger, schema=RAW_SCHEMA
+        )
+        self._seed_raw_store()
+
+        # Frames flow between stages in memory; fetched rows are validated before
+        # they are stored. The dashboard is drawn while the model trains; only the
+        # residual chart waits for the model version training registers, so it
+        # never depends on thread timing
+        self.dag: PipelineDAG = PipelineDAG([
+            Stage("collect", self._collect_stage, outputs={"fetched": pd.DataFrame, "raw_since": str}),
+            Stage("validate", self._validate_stage, inputs=("fetched",), outputs={"raw_rows": pd.DataFrame}),
+            Stage("enrich", self._enrich_stage, inputs=("raw_rows", "raw_since"), outputs={"enriched": pd.DataFrame}),
+            Stage("train", self._train_stage, inputs=("enriched",), outputs={"model_version": str}),
+            Stage("dashboard", self._dashboard_stage, inputs=("enriched",)),
+            Stage("residuals", self._residuals_stage, inputs=("enriched", "model_version")),
+        ], logger=self.logger)
+
+    # ------------------------------------------------------------------
+    # Phase components (imported on first use)
+    # ------------------------------------------------------------------
+    @cached_property
+    def collector(self) -> Collector:
+        from collector import Collector
+
+        return Collector(logger=self.logger)
+
+    @cached_property
+    def enricher(self) -> Enricher:
+        from enricher import Enricher
+
+        return Enricher(logger=self.logger)
+
+    @cached_property
+    def modeller(self) -> Modeller:
+        from modeller import Modeller
 
-    def run(self) -> None:
+        return Modeller(logger=self.logger)
+
+    @cached_property
+    def dashboard(self) -> Dashboard:
+        from dashboard import Dashboard
+
+        return Dashboard(logger=self.logger)
+
+    def run(self, force: bool = False) -> dict[str, str]:
+        """Run the stage graph; stages whose inputs did not change are skipped unless *force*."""
         self.logger.info(self.CLASS_NAME, "run", "Pipeline execution started.")
+        with INSTRUMENTATION.stage("pipeline", self.CLASS_NAME) as probe:
+            status: dict[str, str] = self.dag.run(force=force)
+            probe.extra.update({f"{state}_stages": list(status.values()).count(state) for state in set(status.values())})
+        INSTRUMENTATION.write_report()
+        self.logger.info(
+            self.CLASS_NAME, "run", f"Pipeline execution finished (run report: {INSTRUMENTATION.report_path})."
+        )
+        return status
 
-        self._collect_raw_data()
-        enriched_df: pd.DataFrame = self._enrich_data()
-        if not enriched_df.empty:
-            self._train_model()
-            self._launch_dashboard()
+    # ------------------------------------------------------------------
+    # DAG stages
+    # ------------------------------------------------------------------
+    def _collect_stage(self) -> dict[str, object]:
+        # The new rows are every stored row after the pre-collection watermark
+        since: Optional[pd.Timestamp] = self.raw_store.max_date(self.enricher.symbol)
+        return {
+            "fetched": self._collect_raw_data(),
+            "raw_since": "" if since is None else since.isoformat(),
+        }
+
+    def _validate_stage(self, fetched: pd.DataFrame) -> dict[str, pd.DataFrame]:
+        return {"raw_rows": self._validate_raw_data(fetched)}
+
+    def _enrich_stage(self, raw_rows: pd.DataFrame, raw_since: str) -> dict[str, pd.DataFrame]:
+        self._enrich_data(raw_rows, pd.Timestamp(raw_since) if raw_since else None)
+        return {"enriched": self.enricher.dataset()}
+
+    def _train_stage(self, enriched: pd.DataFrame) -> dict[str, str]:
+        if enriched.empty:
+            self.logger.warning(self.CLASS_NAME, "_train_stage", "Empty enriched dataset – training skipped.")
+        else:
+            self._train_model(enriched)
+        # The version now served; the dashboard's residuals are computed with it
+        return {"model_version": self.modeller.registry.latest(self.modeller.MODEL_KEY) or ""}
+
+    def _dashboard_stage(self, enriched: pd.DataFrame) -> None:
+        if enriched.empty:
+            self.logger.warning(self.CLASS_NAME, "_dashboard_stage", "Empty enriched dataset – dashboard skipped.")
+            return
+        self._launch_dashboard(enriched)
 
-        self.logger.info(self.CLASS_NAME, "run", "Pipeline execution finished.")
+    def _residuals_stage(self, enriched: pd.DataFrame, model_version: str) -> None:
+        if enriched.empty or not model_version:
+            self.logger.warning(self.CLASS_NAME, "_residuals_stage", "No dataset or model – residual chart skipped.")
+            return
+        self.dashboard.run_residuals(enriched, model_version)
 
     # ------------------------------------------------------------------
     # Phase 1 – Collection
     # ------------------------------------------------------------------
-    def _collect_raw_data(self) -> None:
+    def collect(self) -> pd.DataFrame:
+        """Run the collection phase on its own (``cli.py collect``): fetch, validate and store."""
+        return self._validate_raw_data(self._collect_raw_data())
+
+    def _collect_raw_data(self) -> pd.DataFrame:
+        """Fetch bars newer than each symbol's watermark; they are stored once validated."""
         self.logger.info(self.CLASS_NAME, "_collect_raw_data", "Collecting raw data.")
-        df: pd.DataFrame = self.collector.get_crude_oil_data()
+        watermarks: dict[str, Optional[pd.Timestamp]] = {
+            symbol: self.raw_store.max_date(symbol) for symbol in self.collector.symbols
+        }
+        df: pd.DataFrame = self.collector.get_crude_oil_data(watermarks)
         if df.empty:
-            self.logger.warning(self.CLASS_NAME, "_collect_raw_data", "No data collected.")
-            return
-        self._save_raw_csv(df)
+            self.logger.warning(self.CLASS_NAME, "_collect_raw_data", "No new data collected.")
+        return df
+
+    def _save_raw_data(self, df: pd.DataFrame) -> None:
+        try:
+            touched: list[str] = self.raw_store.upsert(df)
+            self.logger.info(
+                self.CLASS_NAME,
+                "_save_raw_data",
+                f"Raw data merged into {self.RAW_STORE_DIR} (partitions written: {touched})",
+            )
+        except Exception as error:
+            self.logger.error(self.CLASS_NAME, "_save_raw_data", f"Failed to save raw data: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._save_raw_data: {error}")
 
-    def _save_raw_csv(self, df: pd.DataFrame) -> None:
+    def _seed_raw_store(self) -> None:
+        """Import the legacy single-file raw CSV once, when the store is still empty."""
+        if not self.raw_store.is_empty() or not self.LEGACY_RAW_PATH.exists():
+            return
         try:
-            if self.RAW_OUTPUT_PATH.exists():
-                existing_df: pd.DataFrame = pd.read_csv(self.RAW_OUTPUT_PATH)
-                combined_df: pd.DataFrame = pd.concat([existing_df, df], ignore_index=True)
-                combined_df.drop_duplicates(subset=["date"], inplace=True)
-            else:
-                combined_df = df
-
-            combined_df.sort_values(by="date", ascending=False, inplace=True)
-            combined_df.to_csv(self.RAW_OUTPUT_PATH, index=False)
+            legacy_df: pd.DataFrame = pd.read_csv(self.LEGACY_RAW_PATH)
+            legacy_df.insert(0, "symbol", self.LEGACY_SYMBOL)
+            self.raw_store.upsert(RAW_SCHEMA.normalise(legacy_df))
             self.logger.info(
                 self.CLASS_NAME,
-                "_save_raw_csv",
-                f"Raw data merged and saved to {self.RAW_OUTPUT_PATH}",
+                "_seed_raw_store",
+                f"Raw store seeded from {self.LEGACY_RAW_PATH}",
             )
         except Exception as error:
-            self.logger.error(self.CLASS_NAME, "_save_raw_csv", f"Failed to save raw CSV: {error}")
+            self.logger.error(self.CLASS_NAME, "_seed_raw_store", f"Failed to seed raw store: {error}")
+
+    # ------------------------------------------------------------------
+    # Phase 1b – Validation
+    # ------------------------------------------------------------------
+    def _validate_raw_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Quarantine the fetched rows failing validation and store the rest; return the stored rows."""
+        if df.empty:
+            return df
+        result: ValidationResult = self.validator.validate(df, context=self._validation_context(df))
+        if not result.clean.empty:
+            self._save_raw_data(result.clean)
+        return result.clean
+
+    def _validation_context(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Stored bars of the fetched symbols shortly before the batch (gap and outlier checks)."""
+        dates: pd.Series = RAW_SCHEMA.parse_dates(df["date"]).dropna() if "date" in df.columns else pd.Series()
+        if dates.empty or self.raw_store.is_empty():
+            return pd.DataFrame()
+        symbols: Optional[list[str]] = df["symbol"].astype(str).unique().tolist() if "symbol" in df.columns else None
+        return self.raw_store.load(
+            start=dates.min() - self.validator.CONTEXT_SPAN, columns=["close"], symbols=symbols
+        )
 
     # ------------------------------------------------------------------
     # Phase 2 – Enrichment
     # ------------------------------------------------------------------
-    def _enrich_data(self) -> pd.DataFrame:
+    def _enrich_data(
+        self,
+        raw_rows: Optional[pd.DataFrame] = None,
+        since: Optional[pd.Timestamp] = None,
+    ) -> pd.DataFrame:
         self.logger.info(self.CLASS_NAME, "_enrich_data", "Starting enrichment phase.")
-        df_enriched: pd.DataFrame = self.enricher.enrich()
+        df_enriched: pd.DataFrame = self.enricher.enrich(new_rows=raw_rows, since=since)
         if df_enriched.empty:
             self.logger.warning(self.CLASS_NAME, "_enrich_data", "Enrichment produced an empty DataFrame.")
         return df_enriched
@@ -80,16 +215,20 @@ class CrudeOilDataPipeline:
     # ------------------------------------------------------------------
     # Phase 3 – Modelling
     # ------------------------------------------------------------------
-    def _train_model(self) -> None:
+    def _train_model(self, enriched: Optional[pd.DataFrame] = None) -> None:
         self.logger.info(self.CLASS_NAME, "_train_model", "Starting model training phase.")
-        self.modeller.train()
+        # Only rows enriched since the last run are folded into the saved statistics
+        self.modeller.train_incremental(enriched)
+        # Walk-forward validation; cheap enough to run every time for LinearRegression
+        self.modeller.backtest(dataset=enriched)
 
     # ------------------------------------------------------------------
     # Phase 4 – Dashboard
     # ------------------------------------------------------------------
-    def _launch_dashboard(self) -> None:
+    def _launch_dashboard(self, enriched: Optional[pd.DataFrame] = None) -> None:
         self.logger.info(self.CLASS_NAME, "_launch_dashboard", "Launching dashboard.")
-        self.dashboard.run()
+        # The residual chart is the "residuals" stage, which waits for training
+        self.dashboard.run(enriched, residuals=False)
 
 
 # ----------------------------------------------------------------------
@@ -97,8 +236,15 @@ class CrudeOilDataPipeline:
 # ----------------------------------------------------------------------
 
 def main() -> None:
-    pipeline = CrudeOilDataPipeline()
-    pipeline.run()
+    """``python src/crude_oil/main.py [--force] ...`` runs ``cli.py run [--force] ...``.
+
+    Unlike the CLI it always exits with status 0, as the scheduled workflow expects.
+    """
+    import sys
+
+    from cli import main as cli_main
+
+    cli_main(["run", *sys.argv[1:]])
 
 
 if __name__ == "__main__":
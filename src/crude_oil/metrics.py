@@ -0,0 +1,357 @@
+"""Metrics module.
+
+This module provides the Instrumentation class, which records per-stage
+telemetry for the pipeline: wall and CPU time, peak memory, rows in and
+out, and bytes read and written. Components wrap their work in
+``INSTRUMENTATION.stage(...)`` (or decorate it with ``instrument``) and
+report rows through the yielded StageProbe; storage backends report file
+bytes for whatever stages are open on the calling thread. Components that
+log and handle an error also report it with ``record_error``, so their
+stages are recorded as failed. Work handed to a thread pool through
+``INSTRUMENTATION.propagate`` counts toward the stages open in the
+submitting thread: bytes and errors as they happen, rows when the worker's
+outermost stage closes. CPU time is that of the thread running the stage.
+Memory is process-wide: the change in resident set size over the stage,
+the process's resident-set high-water mark so far, and tracemalloc's peak
+while the stage was open when tracing is enabled.
+
+At the end of a run the records are appended to a JSON-lines report and,
+optionally, written as a Prometheus textfile (node_exporter textfile
+collector format). One chosen stage can be profiled with cProfile, or with
+pyinstrument when it is installed.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Final, Iterator, Optional
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:  # pragma: no cover - optional dependency
+    InstrumentProfiler = None
+
+
+@dataclass
+class StageProbe:
+    """Counters of one running stage; the instrumented code fills in rows and bytes."""
+
+    stage: str
+    component: str
+    rows_in: int = 0
+    rows_out: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    # Extra numeric facts worth keeping (e.g. charts rendered, folds)
+    extra: dict[str, float] = field(default_factory=dict)
+    # Highest traced allocation seen while this stage was open
+    traced_peak: int = 0
+    # Errors the instrumented code handled itself (the stage still counts as failed)
+    errors: list[str] = field(default_factory=list)
+    # Enclosing stage, possibly open on another thread; it also receives bytes and errors
+    parent: Optional[StageProbe] = field(default=None, repr=False, compare=False)
+
+    def add_rows(self, rows_in: int = 0, rows_out: int = 0) -> None:
+        self.rows_in += int(rows_in)
+        self.rows_out += int(rows_out)
+
+
+def _max_rss_bytes() -> Optional[int]:
+    """Process resident-set high-water mark (ru_maxrss is KiB on Linux)."""
+    if resource is None:
+        return None
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size of the process (Linux only)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Instrumentation:
+    CLASS_NAME: Final[str] = "Instrumentation"
+
+    REPORT_PATH: Final[str] = "src/crude_oil/static/metrics/run_report.jsonl"
+    PROFILE_FOLDER: Final[str] = "src/crude_oil/static/metrics/profiles"
+    METRIC_PREFIX: Final[str] = "crude_oil_stage"
+    # Record fields exported as Prometheus gauges
+    GAUGES: Final[tuple[str, ...]] = (
+        "wall_seconds", "cpu_seconds", "rss_delta_bytes", "max_rss_bytes", "peak_traced_bytes",
+        "rows_in", "rows_out", "bytes_read", "bytes_written",
+    )
+
+    def __init__(self) -> None:
+        self.report_path: Optional[str] = self.REPORT_PATH
+        self.prometheus_path: Optional[str] = None
+        self.profile_stage: Optional[str] = None
+        self.profile_folder: str = self.PROFILE_FOLDER
+        self.trace_memory: bool = False
+        self.run_id: str = self._new_run_id()
+        self.records: list[dict] = []
+        self._lock: threading.Lock = threading.Lock()
+        self._local: threading.local = threading.local()
+        self._open: list[StageProbe] = []
+
+    def configure(
+        self,
+        report_path: Optional[str] = REPORT_PATH,
+        prometheus_path: Optional[str] = None,
+        profile_stage: Optional[str] = None,
+        trace_memory: bool = False,
+    ) -> None:
+        """Set the outputs of the next run and start it (clears previous records).
+
+        *report_path* ``None`` disables the JSON-lines report; *trace_memory*
+        turns on tracemalloc to measure Python-level peak allocations.
+        """
+        self.report_path = report_path
+        self.prometheus_path = prometheus_path
+        self.profile_stage = profile_stage
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.run_id = self._new_run_id()
+        self.records = []
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    @contextmanager
+    def stage(self, name: str, component: str = "") -> Iterator[StageProbe]:
+        """Time the enclosed block as stage *name* and record it when the block exits."""
+        probe: StageProbe = StageProbe(name, component, parent=self._current())
+        stack: list[StageProbe] = self._stack()
+        self._open_probe(probe)
+        stack.append(probe)
+        started_at: str = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds")
+        rss_start: Optional[int] = _rss_bytes()
+        wall_start: float = time.perf_counter()
+        cpu_start: float = time.thread_time()
+        error: Optional[BaseException] = None
+        try:
+            with self._profiled(name):
+                yield probe
+        except BaseException as raised:
+            error = raised
+            raise
+        finally:
+            wall: float = time.perf_counter() - wall_start
+            cpu: float = time.thread_time() - cpu_start
+            rss_end: Optional[int] = _rss_bytes()
+            stack.pop()
+            self._close_probe(probe)
+            if not stack and probe.parent is not None:
+                # Outermost stage of a pool worker: its rows count toward the submitting stage
+                with self._lock:
+                    probe.parent.add_rows(probe.rows_in, probe.rows_out)
+            errors: list[str] = probe.errors if error is None else [f"{type(error).__name__}: {error}", *probe.errors]
+            self._record({
+                "run_id": self.run_id,
+                "stage": name,
+                "component": component,
+                "started_at": started_at,
+                "status": "error" if errors else "ok",
+                "error": "; ".join(errors) or None,
+                "wall_seconds": round(wall, 6),
+                "cpu_seconds": round(cpu, 6),
+                "rss_delta_bytes": None if rss_start is None or rss_end is None else rss_end - rss_start,
+                "max_rss_bytes": _max_rss_bytes(),
+                "peak_traced_bytes": probe.traced_peak if self.trace_memory else None,
+                "rows_in": probe.rows_in,
+                "rows_out": probe.rows_out,
+                "bytes_read": probe.bytes_read,
+                "bytes_written": probe.bytes_written,
+                **({"extra": probe.extra} if probe.extra else {}),
+            })
+
+    def add_rows(self, rows_in: int = 0, rows_out: int = 0) -> None:
+        """Count rows for the innermost stage open on the calling thread (no-op outside stages)."""
+        stack: list[StageProbe] = self._stack()
+        if stack:
+            stack[-1].add_rows(rows_in, rows_out)
+
+    def record_read(self, nbytes: int) -> None:
+        """Add *nbytes* read to every stage enclosing the calling thread's work."""
+        with self._lock:
+            for probe in self._chain():
+                probe.bytes_read += int(nbytes)
+
+    def record_written(self, nbytes: int) -> None:
+        """Add *nbytes* written to every stage enclosing the calling thread's work."""
+        with self._lock:
+            for probe in self._chain():
+                probe.bytes_written += int(nbytes)
+
+    def record_error(self, message: str) -> None:
+        """Mark every stage enclosing the calling thread's work as failed (for errors handled without raising)."""
+        with self._lock:
+            for probe in self._chain():
+                probe.errors.append(message)
+
+    def propagate(self, function: Callable) -> Callable:
+        """Wrap *function* for a worker thread so its stages count toward the stages open here."""
+        parent: Optional[StageProbe] = self._current()
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            previous: Optional[StageProbe] = getattr(self._local, "parent", None)
+            self._local.parent = parent
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._local.parent = previous
+
+        return wrapper
+
+    # ------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------
+    def write_report(self) -> None:
+        """Append this run's records to the JSON-lines report and refresh the Prometheus file."""
+        with self._lock:
+            records: list[dict] = list(self.records)
+        if not records:
+            return
+        if self.report_path:
+            os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+            with open(self.report_path, "a", encoding="utf-8") as handle:
+                for record in records:
+                    handle.write(json.dumps(record, default=str) + "\n")
+        if self.prometheus_path:
+            self._write_prometheus(records)
+
+    def summary(self) -> pd.DataFrame:
+        """This run's records as a table, in completion order."""
+        with self._lock:
+            return pd.DataFrame(self.records)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _new_run_id() -> str:
+        return datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+    def _stack(self) -> list[StageProbe]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _current(self) -> Optional[StageProbe]:
+        """Innermost stage of the calling thread, else the stage that handed it the work."""
+        stack: list[StageProbe] = self._stack()
+        return stack[-1] if stack else getattr(self._local, "parent", None)
+
+    def _chain(self) -> Iterator[StageProbe]:
+        probe: Optional[StageProbe] = self._current()
+        while probe is not None:
+            yield probe
+            probe = probe.parent
+
+    def _open_probe(self, probe: StageProbe) -> None:
+        """Register *probe*; the traced peak is process-wide, so open stages keep theirs first."""
+        with self._lock:
+            if self.trace_memory and tracemalloc.is_tracing():
+                peak: int = tracemalloc.get_traced_memory()[1]
+                for running in self._open:
+                    running.traced_peak = max(running.traced_peak, peak)
+                tracemalloc.reset_peak()
+            self._open.append(probe)
+
+    def _close_probe(self, probe: StageProbe) -> None:
+        with self._lock:
+            if self.trace_memory and tracemalloc.is_tracing():
+                probe.traced_peak = max(probe.traced_peak, tracemalloc.get_traced_memory()[1])
+            self._open.remove(probe)
+
+    def _record(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    @contextmanager
+    def _profiled(self, name: str) -> Iterator[None]:
+        """Profile the block when *name* is the configured stage; dump next to the report."""
+        if name != self.profile_stage:
+            yield
+            return
+        os.makedirs(self.profile_folder, exist_ok=True)
+        stem: str = os.path.join(self.profile_folder, f"{name.replace('/', '_')}_{self.run_id}")
+        if InstrumentProfiler is not None:
+            profiler = InstrumentProfiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{stem}.html", "w", encoding="utf-8") as handle:
+                    handle.write(profiler.output_html())
+            return
+        profile: cProfile.Profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(f"{stem}.prof")
+
+    def _write_prometheus(self, records: list[dict]) -> None:
+        """Write the last record of every stage as gauges, atomically (textfile collector)."""
+        latest: dict[tuple[str, str], dict] = {(record["component"], record["stage"]): record for record in records}
+        lines: list[str] = []
+        for gauge in self.GAUGES:
+            metric: str = f"{self.METRIC_PREFIX}_{gauge}"
+            lines.append(f"# TYPE {metric} gauge")
+            for (component, stage), record in sorted(latest.items()):
+                if record.get(gauge) is not None:
+                    lines.append(f'{metric}{{component="{component}",stage="{stage}"}} {record[gauge]}')
+        lines.append(f"# TYPE {self.METRIC_PREFIX}_success gauge")
+        for (component, stage), record in sorted(latest.items()):
+            success: int = int(record["status"] == "ok")
+            lines.append(f'{self.METRIC_PREFIX}_success{{component="{component}",stage="{stage}"}} {success}')
+
+        os.makedirs(os.path.dirname(self.prometheus_path) or ".", exist_ok=True)
+        tmp_path: str = f"{self.prometheus_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prometheus_path)
+
+
+# Process-wide instance shared by every component
+INSTRUMENTATION: Final[Instrumentation] = Instrumentation()
+
+
+def instrument(name: str, component: str = "") -> Callable:
+    """Decorator recording a call as stage *name*; a returned DataFrame counts as rows out."""
+
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with INSTRUMENTATION.stage(name, component) as probe:
+                result: Any = function(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    probe.add_rows(rows_out=len(result))
+                return result
+
+        return wrapper
+
+    return decorator
@@ -3,60 +3,88 @@
 This module contains the Modeller class, responsible for training and
 serving a linear regression model to predict future crude‑oil prices.
 The class mirrors the structure and logging style of the Collector class.
+Every trained model is saved as a new version in the ModelRegistry, and
+predictions go through a RegistryModelCache, so the model is read once and
+only reloaded when a newer version is registered.
 """
 
 from __future__ import annotations
 
 import os
-from typing import Tuple, Optional
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, Tuple
 
-import joblib
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from sklearn.model_selection import train_test_split
 
+from backtest import Backtester, LinearSufficientStats
+from features import FEATURE_REGISTRY
 from logger import Logger
+from metrics import INSTRUMENTATION, instrument
+from schema import RAW_SCHEMA
+from registry import ModelRegistry
+from serving import ModelServer, RegistryModelCache
+from store import PartitionedStore
+
+# scikit-learn is only imported by the training paths; predictions read compact artifacts
+if TYPE_CHECKING:
+    from sklearn.linear_model import LinearRegression
 
 
 class Modeller:
     CLASS_NAME: str = "Modeller"
 
     # Paths
-    DATA_FILE_PATH: str = "src/crude_oil/static/data/crude_oil_enriched.csv"
+    DATA_STORE_PATH: str = "src/crude_oil/static/data/enriched"
     MODEL_FOLDER_PATH: str = "src/crude_oil/static/models"
-    MODEL_FILE_PATH: str = os.path.join(MODEL_FOLDER_PATH, "model.pkl")
-
-    # Feature / target definition
-    FEATURES: list[str] = [
-        "close",
-        "rolling_mean_7",
-        "rolling_std_7",
-        "log_return",
-        "day_of_week",
-    ]
+    # Sufficient statistics behind the incrementally updated model
+    STATS_FILE_PATH: str = os.path.join(MODEL_FOLDER_PATH, "model_stats.npz")
+
+    # Feature / target definition (model inputs are flagged in the feature registry)
+    FEATURES: list[str] = FEATURE_REGISTRY.model_features()
     TARGET: str = "target"
+    SYMBOL: str = "CL=F"
+    # Registry key of the served next-day linear model; only the Modeller writes it
+    MODEL_KEY: str = ModelRegistry.model_key(SYMBOL, 1, "linear")
 
-    def __init__(self, logger: Logger) -> None:
+    # Share of the rows held out (chronologically) to evaluate a model fitted from scratch
+    TEST_SIZE: float = 0.2
+    # Weight decay per row for incremental updates (1.0 keeps every row at full weight)
+    FORGETTING: float = 1.0
+    # Largest coefficient difference tolerated between incremental and full fits
+    VERIFY_TOLERANCE: float = 1e-6
+
+    def __init__(self, logger: Logger, forgetting: float = FORGETTING) -> None:
         """Create a Modeller instance and verify required folders exist."""
         self.logger: Logger = logger
+        self.forgetting: float = forgetting
         self._verify_folder(self.MODEL_FOLDER_PATH)
+        self.data_store: PartitionedStore = PartitionedStore(
+            root=self.DATA_STORE_PATH, name="crude_oil_enriched", logger=self.logger, schema=RAW_SCHEMA
+        )
+        self.registry: ModelRegistry = ModelRegistry(logger=self.logger)
+        self.model_cache: RegistryModelCache = RegistryModelCache(self.registry, self.MODEL_KEY, logger=self.logger)
+        self.server: ModelServer = ModelServer(self.model_cache, self.FEATURES, logger=self.logger)
 
-
+    @instrument("train", CLASS_NAME)
     def train(self) -> None:
         """Train a LinearRegression model and store it."""
+        from sklearn.linear_model import LinearRegression
+        from sklearn.metrics import mean_absolute_error, mean_squared_error
+        from sklearn.model_selection import train_test_split
+
         df: pd.DataFrame = self._load_dataset()
+        INSTRUMENTATION.add_rows(rows_in=len(df))
         if df.empty:
             self.logger.error(self.CLASS_NAME, "train", "Empty dataset – aborting training.")
             return
 
         X, y = self._split_features_target(df)
 
+        # Chronological hold-out: shuffling a time series leaks future prices into training
         X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
+            X, y, test_size=self.TEST_SIZE, shuffle=False
         )
-        self.logger.info(self.CLASS_NAME, "train", "Dataset split into train/test subsets.")
+        self.logger.info(self.CLASS_NAME, "train", "Dataset split into train/test subsets (chronological).")
 
         model: LinearRegression = LinearRegression()
         model.fit(X_train, y_train)
@@ -73,26 +101,170 @@ class Modeller:
         )
 
         # Persist model
-        self._save_model(model)
+        dates: pd.Series = df["date"]
+        self._save_model(model, {
+            "data_start": dates.iloc[0].strftime("%Y-%m-%d"),
+            "data_end": dates.iloc[len(X_train) - 1].strftime("%Y-%m-%d"),
+            "rows_train": len(X_train),
+            "rows_test": len(X_test),
+            "rmse": rmse,
+            "mae": mae,
+            "data_hash": ModelRegistry.data_hash(X_train.to_numpy(float), y_train.to_numpy(float)),
+        })
+
+    @instrument("train_incremental", CLASS_NAME)
+    def train_incremental(self, dataset: Optional[pd.DataFrame] = None) -> None:
+        """Fold rows enriched since the last update into the saved statistics and refit.
+
+        Only the rows after the watermark (the last date folded in, to the
+        nanosecond) are read and the update costs O(new rows × features²).
+        Without usable statistics (first run, changed features or forgetting
+        factor, or enriched rows up to the watermark rewritten since) they are
+        rebuilt from the whole dataset. An in-memory enriched *dataset*
+        replaces the read of the store.
+
+        The registered RMSE/MAE are prequential: each row is scored by the
+        model fitted before it was folded in. A rebuild folds the first rows
+        unscored and scores the chronological hold-out of :meth:`train`.
+        """
+        stats, metadata = self._load_stats()
+        after: Optional[pd.Timestamp] = pd.Timestamp(metadata["watermark"]) if stats is not None else None
+        df: pd.DataFrame = self._load_dataset(after=after) if dataset is None else self._select(dataset, after)
+        INSTRUMENTATION.add_rows(rows_in=len(df))
+        if df.empty:
+            if stats is None:
+                self.logger.error(self.CLASS_NAME, "train_incremental", "Empty dataset – aborting training.")
+            else:
+                self.logger.info(self.CLASS_NAME, "train_incremental", "No new rows – model unchanged.")
+            return
+
+        df = df.sort_values("date", kind="stable")
+        X, y = self._split_features_target(df)
+        X_new, y_new = X.to_numpy(float), y.to_numpy(float)
+        if stats is None:
+            stats = LinearSufficientStats(
+                len(self.FEATURES), X.mean().to_numpy(float), float(y.mean()), self.forgetting
+            )
+            metadata = {"data_start": df["date"].min().strftime("%Y-%m-%d"), "data_hash": ""}
+            fitted: int = len(df) - int(len(df) * self.TEST_SIZE)
+            stats.update(X_new[:fitted], y_new[:fitted])
+            X_new, y_new = X_new[fitted:], y_new[fitted:]
+        # Out-of-sample errors of the current model on the rows about to be folded in
+        coef, intercept = stats.solve()
+        errors: np.ndarray = X_new @ coef + intercept - y_new
+        stats.update(X_new, y_new)
+
+        watermark: pd.Timestamp = df["date"].max()
+        metadata = {
+            "features": self.FEATURES,
+            "data_start": metadata.get("data_start", df["date"].min().strftime("%Y-%m-%d")),
+            "watermark": watermark.isoformat(),
+            # Changes when enriched partitions up to the watermark are rewritten (e.g. ``enrich --full``)
+            "store_revision": self.data_store.revision(self.SYMBOL, until=watermark),
+            "data_hash": ModelRegistry.data_hash(
+                X.to_numpy(float), y.to_numpy(float), previous=metadata.get("data_hash", "")
+            ),
+            # Running prequential error sums since the statistics were last rebuilt
+            "rows_test": metadata.get("rows_test", 0) + len(errors),
+            "squared_error": metadata.get("squared_error", 0.0) + float(errors @ errors),
+            "absolute_error": metadata.get("absolute_error", 0.0) + float(np.abs(errors).sum()),
+        }
+        # Left out until a row has been scored (a rebuild on fewer than 1 / TEST_SIZE rows)
+        scored: int = metadata["rows_test"]
+        evaluation: dict[str, float] = {
+            "rmse": float(np.sqrt(metadata["squared_error"] / scored)),
+            "mae": metadata["absolute_error"] / scored,
+        } if scored else {}
+        version: Optional[str] = self._save_model(self._model_from_stats(stats), {
+            "data_start": metadata["data_start"],
+            "data_end": metadata["watermark"],
+            "rows_train": stats.n,
+            "rows_test": scored,
+            **evaluation,
+            "forgetting": stats.forgetting,
+            "data_hash": metadata["data_hash"],
+        })
+        # Statistics ahead of the registered model would hide these rows from the next update
+        if version is None:
+            return
+        self._save_stats(stats, metadata)
+        self.logger.info(
+            self.CLASS_NAME,
+            "train_incremental",
+            f"Model updated with {len(df)} new rows ({stats.n:.1f} effective rows), prequential "
+            f"{', '.join(f'{name.upper()}={value:.4f}' for name, value in evaluation.items()) or 'error not scored yet'}.",
+        )
+
+    def verify_incremental(self) -> bool:
+        """Check that the incrementally updated model equals a full (weighted) refit."""
+        from sklearn.linear_model import LinearRegression
+
+        stats, metadata = self._load_stats()
+        if stats is None:
+            self.logger.warning(self.CLASS_NAME, "verify_incremental", "No incremental statistics to verify.")
+            return False
+        watermark: pd.Timestamp = pd.Timestamp(metadata["watermark"])
+
+        df: pd.DataFrame = self._load_dataset().sort_values("date", kind="stable")
+        X, y = self._split_features_target(df[df["date"] <= watermark])
+        full: LinearRegression = LinearRegression().fit(X, y, sample_weight=stats.weights(len(X)))
+        incremental: LinearRegression = self._model_from_stats(stats)
+
+        difference: float = float(
+            max(np.abs(full.coef_ - incremental.coef_).max(), abs(full.intercept_ - incremental.intercept_))
+        )
+        matches: bool = difference <= self.VERIFY_TOLERANCE
+        log = self.logger.info if matches else self.logger.error
+        log(
+            self.CLASS_NAME,
+            "verify_incremental",
+            f"Incremental vs full refit on {len(X)} rows: max |Δ| = {difference:.3e} "
+            f"({'match' if matches else 'MISMATCH'}).",
+        )
+        return matches
+
+    @instrument("backtest", CLASS_NAME)
+    def backtest(
+        self,
+        estimator: Optional[Any] = None,
+        step: int = Backtester.STEP,
+        dataset: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        """Walk-forward evaluation of *estimator* (LinearRegression by default), one row per fold."""
+        df: pd.DataFrame = self._load_dataset() if dataset is None else self._select(dataset)
+        INSTRUMENTATION.add_rows(rows_in=len(df))
+        if df.empty:
+            self.logger.error(self.CLASS_NAME, "backtest", "Empty dataset – aborting backtest.")
+            return pd.DataFrame()
+        return Backtester(self.logger, step=step).run(df, self.FEATURES, self.TARGET, estimator=estimator)
 
     def predict(self, X: pd.DataFrame) -> np.ndarray:
         """Generate predictions for the provided feature DataFrame."""
-        model: Optional[LinearRegression] = self._load_model()
-        if model is None:
-            return np.array([])
-
         try:
-            predictions: np.ndarray = model.predict(X)
-            self.logger.info(
-                self.CLASS_NAME,
-                "predict",
-                f"Generated predictions for {len(predictions)} records.",
-            )
-            return predictions
+            return self.server.predict_batch(X)
         except Exception as error:  # noqa: BLE001
             self.logger.error(self.CLASS_NAME, "predict", f"Prediction error: {error}")
             return np.array([])
 
+    def predict_latest(self, rows: int = 1) -> pd.DataFrame:
+        """Predict the next close from the newest *rows* enriched rows, reading only the newest partition."""
+        latest: Optional[pd.Timestamp] = self.data_store.max_date(self.SYMBOL)
+        if latest is None:
+            self.logger.error(self.CLASS_NAME, "predict_latest", "Empty enriched dataset – nothing to predict.")
+            return pd.DataFrame()
+        columns: list[str] = list(dict.fromkeys(["close", *self.FEATURES]))
+        df: pd.DataFrame = self.data_store.load(
+            start=pd.Timestamp(latest.year, 1, 1), columns=columns, symbols=[self.SYMBOL]
+        )
+        df = df.sort_values("date", kind="stable").tail(rows).reset_index(drop=True)
+        predictions: np.ndarray = self.predict(df[self.FEATURES])
+        if len(predictions) != len(df):
+            return pd.DataFrame()
+        return pd.DataFrame({"date": df["date"], "close": df["close"], "prediction": predictions})
+
+    def predict_stream(self, chunks: Iterable[pd.DataFrame]) -> Iterator[np.ndarray]:
+        """Yield predictions chunk by chunk for frames too large to score at once."""
+        return self.server.predict_stream(chunks)
 
     def _verify_folder(self, path: str) -> None:
         """Ensure *path* exists; create it if missing."""
@@ -104,10 +276,14 @@ class Modeller:
                 f"Created missing folder at {path}",
             )
 
-    def _load_dataset(self) -> pd.DataFrame:
-        """Load the enriched crude‑oil dataset from disk."""
+    def _load_dataset(self, after: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Load the feature and target columns of the enriched dataset (rows dated after *after*)."""
         try:
-            df: pd.DataFrame = pd.read_csv(self.DATA_FILE_PATH)
+            df: pd.DataFrame = self.data_store.load(
+                start=after, columns=[*self.FEATURES, self.TARGET], symbols=[self.SYMBOL]
+            )
+            if after is not None and not df.empty:
+                df = df[df["date"] > after].reset_index(drop=True)
             self.logger.info(
                 self.CLASS_NAME,
                 "_load_dataset",
@@ -120,8 +296,16 @@ class Modeller:
                 "_load_dataset",
                 f"Failed to load dataset: {error}",
             )
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._load_dataset: {error}")
             return pd.DataFrame()
 
+    def _select(self, dataset: pd.DataFrame, after: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Date, feature and target columns of an in-memory enriched *dataset* (rows dated after *after*)."""
+        df: pd.DataFrame = dataset[["date", *self.FEATURES, self.TARGET]]
+        if after is not None:
+            df = df[df["date"] > after]
+        return df.reset_index(drop=True)
+
     def _split_features_target(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
         """Return X (features) and y (target) DataFrames ready for training."""
         X: pd.DataFrame = df[self.FEATURES]
@@ -129,28 +313,66 @@ class Modeller:
         self.logger.info(self.CLASS_NAME, "_split_features_target", "Features and target extracted.")
         return X, y
 
-    def _save_model(self, model: LinearRegression) -> None:
-        """Persist the trained model to disk."""
+    def _save_model(self, model: LinearRegression, metadata: dict) -> Optional[str]:
+        """Register the trained model as a new version in the model registry; return the version."""
         try:
-            joblib.dump(model, self.MODEL_FILE_PATH)
+            version: str = self.registry.save(self.MODEL_KEY, model, {
+                "symbol": self.SYMBOL,
+                "horizon": 1,
+                "estimator": "linear",
+                "features": self.FEATURES,
+                **metadata,
+            })
             self.logger.info(
                 self.CLASS_NAME,
                 "_save_model",
-                f"Model saved at {self.MODEL_FILE_PATH}",
+                f"Model saved as {self.MODEL_KEY}@{version}",
             )
+            return version
         except Exception as error:
             self.logger.error(
                 self.CLASS_NAME,
                 "_save_model",
                 f"Error saving model: {error}",
             )
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._save_model: {error}")
+            return None
 
-    def _load_model(self) -> Optional[LinearRegression]:
-        """Load the persisted model from disk; return *None* on failure."""
+    def _model_from_stats(self, stats: LinearSufficientStats) -> LinearRegression:
+        """Build a fitted LinearRegression from sufficient statistics."""
+        from sklearn.linear_model import LinearRegression
+
+        coef, intercept = stats.solve()
+        model: LinearRegression = LinearRegression()
+        model.coef_ = coef
+        model.intercept_ = intercept
+        model.n_features_in_ = len(self.FEATURES)
+        model.feature_names_in_ = np.array(self.FEATURES, dtype=object)
+        return model
+
+    def _load_stats(self) -> Tuple[Optional[LinearSufficientStats], dict]:
+        """Return the saved statistics and their metadata (watermark, store revision, data hash), if still usable."""
+        if not os.path.exists(self.STATS_FILE_PATH):
+            return None, {}
         try:
-            model: LinearRegression = joblib.load(self.MODEL_FILE_PATH)
-            self.logger.info(self.CLASS_NAME, "_load_model", "Model loaded successfully.")
-            return model
-        except Exception as error:
-            self.logger.error(self.CLASS_NAME, "_load_model", f"Error loading model: {error}")
-            return None
+            stats, metadata = LinearSufficientStats.load(self.STATS_FILE_PATH)
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "_load_stats", f"Error loading statistics: {error}")
+            return None, {}
+        if metadata.get("features") != self.FEATURES or stats.forgetting != self.forgetting:
+            self.logger.info(self.CLASS_NAME, "_load_stats", "Model settings changed – rebuilding statistics.")
+            return None, {}
+        watermark: pd.Timestamp = pd.Timestamp(metadata["watermark"])
+        if metadata.get("store_revision") != self.data_store.revision(self.SYMBOL, until=watermark):
+            self.logger.info(
+                self.CLASS_NAME, "_load_stats", "Enriched rows already folded in were rewritten – rebuilding statistics."
+            )
+            return None, {}
+        return stats, metadata
+
+    def _save_stats(self, stats: LinearSufficientStats, metadata: dict) -> None:
+        try:
+            stats.save(self.STATS_FILE_PATH, metadata)
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "_save_stats", f"Error saving statistics: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._save_stats: {error}")
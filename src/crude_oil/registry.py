@@ -0,0 +1,220 @@
+"""Registry module.
+
+This module provides the ModelRegistry class, a versioned on-disk catalogue
+of trained models. Every model is identified by a key (for example
+``CL_F/h1/linear``, the served model, or ``grid/CL_F/h5/ridge``, a model of
+the training scheduler's grid) and each training run writes a new, immutable version
+folder under it instead of overwriting a single file. A JSON index records
+the metrics of every version and which one is the latest. Only the newest
+``keep`` versions of each key are kept; older version folders are deleted
+when a new one is registered, so the committed tree does not grow per run.
+
+Linear models are stored compactly: the intercept and coefficients as a raw
+``.npy`` array, memory-mapped on load, next to a JSON metadata file (feature
+list, training window, metrics, data hash). Loading them needs neither
+pickle nor scikit-learn. Other estimators fall back to a joblib pickle.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Final, Optional
+
+import numpy as np
+
+from logger import Logger
+from metrics import INSTRUMENTATION
+
+
+class LinearArtifact:
+    """Linear model read back from its coefficient array: ``X @ coef_ + intercept_``."""
+
+    def __init__(self, coefficients: np.ndarray, features: list[str]) -> None:
+        self.intercept_: float = float(coefficients[0])
+        self.coef_: np.ndarray = coefficients[1:]
+        self.features: list[str] = features
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Predict a DataFrame (columns picked by name) or a 2-D array in feature order."""
+        values: Any = X[self.features] if hasattr(X, "columns") else X
+        return np.asarray(values, dtype=float) @ self.coef_ + self.intercept_
+
+
+class ModelRegistry:
+    CLASS_NAME: Final[str] = "ModelRegistry"
+
+    ROOT_PATH: Final[str] = "src/crude_oil/static/models/registry"
+    INDEX_NAME: Final[str] = "index.json"
+    MODEL_NAME: Final[str] = "model.pkl"
+    COEFFICIENTS_NAME: Final[str] = "coefficients.npy"
+    METADATA_NAME: Final[str] = "metadata.json"
+    VERSION_FORMAT: Final[str] = "%Y%m%dT%H%M%SZ"
+    # Versions kept per key; registering a newer one deletes the oldest
+    KEEP_VERSIONS: Final[int] = 5
+
+    def __init__(self, logger: Logger, root: str = ROOT_PATH, keep: int = KEEP_VERSIONS) -> None:
+        if keep < 1:
+            raise ValueError(f"keep must be at least 1, got {keep}")
+        self.logger: Logger = logger
+        self.root: str = root
+        self.keep: int = keep
+        self.index_path: str = os.path.join(root, self.INDEX_NAME)
+        os.makedirs(root, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Keys and versions
+    # ------------------------------------------------------------------
+    @staticmethod
+    def safe_name(symbol: str) -> str:
+        """File-system friendly form of a ticker ("CL=F" -> "CL_F")."""
+        return "".join(char if char.isalnum() else "_" for char in symbol)
+
+    @classmethod
+    def model_key(cls, symbol: str, horizon: int, estimator: str, namespace: str = "") -> str:
+        """Key of a model; a *namespace* keeps e.g. the grid's models apart from the served one."""
+        key: str = f"{cls.safe_name(symbol)}/h{horizon}/{estimator}"
+        return f"{namespace}/{key}" if namespace else key
+
+    def new_version(self) -> str:
+        """Return a fresh, sortable version id (UTC timestamp) for a training run."""
+        version: str = datetime.datetime.now(datetime.timezone.utc).strftime(self.VERSION_FORMAT)
+        # Continue after the highest suffix of this second: a pruned id is never reused
+        suffixes: list[int] = [
+            1 if entry["version"] == version else int(entry["version"].rsplit("-", 1)[1])
+            for model in self._load_index().values()
+            for entry in model["versions"]
+            if entry["version"] == version or entry["version"].startswith(f"{version}-")
+        ]
+        return f"{version}-{max(suffixes) + 1}" if suffixes else version
+
+    def artifact_dir(self, key: str, version: str) -> str:
+        return os.path.join(self.root, key, version)
+
+    # ------------------------------------------------------------------
+    # Artifacts
+    # ------------------------------------------------------------------
+    @staticmethod
+    def data_hash(*arrays: np.ndarray, previous: str = "") -> str:
+        """SHA-256 of the training data, to tell which data a version was fitted on.
+
+        Incremental fits chain the hash of the rows seen so far as *previous*.
+        """
+        digest = hashlib.sha256(previous.encode("ascii"))
+        for array in arrays:
+            digest.update(np.ascontiguousarray(array, dtype=float).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def is_linear(model: Any) -> bool:
+        """True for fitted scikit-learn linear regressors (one output)."""
+        return (
+            type(model).__module__.startswith("sklearn.linear_model")
+            and np.ndim(getattr(model, "coef_", None)) == 1
+            and np.ndim(getattr(model, "intercept_", None)) == 0
+        )
+
+    @classmethod
+    def write_artifact(cls, folder: str, model: Any, metadata: dict) -> None:
+        """Write one model version; safe to call from worker processes."""
+        os.makedirs(folder, exist_ok=True)
+        if cls.is_linear(model):
+            coefficients: np.ndarray = np.concatenate([[model.intercept_], model.coef_]).astype(float)
+            np.save(os.path.join(folder, cls.COEFFICIENTS_NAME), coefficients)
+            metadata = {**metadata, "format": "linear"}
+        else:
+            import joblib
+
+            joblib.dump(model, os.path.join(folder, cls.MODEL_NAME))
+            metadata = {**metadata, "format": "pickle"}
+        # Metadata last: a version folder with metadata is complete
+        with open(os.path.join(folder, cls.METADATA_NAME), "w", encoding="utf-8") as handle:
+            json.dump(metadata, handle, indent=2, sort_keys=True, default=str)
+
+    def save(self, key: str, model: Any, metadata: dict) -> str:
+        """Write *model* as a new version of *key*, make it the latest and return the version."""
+        version: str = self.new_version()
+        self.write_artifact(self.artifact_dir(key, version), model, metadata)
+        self.register(key, version, metadata)
+        return version
+
+    def register(self, key: str, version: str, metadata: dict) -> None:
+        """Record *version* of *key* in the index and make it the latest."""
+        self.register_many([(key, version, metadata)])
+
+    def register_many(self, entries: list[tuple[str, str, dict]]) -> None:
+        """Record several (key, version, metadata) entries with a single index write.
+
+        Versions of the touched keys beyond the newest ``keep`` are dropped
+        from the index and their folders deleted once the index is saved.
+        """
+        index: dict[str, dict] = self._load_index()
+        pruned: list[tuple[str, str]] = []
+        for key, version, metadata in entries:
+            model: dict = index.setdefault(key, {"latest": None, "versions": []})
+            model["versions"] = [entry for entry in model["versions"] if entry["version"] != version]
+            model["versions"].append({"version": version, **metadata})
+            model["latest"] = version
+            pruned.extend((key, entry["version"]) for entry in model["versions"][:-self.keep])
+            model["versions"] = model["versions"][-self.keep:]
+        self._save_index(index)
+        # Folders go after the index, so the index never lists a deleted version
+        for key, version in pruned:
+            shutil.rmtree(self.artifact_dir(key, version), ignore_errors=True)
+        self.logger.info(
+            self.CLASS_NAME,
+            "register_many",
+            f"Registered {len(entries)} model versions, pruned {len(pruned)} old versions.",
+        )
+
+    def load(self, key: str, version: Optional[str] = None) -> Any:
+        """Load *version* of *key* (the latest by default); return None on failure."""
+        version = version or self.latest(key)
+        if version is None:
+            self.logger.error(self.CLASS_NAME, "load", f"No registered versions for {key}")
+            return None
+        folder: str = self.artifact_dir(key, version)
+        try:
+            metadata: dict = self.metadata(key, version)
+            if metadata.get("format") == "linear":
+                coefficients: np.ndarray = np.load(os.path.join(folder, self.COEFFICIENTS_NAME), mmap_mode="r")
+                return LinearArtifact(coefficients, metadata["features"])
+            import joblib
+
+            return joblib.load(os.path.join(folder, self.MODEL_NAME))
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "load", f"Error loading {key}@{version}: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}.load: {error}")
+            return None
+
+    def metadata(self, key: str, version: str) -> dict:
+        with open(os.path.join(self.artifact_dir(key, version), self.METADATA_NAME), encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def latest(self, key: str) -> Optional[str]:
+        return self._load_index().get(key, {}).get("latest")
+
+    def versions(self, key: str) -> list[dict]:
+        """Index entries of every version of *key*, oldest first."""
+        return list(self._load_index().get(key, {}).get("versions", []))
+
+    def keys(self) -> list[str]:
+        return sorted(self._load_index())
+
+    # ------------------------------------------------------------------
+    # Index I/O
+    # ------------------------------------------------------------------
+    def _load_index(self) -> dict[str, dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _save_index(self, index: dict[str, dict]) -> None:
+        tmp_path: str = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(index, handle, indent=2, sort_keys=True, default=str)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,226 @@
+"""Render module.
+
+This module provides the RenderEngine class, which turns declarative chart
+specifications into PNG files. Each chart's input slice and styling are
+fingerprinted and charts whose fingerprint matches the last render are
+skipped. Charts are drawn with Matplotlib's object-oriented Agg API (no
+pyplot global state), so the remaining ones can render in a process pool,
+and every series is decimated to a point budget before it is plotted.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Final, Optional
+
+import numpy as np
+import pandas as pd
+
+from downsample import lttb, minmax
+from logger import Logger
+from metrics import INSTRUMENTATION
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+
+@dataclass
+class ChartSpec:
+    """One line chart: *series* are (column, label, color) drawn against *x*."""
+
+    name: str
+    title: str
+    data: pd.DataFrame
+    series: tuple[tuple[str, str, Optional[str]], ...]
+    ylabel: str
+    x: str = "date"
+    xlabel: str = "Fecha"
+    # Optional shaded (low, high) band, e.g. a moving average ± one std
+    band: Optional[tuple[str, str]] = None
+    # Horizontal reference line, e.g. zero for residuals
+    hline: Optional[float] = None
+    # "lttb" keeps the shape of smooth series; "minmax" keeps every spike
+    decimation: str = "lttb"
+    size: tuple[float, float] = (10, 4)
+    # Fingerprint of the data's source (e.g. a store's manifest); when set it
+    # replaces hashing *data*, so a chart can be checked before its data is read
+    source: Optional[str] = None
+
+    def columns(self) -> list[str]:
+        band: tuple[str, ...] = self.band or ()
+        return [self.x, *(column for column, _, _ in self.series), *band]
+
+    def fingerprint(self) -> str:
+        """Hash of the plotted data (or its *source*) and every styling field."""
+        digest = hashlib.sha256()
+        if self.source is not None:
+            digest.update(self.source.encode("utf-8"))
+        else:
+            values: pd.Series = pd.util.hash_pandas_object(self.data[self.columns()], index=False)
+            digest.update(values.to_numpy().tobytes())
+        style: dict = {
+            "title": self.title,
+            "series": self.series,
+            "ylabel": self.ylabel,
+            "xlabel": self.xlabel,
+            "band": self.band,
+            "hline": self.hline,
+            "decimation": self.decimation,
+            "size": self.size,
+        }
+        digest.update(json.dumps(style, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+
+def _draw(spec: ChartSpec, path: str) -> str:
+    """Render *spec* to *path*; runs in worker processes."""
+    # Matplotlib is only imported once a chart actually needs drawing
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig: Figure = Figure(figsize=spec.size)
+    ax = fig.add_subplot()
+    data: pd.DataFrame = spec.data
+    if spec.band is not None:
+        ax.fill_between(data[spec.x], data[spec.band[0]], data[spec.band[1]], alpha=0.2)
+    for column, label, color in spec.series:
+        ax.plot(data[spec.x], data[column], label=label, color=color)
+    if spec.hline is not None:
+        ax.axhline(spec.hline, color="grey", linewidth=0.8)
+    ax.set_title(spec.title)
+    ax.set_xlabel(spec.xlabel)
+    ax.set_ylabel(spec.ylabel)
+    ax.grid(True)
+    if len(spec.series) > 1:
+        ax.legend()
+    fig.tight_layout()
+    FigureCanvasAgg(fig).print_png(path)
+    return path
+
+
+class RenderEngine:
+    CLASS_NAME: Final[str] = "RenderEngine"
+
+    MANIFEST_NAME: Final[str] = "render_manifest.json"
+    MAX_POINTS: Final[int] = 2_000
+    # Engines of one process may render into the same folder concurrently (DAG stages)
+    _manifest_lock: threading.Lock = threading.Lock()
+
+    def __init__(
+        self,
+        output_folder: str,
+        logger: Logger,
+        max_workers: Optional[int] = None,
+        max_points: int = MAX_POINTS,
+    ) -> None:
+        self.output_folder: str = output_folder
+        self.logger: Logger = logger
+        self.max_workers: Optional[int] = max_workers
+        self.max_points: int = max_points
+        self.manifest_path: str = os.path.join(output_folder, self.MANIFEST_NAME)
+        os.makedirs(output_folder, exist_ok=True)
+
+    def path(self, spec: ChartSpec) -> str:
+        return os.path.join(self.output_folder, f"{spec.name}.png")
+
+    def render(self, specs: list[ChartSpec], force: bool = False) -> dict[str, str]:
+        """Render every changed chart and return {name: "rendered" | "skipped" | "failed"}."""
+        manifest: dict[str, str] = self._load_manifest()
+        status: dict[str, str] = {}
+        pending: list[tuple[ChartSpec, str]] = []
+        for spec in specs:
+            fingerprint: str = spec.fingerprint()
+            if not force and manifest.get(spec.name) == fingerprint and os.path.exists(self.path(spec)):
+                status[spec.name] = "skipped"
+            else:
+                pending.append((self.decimate(spec), fingerprint))
+
+        if len(pending) > 1 and self.max_workers != 1:
+            # Finish importing Matplotlib before forking: a worker forked while another
+            # pipeline stage's thread is importing it would wait forever on its import lock
+            import matplotlib.backends.backend_agg  # noqa: F401
+            import matplotlib.figure  # noqa: F401
+
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=Logger.configure_worker,
+                initargs=Logger.worker_initargs(),
+            ) as pool:
+                futures = [(spec, fingerprint, pool.submit(_draw, spec, self.path(spec))) for spec, fingerprint in pending]
+                results = [(spec, fingerprint, future.exception()) for spec, fingerprint, future in futures]
+        else:
+            results = [(spec, fingerprint, self._draw_safely(spec)) for spec, fingerprint in pending]
+
+        for spec, fingerprint, error in results:
+            if error is None:
+                status[spec.name] = "rendered"
+                # Pool workers write the PNGs; count them for the caller's stage
+                INSTRUMENTATION.record_written(os.path.getsize(self.path(spec)))
+            else:
+                self.logger.error(self.CLASS_NAME, "render", f"Error rendering {spec.name}: {error}")
+                INSTRUMENTATION.record_error(f"{self.CLASS_NAME}.render: {spec.name}: {error}")
+                status[spec.name] = "failed"
+
+        with self._manifest_lock:
+            # Another render may have recorded its charts since this one started
+            manifest = {**self._load_manifest(), **{
+                spec.name: fingerprint for spec, fingerprint, error in results if error is None
+            }}
+            self._save_manifest(manifest)
+        rendered: int = sum(value == "rendered" for value in status.values())
+        self.logger.info(
+            self.CLASS_NAME,
+            "render",
+            f"{rendered} charts rendered, {len(status) - rendered} skipped or failed.",
+        )
+        return status
+
+    def stale(self, specs: list[ChartSpec]) -> list[ChartSpec]:
+        """The *specs* whose PNG is missing or was drawn from other data or styling."""
+        manifest: dict[str, str] = self._load_manifest()
+        return [
+            spec for spec in specs
+            if manifest.get(spec.name) != spec.fingerprint() or not os.path.exists(self.path(spec))
+        ]
+
+    def decimate(self, spec: ChartSpec) -> ChartSpec:
+        """Copy of *spec* reduced to the point budget and the columns it plots."""
+        data: pd.DataFrame = spec.data[spec.columns()].dropna(subset=[spec.series[0][0]])
+        if len(data) > self.max_points:
+            values: np.ndarray = data[spec.series[0][0]].to_numpy(dtype=float)
+            if spec.decimation == "minmax":
+                keep: np.ndarray = minmax(values, self.max_points // 2)
+            else:
+                x: np.ndarray = data[spec.x].to_numpy()
+                if np.issubdtype(x.dtype, np.datetime64):
+                    x = x.astype("datetime64[ns]").astype(np.int64)
+                keep = lttb(x, values, self.max_points)
+            data = data.iloc[keep]
+        return ChartSpec(**{**vars(spec), "data": data.reset_index(drop=True)})
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _draw_safely(self, spec: ChartSpec) -> Optional[Exception]:
+        try:
+            _draw(spec, self.path(spec))
+            return None
+        except Exception as error:  # noqa: BLE001
+            return error
+
+    def _load_manifest(self) -> dict[str, str]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _save_manifest(self, manifest: dict[str, str]) -> None:
+        tmp_path: str = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
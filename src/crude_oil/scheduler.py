@@ -0,0 +1,254 @@
+"""Scheduler module.
+
+This module provides the TrainingScheduler class, which trains a grid of
+models — every combination of symbol, forecast horizon and estimator — on a
+process pool. Feature matrices are computed once per symbol in the parent
+process and written as ``.npy`` files; workers open them with ``mmap_mode``
+so the data is shared through the page cache instead of being pickled into
+every task. Each run writes a new version of every model to the
+ModelRegistry, under the ``grid/`` namespace: the grid never replaces the
+model the Modeller serves.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Final, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+
+from features import FeatureEngine, FeatureRegistry, build_default_registry
+from logger import Logger
+from registry import ModelRegistry
+from schema import RAW_SCHEMA
+from store import PartitionedStore
+
+
+# Estimators available to the grid, cloned per job
+ESTIMATORS: Final[dict[str, Any]] = {
+    "linear": LinearRegression(),
+    "ridge": Ridge(alpha=1.0),
+    "gbr": GradientBoostingRegressor(random_state=0),
+    "quantile_10": GradientBoostingRegressor(loss="quantile", alpha=0.1, random_state=0),
+    "quantile_90": GradientBoostingRegressor(loss="quantile", alpha=0.9, random_state=0),
+}
+
+
+@dataclass(frozen=True)
+class TrainingJob:
+    """One cell of the (symbol × horizon × estimator) grid."""
+
+    symbol: str
+    horizon: int
+    estimator: str
+
+
+def _train_job(
+    job: TrainingJob,
+    x_path: str,
+    y_path: str,
+    column: int,
+    test_size: float,
+    folder: str,
+    metadata: dict,
+) -> dict:
+    """Fit one job on memory-mapped matrices, write its artifact and return its metrics."""
+    start: float = time.perf_counter()
+    X: np.ndarray = np.load(x_path, mmap_mode="r")
+    y: np.ndarray = np.load(y_path, mmap_mode="r")[:, column]
+    rows: np.ndarray = np.flatnonzero(~np.isnan(y))
+    split: int = int(len(rows) * (1 - test_size))
+    train_rows, test_rows = rows[:split], rows[split:]
+
+    model: Any = clone(ESTIMATORS[job.estimator])
+    model.fit(X[train_rows], y[train_rows])
+    errors: np.ndarray = model.predict(X[test_rows]) - y[test_rows]
+    metrics: dict = {
+        "rmse": float(np.sqrt(np.mean(errors**2))),
+        "mae": float(np.mean(np.abs(errors))),
+        "rows_train": int(len(train_rows)),
+        "rows_test": int(len(test_rows)),
+    }
+    ModelRegistry.write_artifact(folder, model, {**metadata, **metrics})
+    Logger().debug(
+        "TrainingScheduler", "_train_job", f"{job} fitted on {metrics['rows_train']} rows, RMSE {metrics['rmse']:.4f}"
+    )
+    return {**metrics, "seconds": time.perf_counter() - start}
+
+
+class TrainingScheduler:
+    CLASS_NAME: Final[str] = "TrainingScheduler"
+
+    RAW_STORE_PATH: Final[str] = "src/crude_oil/static/data/raw"
+    HORIZONS: Final[tuple[int, ...]] = (1, 5, 20)
+    TEST_SIZE: Final[float] = 0.2
+    # Registry namespace of the grid's models (Modeller.MODEL_KEY stays the Modeller's alone)
+    NAMESPACE: Final[str] = "grid"
+
+    def __init__(
+        self,
+        logger: Logger,
+        symbols: Optional[list[str]] = None,
+        horizons: tuple[int, ...] = HORIZONS,
+        estimators: Optional[list[str]] = None,
+        max_workers: Optional[int] = None,
+        registry: Optional[ModelRegistry] = None,
+        raw_store: Optional[PartitionedStore] = None,
+    ) -> None:
+        """Create a scheduler; by default every stored symbol and every estimator is trained."""
+        unknown: list[str] = [name for name in estimators or [] if name not in ESTIMATORS]
+        if unknown:
+            raise ValueError(f"Unknown estimators: {unknown}")
+        self.logger: Logger = logger
+        self.horizons: tuple[int, ...] = tuple(horizons)
+        self.estimators: list[str] = list(estimators or ESTIMATORS)
+        self.max_workers: Optional[int] = max_workers
+        self.registry: ModelRegistry = registry or ModelRegistry(logger)
+        self.raw_store: PartitionedStore = raw_store or PartitionedStore(
+            root=self.RAW_STORE_PATH, name="crude_oil", logger=self.logger, schema=RAW_SCHEMA
+        )
+        self.symbols: list[str] = list(symbols) if symbols is not None else self.raw_store.symbols()
+
+        self.feature_registry: FeatureRegistry = build_default_registry()
+        for horizon in self.horizons:
+            if self.target_name(horizon) not in self.feature_registry.specs:
+                self.feature_registry.register(self.target_name(horizon), "lead", "close", periods=horizon)
+        self.engine: FeatureEngine = FeatureEngine(self.feature_registry)
+        self.features: list[str] = self.feature_registry.model_features()
+
+    @staticmethod
+    def target_name(horizon: int) -> str:
+        """Column holding the close *horizon* sessions ahead (``target`` for one day)."""
+        return "target" if horizon == 1 else f"target_{horizon}"
+
+    def build_jobs(self) -> list[TrainingJob]:
+        return [
+            TrainingJob(symbol, horizon, estimator)
+            for symbol in self.symbols
+            for horizon in self.horizons
+            for estimator in self.estimators
+        ]
+
+    def run(self) -> pd.DataFrame:
+        """Train the whole grid, register a new version of every model and return the metrics."""
+        jobs: list[TrainingJob] = self.build_jobs()
+        if not jobs:
+            self.logger.warning(self.CLASS_NAME, "run", "Empty job grid – nothing to train.")
+            return pd.DataFrame()
+
+        version: str = self.registry.new_version()
+        start: float = time.perf_counter()
+        results: list[dict] = []
+        with tempfile.TemporaryDirectory(prefix="crude_oil_matrices_") as work_dir:
+            matrices: dict[str, tuple[str, str, dict]] = {}
+            for symbol in self.symbols:
+                prepared: Optional[tuple[str, str, dict]] = self._prepare_matrices(symbol, work_dir)
+                if prepared is not None:
+                    matrices[symbol] = prepared
+            jobs = [job for job in jobs if job.symbol in matrices]
+
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=Logger.configure_worker,
+                initargs=Logger.worker_initargs(),
+            ) as pool:
+                futures = {}
+                for job in jobs:
+                    x_path, y_path, window = matrices[job.symbol]
+                    key: str = self.registry.model_key(job.symbol, job.horizon, job.estimator, self.NAMESPACE)
+                    metadata: dict = {
+                        "symbol": job.symbol,
+                        "horizon": job.horizon,
+                        "estimator": job.estimator,
+                        "features": self.features,
+                        **window,
+                    }
+                    future = pool.submit(
+                        _train_job,
+                        job,
+                        x_path,
+                        y_path,
+                        self.horizons.index(job.horizon),
+                        self.TEST_SIZE,
+                        self.registry.artifact_dir(key, version),
+                        metadata,
+                    )
+                    futures[future] = (job, key, metadata)
+
+                entries: list[tuple[str, str, dict]] = []
+                for future, (job, key, metadata) in futures.items():
+                    try:
+                        metrics: dict = future.result()
+                    except Exception as error:  # noqa: BLE001
+                        self.logger.error(self.CLASS_NAME, "run", f"Job {key} failed: {error}")
+                        continue
+                    entries.append((key, version, {**metadata, **metrics}))
+                    results.append({"key": key, **vars(job), **metrics})
+
+        if entries:
+            self.registry.register_many(entries)
+        self.logger.info(
+            self.CLASS_NAME,
+            "run",
+            f"Trained {len(results)}/{len(jobs)} models as version {version} "
+            f"in {time.perf_counter() - start:.2f}s.",
+        )
+        return pd.DataFrame(results)
+
+    def _prepare_matrices(self, symbol: str, work_dir: str) -> Optional[tuple[str, str, dict]]:
+        """Compute features and horizon targets of *symbol* and save them as ``.npy`` files."""
+        try:
+            raw: pd.DataFrame = self.raw_store.load(symbols=[symbol])
+            if raw.empty:
+                self.logger.warning(self.CLASS_NAME, "_prepare_matrices", f"No raw data for {symbol}.")
+                return None
+            targets: list[str] = [self.target_name(horizon) for horizon in self.horizons]
+            engineered: list[str] = [name for name in self.features if name in self.feature_registry.specs]
+            # Same decimal prices as the enriched dataset, not their float32 rounding
+            df, _ = self.engine.compute(RAW_SCHEMA.widen(raw), names=[*engineered, *targets])
+            df = df.dropna(subset=self.features)
+
+            stem: str = os.path.join(work_dir, ModelRegistry.safe_name(symbol))
+            x_path, y_path = f"{stem}_X.npy", f"{stem}_y.npy"
+            X: np.ndarray = df[self.features].to_numpy(dtype=float)
+            y: np.ndarray = df[targets].to_numpy(dtype=float)
+            np.save(x_path, X)
+            np.save(y_path, y)
+            window: dict = {
+                "data_hash": ModelRegistry.data_hash(X, y),
+                "data_start": df["date"].min().strftime("%Y-%m-%d"),
+                "data_end": df["date"].max().strftime("%Y-%m-%d"),
+            }
+            return x_path, y_path, window
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "_prepare_matrices", f"Error preparing {symbol}: {error}")
+            return None
+
+
+# Optional script entry point
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the symbol × horizon × estimator model grid.")
+    parser.add_argument("--symbols", nargs="+")
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(TrainingScheduler.HORIZONS))
+    parser.add_argument("--estimators", nargs="+", choices=list(ESTIMATORS))
+    parser.add_argument("--workers", type=int, help="process pool size (default: all cores)")
+    args = parser.parse_args()
+
+    summary: pd.DataFrame = TrainingScheduler(
+        Logger(),
+        symbols=args.symbols,
+        horizons=tuple(args.horizons),
+        estimators=args.estimators,
+        max_workers=args.workers,
+    ).run()
+    print(summary.to_string(index=False))
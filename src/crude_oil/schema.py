@@ -0,0 +1,136 @@
+"""Schema module.
+
+This module defines the typed schema of the raw price data. It is applied
+once at ingest, where scraped text becomes canonical column names, parsed
+dates, numeric volume and compact dtypes, and it is enforced again on every
+write and read of the stores so downstream stages never re-parse text.
+"""
+
+from __future__ import annotations
+
+from typing import Final, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class Schema:
+    """Canonical column names and dtypes of a DataFrame."""
+
+    DATE_COLUMN: Final[str] = "date"
+    # Yahoo Finance renders dates as "Sep 9, 2024"
+    SOURCE_DATE_FORMAT: Final[str] = "%b %d, %Y"
+    # Significant decimal digits a float32 round-trips exactly
+    FLOAT32_DIGITS: Final[int] = 7
+
+    def __init__(
+        self,
+        dtypes: dict[str, str],
+        required: tuple[str, ...] = (),
+        aliases: Optional[dict[str, str]] = None,
+    ) -> None:
+        self.dtypes: dict[str, str] = dtypes
+        self.required: tuple[str, ...] = required
+        self.aliases: dict[str, str] = aliases or {}
+
+    def normalise(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rename source columns to canonical names, parse text and cast dtypes."""
+        df = df.rename(columns=self.aliases)
+        return self.enforce(df)
+
+    def enforce(self, df: pd.DataFrame, check_required: bool = True) -> pd.DataFrame:
+        """Cast every known column to its schema dtype; unknown columns pass through."""
+        missing: list[str] = [column for column in self.required if column not in df.columns]
+        if check_required and missing:
+            raise ValueError(f"Missing required columns: {missing}")
+
+        df = df.copy()
+        for column, dtype in self.dtypes.items():
+            if column not in df.columns or str(df[column].dtype) == dtype:
+                continue
+            if dtype.startswith("datetime64"):
+                df[column] = self.parse_dates(df[column])
+            elif dtype == "category":
+                df[column] = df[column].astype(str).astype("category")
+            else:
+                df[column] = self._cast_number(df[column], dtype)
+        return df
+
+    @classmethod
+    def parse_dates(cls, series: pd.Series) -> pd.Series:
+        """Parse Yahoo-style or ISO dates; unparseable values become NaT."""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.astype("datetime64[ns]")
+        text: pd.Series = series.astype(str)
+        parsed: pd.Series = pd.to_datetime(text, format=cls.SOURCE_DATE_FORMAT, errors="coerce")
+        missing: pd.Series = parsed.isna()
+        if missing.any():
+            parsed[missing] = pd.to_datetime(text[missing], format="ISO8601", errors="coerce")
+        return parsed.astype("datetime64[ns]")
+
+    @staticmethod
+    def to_number(series: pd.Series) -> pd.Series:
+        """Parse thousands-separated text ("351,074") to numbers; others become NaN."""
+        if pd.api.types.is_numeric_dtype(series):
+            return series
+        cleaned: pd.Series = series.astype(str).str.replace(",", "", regex=False)
+        return pd.to_numeric(cleaned, errors="coerce")
+
+    @classmethod
+    def widen(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Return *df* with float32 columns as float64 holding their decimal value.
+
+        A plain cast keeps the float32 rounding error (37.41 becomes
+        37.40999984741211); rounding to the FLOAT32_DIGITS significant digits
+        float32 carries recovers the scraped value, so derived columns stay clean.
+        """
+        columns: list[str] = [column for column in df.columns if df[column].dtype == np.float32]
+        if not columns:
+            return df
+        df = df.copy()
+        for column in columns:
+            values: np.ndarray = df[column].to_numpy(dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                magnitude: np.ndarray = np.floor(np.log10(np.abs(values)))
+            decimals: np.ndarray = np.clip(cls.FLOAT32_DIGITS - 1 - np.nan_to_num(magnitude, neginf=0.0), 0, 15)
+            scale: np.ndarray = 10.0 ** decimals
+            df[column] = np.round(values * scale) / scale
+        return df
+
+    @classmethod
+    def _cast_number(cls, series: pd.Series, dtype: str) -> pd.Series:
+        values: pd.Series = cls.to_number(series)
+        if dtype in ("Int32", "int32"):
+            # Fall back to 64 bits rather than overflow
+            limit: int = np.iinfo(np.int32).max
+            if values.abs().max(skipna=True) > limit:
+                return values.astype("Int64")
+            return values.round().astype("Int32")
+        return values.astype(dtype)
+
+
+RAW_SCHEMA: Final[Schema] = Schema(
+    dtypes={
+        "symbol": "category",
+        "date": "datetime64[ns]",
+        "open": "float32",
+        "high": "float32",
+        "low": "float32",
+        "close": "float32",
+        "adj_close": "float32",
+        "volume": "Int32",
+    },
+    required=("date", "close"),
+    aliases={
+        "Date": "date",
+        "Open": "open",
+        "High": "high",
+        "Low": "low",
+        "Low.": "low",
+        "Close": "close",
+        "CloseClose price adjusted for splits.": "close",
+        "Adj Close": "adj_close",
+        "Adj CloseAdjusted close price adjusted for splits and dividend and/or capital gain distributions.": "adj_close",
+        "Volume": "volume",
+    },
+)
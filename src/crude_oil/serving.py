@@ -0,0 +1,199 @@
+"""Serving module.
+
+This module keeps a trained model in memory for low-latency predictions.
+ModelCache loads the persisted model once and reloads it only when the file
+on disk changes (by modification time or content hash); RegistryModelCache
+does the same for the latest version of a ModelRegistry key. ModelServer exposes
+batched and streaming prediction on top of the cache, plus a small local
+HTTP endpoint so other services can request predictions.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Final, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from logger import Logger
+from registry import ModelRegistry
+
+
+class ModelCache:
+    """In-memory copy of a persisted model, reloaded when the file changes."""
+
+    CLASS_NAME: Final[str] = "ModelCache"
+    CHECK_MODES: Final[tuple[str, ...]] = ("mtime", "hash")
+
+    def __init__(self, path: str, logger: Logger, check: str = "mtime") -> None:
+        if check not in self.CHECK_MODES:
+            raise ValueError(f"Unknown change check: {check}")
+        self.path: str = path
+        self.logger: Logger = logger
+        self.check: str = check
+        self.signature: Optional[str] = None
+        self._model: Any = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def get(self) -> Any:
+        """Return the cached model, reloading it first if the file changed."""
+        try:
+            signature: str = self._signature()
+        except OSError as error:
+            self.logger.error(self.CLASS_NAME, "get", f"Model file unavailable: {error}")
+            return self._model
+
+        if signature != self.signature:
+            with self._lock:
+                if signature != self.signature:
+                    self._load(signature)
+        return self._model
+
+    def _signature(self) -> str:
+        """Cheap fingerprint of the model file (mtime + size, or SHA-256 of the bytes)."""
+        if self.check == "hash":
+            with open(self.path, "rb") as handle:
+                return hashlib.sha256(handle.read()).hexdigest()
+        stat: os.stat_result = os.stat(self.path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _load(self, signature: str) -> None:
+        try:
+            import joblib
+
+            self._model = joblib.load(self.path)
+            self.signature = signature
+            self.logger.info(self.CLASS_NAME, "_load", f"Model (re)loaded from {self.path}")
+        except Exception as error:
+            self.logger.error(self.CLASS_NAME, "_load", f"Error loading model: {error}")
+
+
+class RegistryModelCache(ModelCache):
+    """ModelCache following the latest registered version of one model key.
+
+    The registry index is the watched file; a change to it only triggers a
+    load when the key's latest version actually moved.
+    """
+
+    CLASS_NAME: Final[str] = "RegistryModelCache"
+
+    def __init__(self, registry: ModelRegistry, key: str, logger: Logger, check: str = "mtime") -> None:
+        super().__init__(registry.index_path, logger, check)
+        self.registry: ModelRegistry = registry
+        self.key: str = key
+        self.version: Optional[str] = None
+
+    def _load(self, signature: str) -> None:
+        version: Optional[str] = self.registry.latest(self.key)
+        if version is None:
+            self.logger.error(self.CLASS_NAME, "_load", f"No registered versions for {self.key}")
+            return
+        if version != self.version:
+            model: Any = self.registry.load(self.key, version)
+            if model is None:
+                return
+            self._model, self.version = model, version
+            self.logger.info(self.CLASS_NAME, "_load", f"Model {self.key}@{version} loaded")
+        self.signature = signature
+
+
+class ModelServer:
+    """Batched, streaming and HTTP predictions from a ModelCache."""
+
+    CLASS_NAME: Final[str] = "ModelServer"
+    DEFAULT_HOST: Final[str] = "127.0.0.1"
+    DEFAULT_PORT: Final[int] = 8765
+
+    def __init__(self, cache: ModelCache, features: list[str], logger: Logger) -> None:
+        self.cache: ModelCache = cache
+        self.features: list[str] = features
+        self.logger: Logger = logger
+
+    def predict_batch(self, X: pd.DataFrame) -> np.ndarray:
+        """Predict every row of *X* in one vectorised call."""
+        model: Any = self.cache.get()
+        if model is None:
+            return np.array([])
+        return model.predict(X[self.features])
+
+    def predict_stream(self, chunks: Iterable[pd.DataFrame]) -> Iterator[np.ndarray]:
+        """Yield one prediction array per chunk, picking up model reloads between chunks."""
+        for chunk in chunks:
+            yield self.predict_batch(chunk)
+
+    # ------------------------------------------------------------------
+    # HTTP endpoint
+    # ------------------------------------------------------------------
+    def build_http_server(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+        """Return a server answering ``GET /health`` and ``POST /predict``.
+
+        ``/predict`` accepts ``{"rows": [{feature: value, ...}, ...]}`` and
+        answers ``{"predictions": [...]}``.
+        """
+        server: ModelServer = self
+
+        class PredictionHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path != "/health":
+                    self._reply(404, {"error": "not found"})
+                    return
+                server.cache.get()
+                model: Optional[str] = getattr(server.cache, "version", None) or server.cache.signature
+                self._reply(200, {"status": "ok", "model": model, "features": server.features})
+
+            def do_POST(self) -> None:  # noqa: N802
+                if self.path != "/predict":
+                    self._reply(404, {"error": "not found"})
+                    return
+                try:
+                    length: int = int(self.headers.get("Content-Length", 0))
+                    payload: dict = json.loads(self.rfile.read(length) or b"{}")
+                    X: pd.DataFrame = pd.DataFrame(payload["rows"], columns=server.features)
+                    predictions: np.ndarray = server.predict_batch(X)
+                    self._reply(200, {"predictions": predictions.tolist()})
+                except (KeyError, ValueError, TypeError) as error:
+                    self._reply(400, {"error": str(error)})
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                # Keep request lines out of stderr; failures are logged by the server
+                return
+
+            def _reply(self, status: int, body: dict) -> None:
+                data: bytes = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return ThreadingHTTPServer((host, port), PredictionHandler)
+
+    def serve_forever(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        http_server: ThreadingHTTPServer = self.build_http_server(host, port)
+        self.logger.info(self.CLASS_NAME, "serve_forever", f"Serving predictions on http://{host}:{port}")
+        try:
+            http_server.serve_forever()
+        finally:
+            http_server.server_close()
+
+
+# Optional script entry point
+if __name__ == "__main__":
+    import argparse
+
+    from modeller import Modeller
+
+    parser = argparse.ArgumentParser(description="Serve crude-oil price predictions over HTTP.")
+    parser.add_argument("--host", default=ModelServer.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=ModelServer.DEFAULT_PORT)
+    parser.add_argument("--check", choices=ModelCache.CHECK_MODES, default="mtime")
+    args = parser.parse_args()
+
+    logger = Logger()
+    cache = RegistryModelCache(ModelRegistry(logger), Modeller.MODEL_KEY, logger=logger, check=args.check)
+    ModelServer(cache, Modeller.FEATURES, logger=logger).serve_forever(args.host, args.port)
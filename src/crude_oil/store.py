@@ -0,0 +1,340 @@
+"""Store module.
+
+This module provides the PartitionedStore class, an append-oriented store
+that splits a dated dataset into one file per year (and per symbol, when the
+data carries a ``symbol`` column) and keeps a small JSON
+manifest with the date range and row count of every partition. Writing a
+batch only touches the partitions its rows fall into, so ingest cost grows
+with the size of the delta instead of the size of the history. Every
+partition also records a revision that changes whenever it is rewritten
+rather than appended to, so readers that fold the history incrementally can
+tell when rows they already consumed were replaced. Partition
+files are written through a Storage backend (Parquet by default) and, when
+the store has a Schema, every write and read is cast to it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import uuid
+from typing import Final, Iterator, Optional
+
+import pandas as pd
+
+from logger import Logger
+from schema import Schema
+from storage import CsvStorage, Storage, get_storage
+
+
+class PartitionedStore:
+    CLASS_NAME: Final[str] = "PartitionedStore"
+
+    MANIFEST_NAME: Final[str] = "manifest.json"
+    DATE_COLUMN: Final[str] = "date"
+    SYMBOL_COLUMN: Final[str] = "symbol"
+    DATE_STORAGE_FORMAT: Final[str] = "%Y-%m-%d"
+
+    def __init__(
+        self,
+        root: str,
+        name: str,
+        logger: Logger,
+        storage: Optional[Storage] = None,
+        schema: Optional[Schema] = None,
+    ) -> None:
+        """Create a store rooted at *root* whose partitions are named after *name*.
+
+        An existing store keeps the format recorded in its manifest, so
+        switching the default backend never orphans partitions on disk.
+        """
+        self.logger: Logger = logger
+        self.root: str = root
+        self.name: str = name
+        self.schema: Optional[Schema] = schema
+        self.manifest_path: str = os.path.join(root, self.MANIFEST_NAME)
+        os.makedirs(root, exist_ok=True)
+        stored_format: Optional[str] = self._load_manifest_format()
+        self.storage: Storage = get_storage(stored_format) if stored_format else (storage or get_storage())
+        self.manifest: dict[str, dict] = self._load_manifest()
+        # When False, manifest changes stay in memory until ``merge_manifest``
+        # commits them from one process (used by concurrent per-symbol writers)
+        self.autocommit: bool = True
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def upsert(self, df: pd.DataFrame) -> list[str]:
+        """Merge *df* into the store and return the partitions that were written.
+
+        Rows that are strictly newer than everything already stored in their
+        partition are appended without reading the partition back. Otherwise
+        only that partition is read, de-duplicated on date (new rows win) and
+        rewritten.
+        """
+        if self.schema is not None:
+            df = self.schema.enforce(df)
+        df = self._normalise_dates(df)
+        if df.empty:
+            return []
+
+        self._refresh_manifest()
+        touched: list[str] = []
+        keys: list[str] = self._key_columns(df)
+        group_by: list[pd.Series] = [df[self.DATE_COLUMN].dt.year.rename("year")]
+        if self.SYMBOL_COLUMN in df.columns:
+            group_by.insert(0, df[self.SYMBOL_COLUMN].astype(str))
+        for group, part in df.groupby(group_by, sort=True):
+            symbol: Optional[str] = group[0] if len(group_by) == 2 else None
+            key: str = self._partition_key(symbol, group[-1])
+            part = part.drop_duplicates(subset=keys, keep="last")
+            part = part.sort_values(self.DATE_COLUMN)
+            self._write_partition(key, part, symbol)
+            touched.append(key)
+
+        self._save_manifest()
+        self.logger.info(
+            self.CLASS_NAME,
+            "upsert",
+            f"{len(df)} rows merged into {self.name} partitions {touched}",
+        )
+        return touched
+
+    def overwrite(self, df: pd.DataFrame, symbols: Optional[list[str]] = None) -> list[str]:
+        """Replace the whole store content (or only that of *symbols*) with *df*."""
+        self._refresh_manifest()
+        for key in list(self.manifest):
+            if symbols is None or self.manifest[key].get("symbol") in symbols:
+                self.storage.remove(self._partition_stem(key))
+                del self.manifest[key]
+        self._save_manifest()
+        return self.upsert(df)
+
+    def merge_manifest(self, entries: dict[str, dict], symbols: list[str]) -> None:
+        """Replace the manifest entries of *symbols* with *entries* (written by other processes)."""
+        self.manifest = self._load_manifest()
+        for key in [key for key, entry in self.manifest.items() if entry.get("symbol") in symbols]:
+            del self.manifest[key]
+        self.manifest.update(entries)
+        self._write_manifest()
+
+    def entries(self, symbols: list[str]) -> dict[str, dict]:
+        """Manifest entries (as held in memory) of the partitions of *symbols*."""
+        return {key: dict(entry) for key, entry in self.manifest.items() if entry.get("symbol") in symbols}
+
+    def load(
+        self,
+        start: Optional[pd.Timestamp] = None,
+        columns: Optional[list[str]] = None,
+        symbols: Optional[list[str]] = None,
+    ) -> pd.DataFrame:
+        """Read every partition (or only those ending on/after *start*).
+
+        When *columns* is given only those columns (plus the key columns) are
+        read; *symbols* restricts the load to the partitions of those symbols.
+        """
+        frames: list[pd.DataFrame] = list(self._read_partitions(start, columns, symbols))
+        if not frames:
+            return pd.DataFrame()
+        df: pd.DataFrame = pd.concat(frames, ignore_index=True)
+        if self.schema is not None:
+            df = self.schema.enforce(df, check_required=False)
+        return df
+
+    def chunks(
+        self,
+        start: Optional[pd.Timestamp] = None,
+        columns: Optional[list[str]] = None,
+        symbols: Optional[list[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Like ``load``, one partition at a time (per symbol, then by year), to bound memory."""
+        for df in self._read_partitions(start, columns, symbols):
+            if self.schema is not None:
+                df = self.schema.enforce(df, check_required=False)
+            yield df
+
+    def max_date(self, symbol: Optional[str] = None) -> Optional[pd.Timestamp]:
+        """Return the most recent stored date (of *symbol*), read from the manifest only."""
+        self._refresh_manifest()
+        dates: list[pd.Timestamp] = [
+            pd.Timestamp(entry["max_date"]) for entry in self.manifest.values()
+            if symbol is None or entry.get("symbol") == symbol
+        ]
+        return max(dates, default=None)
+
+    def symbols(self) -> list[str]:
+        """Symbols present in the store, read from the manifest only."""
+        self._refresh_manifest()
+        return sorted({entry["symbol"] for entry in self.manifest.values() if "symbol" in entry})
+
+    def revision(self, symbol: Optional[str] = None, until: Optional[pd.Timestamp] = None) -> str:
+        """Fingerprint of the partitions (of *symbol*) holding rows up to *until*, from the manifest only.
+
+        Appending newer rows keeps it; rewriting any of those partitions
+        (``overwrite``, or rows merged into the stored range) changes it.
+        """
+        self._refresh_manifest()
+        revisions: list[tuple[str, str]] = sorted(
+            (key, entry.get("revision", "")) for key, entry in self.manifest.items()
+            if (symbol is None or entry.get("symbol") == symbol)
+            and (until is None or pd.Timestamp(entry["min_date"]) <= until)
+        )
+        return hashlib.sha256(json.dumps(revisions).encode("utf-8")).hexdigest()
+
+    def fingerprint(self, symbol: Optional[str] = None) -> str:
+        """Fingerprint of the partitions (of *symbol*), from the manifest only; any write changes it.
+
+        Unlike :meth:`revision` it also changes when rows are appended.
+        """
+        self._refresh_manifest()
+        entries: list[tuple[str, dict]] = sorted(
+            (key, entry) for key, entry in self.manifest.items() if symbol is None or entry.get("symbol") == symbol
+        )
+        return hashlib.sha256(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def is_empty(self) -> bool:
+        self._refresh_manifest()
+        return not self.manifest
+
+    # ------------------------------------------------------------------
+    # Partition I/O
+    # ------------------------------------------------------------------
+    def _partition_stem(self, key: str) -> str:
+        return os.path.join(self.root, f"{self.name}_{key}")
+
+    @staticmethod
+    def _partition_key(symbol: Optional[str], year: int) -> str:
+        if symbol is None:
+            return str(year)
+        safe_symbol: str = "".join(char if char.isalnum() else "_" for char in symbol)
+        return f"{safe_symbol}_{year}"
+
+    def _key_columns(self, df: pd.DataFrame) -> list[str]:
+        if self.SYMBOL_COLUMN in df.columns:
+            return [self.SYMBOL_COLUMN, self.DATE_COLUMN]
+        return [self.DATE_COLUMN]
+
+    def _write_partition(self, key: str, part: pd.DataFrame, symbol: Optional[str] = None) -> None:
+        stem: str = self._partition_stem(key)
+        entry: Optional[dict] = self.manifest.get(key)
+
+        if (
+            entry is not None
+            and self.storage.exists(stem)
+            and part[self.DATE_COLUMN].min() > pd.Timestamp(entry["max_date"])
+        ):
+            # Pure append: every new row is later than the partition's tail
+            self.storage.append(part, stem)
+            rows: int = entry["rows"] + len(part)
+            min_date: pd.Timestamp = pd.Timestamp(entry["min_date"])
+            revision: str = entry.get("revision", "")
+        else:
+            if entry is not None and self.storage.exists(stem):
+                existing: pd.DataFrame = self._read_partition(key)
+                part = pd.concat([existing, part], ignore_index=True)
+                part = part.drop_duplicates(subset=self._key_columns(part), keep="last")
+                part = part.sort_values(self.DATE_COLUMN)
+            self.storage.write(part, stem)
+            rows = len(part)
+            min_date = part[self.DATE_COLUMN].min()
+            revision = uuid.uuid4().hex
+
+        entry = {
+            "min_date": self._format_date(min_date),
+            "max_date": self._format_date(part[self.DATE_COLUMN].max()),
+            "rows": int(rows),
+            "revision": revision,
+        }
+        if symbol is not None:
+            entry["symbol"] = symbol
+        self.manifest[key] = entry
+
+    def _read_partition(self, key: str, columns: Optional[list[str]] = None) -> pd.DataFrame:
+        return self.storage.read(self._partition_stem(key), columns)
+
+    def _read_partitions(
+        self,
+        start: Optional[pd.Timestamp],
+        columns: Optional[list[str]],
+        symbols: Optional[list[str]],
+    ) -> Iterator[pd.DataFrame]:
+        """Partitions matching the filters, in key order, with rows before *start* dropped."""
+        self._refresh_manifest()
+        keys: list[str] = sorted(self.manifest)
+        if symbols is not None:
+            keys = [key for key in keys if self.manifest[key].get("symbol") in symbols]
+        if start is not None:
+            # Older manifests record dates without their time of day
+            keys = [
+                key for key in keys
+                if pd.Timestamp(self.manifest[key]["max_date"]) >= start.normalize()
+            ]
+
+        if columns is not None and keys:
+            has_symbol: bool = any("symbol" in self.manifest[key] for key in keys)
+            key_columns: list[str] = [self.SYMBOL_COLUMN, self.DATE_COLUMN] if has_symbol else [self.DATE_COLUMN]
+            columns = [*key_columns, *(column for column in columns if column not in key_columns)]
+        for key in keys:
+            df: pd.DataFrame = self._read_partition(key, columns)
+            if start is not None:
+                df = df[df[self.DATE_COLUMN] >= start].reset_index(drop=True)
+            yield df
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _format_date(self, date: pd.Timestamp) -> str:
+        """Manifest form of *date*: the day alone, or the full time for intraday bars."""
+        if date == date.normalize():
+            return date.strftime(self.DATE_STORAGE_FORMAT)
+        return date.isoformat()
+
+    def _normalise_dates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return a copy of *df* with a parsed datetime date column and no NaT rows."""
+        df = df.copy()
+        if not pd.api.types.is_datetime64_any_dtype(df[self.DATE_COLUMN]):
+            df[self.DATE_COLUMN] = Schema.parse_dates(df[self.DATE_COLUMN])
+
+        invalid: int = int(df[self.DATE_COLUMN].isna().sum())
+        if invalid:
+            self.logger.warning(
+                self.CLASS_NAME,
+                "_normalise_dates",
+                f"Dropped {invalid} rows with unparseable dates.",
+            )
+            df = df.dropna(subset=[self.DATE_COLUMN])
+        return df
+
+    def _load_manifest_format(self) -> Optional[str]:
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, encoding="utf-8") as handle:
+            # Manifests written before backends were pluggable always used CSV
+            return json.load(handle).get("format", CsvStorage.FORMAT)
+
+    def _refresh_manifest(self) -> None:
+        """Re-read the manifest: another instance (e.g. the pipeline) may have written since we opened."""
+        if self.autocommit:
+            self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict[str, dict]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding="utf-8") as handle:
+            return json.load(handle).get("partitions", {})
+
+    def _save_manifest(self) -> None:
+        if self.autocommit:
+            self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        tmp_path: str = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"name": self.name, "format": self.storage.FORMAT, "partitions": self.manifest},
+                handle,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,142 @@
+"""Synthetic module.
+
+This module provides the OHLCVGenerator class, a seeded generator of
+realistic price bars for benchmarks and offline runs. Closes follow a
+geometric random walk whose per-bar volatility is scaled to the bar size,
+open/high/low are drawn around it consistently (low <= open, close <= high)
+and volume is log-normal. Daily, hourly and minute bars are supported;
+intraday bars cover a 09:30–16:00 session on business days.
+
+Every symbol and every column draws from its own random stream, so the
+output is identical whether a history is generated at once or in chunks,
+which keeps 10⁸-row datasets within memory.
+"""
+
+from __future__ import annotations
+
+from typing import Final, Iterator
+
+import numpy as np
+import pandas as pd
+
+from schema import RAW_SCHEMA
+
+
+class OHLCVGenerator:
+    CLASS_NAME: Final[str] = "OHLCVGenerator"
+
+    # Bars per business day and the offset of each bar from midnight
+    SESSIONS: Final[dict[str, tuple[int, pd.Timedelta, pd.Timedelta]]] = {
+        "B": (1, pd.Timedelta(0), pd.Timedelta(days=1)),
+        "h": (7, pd.Timedelta(hours=9, minutes=30), pd.Timedelta(hours=1)),
+        "min": (390, pd.Timedelta(hours=9, minutes=30), pd.Timedelta(minutes=1)),
+    }
+    TRADING_DAYS: Final[int] = 252
+    # Name of the first symbol, so the enriched/modelled symbol always exists
+    PRIMARY_SYMBOL: Final[str] = "CL=F"
+    # Independent random stream per column
+    STREAMS: Final[tuple[str, ...]] = ("return", "gap", "high", "low", "volume")
+
+    def __init__(
+        self,
+        seed: int = 0,
+        freq: str = "B",
+        start: str = "2000-01-03",
+        annual_volatility: float = 0.35,
+        initial_price: float = 70.0,
+    ) -> None:
+        if freq not in self.SESSIONS:
+            raise ValueError(f"Unknown frequency {freq!r}; expected one of {list(self.SESSIONS)}")
+        self.seed: int = seed
+        self.freq: str = freq
+        self.start: np.datetime64 = np.busday_offset(np.datetime64(start, "D"), 0, roll="forward")
+        self.initial_price: float = initial_price
+        self.bars_per_day, self.open_time, self.bar_size = self.SESSIONS[freq]
+        self.sigma: float = annual_volatility / np.sqrt(self.TRADING_DAYS * self.bars_per_day)
+
+    @classmethod
+    def symbols(cls, count: int) -> list[str]:
+        """*count* symbol names, starting with the primary symbol."""
+        return [cls.PRIMARY_SYMBOL, *(f"SYM{number:04d}" for number in range(1, count))]
+
+    def timestamps(self, offset: int, count: int) -> np.ndarray:
+        """Dates of bars *offset* .. *offset* + *count* of a history."""
+        bars: np.ndarray = np.arange(offset, offset + count, dtype=np.int64)
+        days: np.ndarray = np.busday_offset(self.start, bars // self.bars_per_day).astype("datetime64[ns]")
+        within: np.ndarray = (bars % self.bars_per_day) * self.bar_size.value
+        if self.bars_per_day == 1:
+            return days
+        return days + np.timedelta64(self.open_time.value, "ns") + within.astype("timedelta64[ns]")
+
+    def history(self, symbol: str, rows: int, index: int = 0) -> pd.DataFrame:
+        """Whole history of *symbol* (the *index*-th symbol) with *rows* bars."""
+        return next(self.chunks([symbol], rows, chunk_rows=max(rows, 1), first_index=index))
+
+    def frame(self, symbols: int, rows_per_symbol: int) -> pd.DataFrame:
+        """Long frame with *symbols* symbols of *rows_per_symbol* bars each."""
+        return pd.concat(
+            list(self.chunks(self.symbols(symbols), rows_per_symbol, chunk_rows=max(rows_per_symbol, 1))),
+            ignore_index=True,
+        )
+
+    def chunks(
+        self,
+        symbols: list[str],
+        rows_per_symbol: int,
+        chunk_rows: int = 1_000_000,
+        first_index: int = 0,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield each symbol's history in chunks of at most *chunk_rows* bars, in date order."""
+        self._check_range(rows_per_symbol)
+        for position, symbol in enumerate(symbols):
+            index: int = first_index + position
+            streams: dict[str, np.random.Generator] = {
+                name: np.random.default_rng([self.seed, index, number])
+                for number, name in enumerate(self.STREAMS)
+            }
+            last_close: float = self.initial_price * float(np.exp(streams["return"].normal(0, 0.2)))
+            for offset in range(0, rows_per_symbol, chunk_rows):
+                count: int = min(chunk_rows, rows_per_symbol - offset)
+                chunk, last_close = self._bars(symbol, offset, count, last_close, streams)
+                yield chunk
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _bars(
+        self,
+        symbol: str,
+        offset: int,
+        count: int,
+        last_close: float,
+        streams: dict[str, np.random.Generator],
+    ) -> tuple[pd.DataFrame, float]:
+        log_returns: np.ndarray = streams["return"].normal(-0.5 * self.sigma**2, self.sigma, count)
+        close: np.ndarray = last_close * np.exp(np.cumsum(log_returns))
+        previous: np.ndarray = np.concatenate([[last_close], close[:-1]])
+        # Opens gap away from the previous close by a fraction of a bar's move
+        open_: np.ndarray = previous * np.exp(streams["gap"].normal(0, 0.25 * self.sigma, count))
+        high: np.ndarray = np.maximum(open_, close) * np.exp(np.abs(streams["high"].normal(0, 0.5 * self.sigma, count)))
+        low: np.ndarray = np.minimum(open_, close) * np.exp(-np.abs(streams["low"].normal(0, 0.5 * self.sigma, count)))
+        volume: np.ndarray = streams["volume"].lognormal(np.log(200_000 / self.bars_per_day + 1), 0.5, count)
+        frame: pd.DataFrame = pd.DataFrame({
+            "symbol": pd.Categorical([symbol] * count),
+            "date": self.timestamps(offset, count),
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "adj_close": close,
+            "volume": np.minimum(volume, np.iinfo(np.int32).max).astype(np.int64),
+        })
+        return RAW_SCHEMA.enforce(frame), float(close[-1])
+
+    def _check_range(self, rows: int) -> None:
+        """Refuse histories whose last bar would overflow nanosecond timestamps (year 2262)."""
+        days: int = -(-rows // self.bars_per_day)
+        last: np.datetime64 = np.busday_offset(self.start, max(days - 1, 0))
+        if last >= np.datetime64("2262-01-01"):
+            raise ValueError(
+                f"{rows} {self.freq} bars from {self.start} end after 2262; "
+                "use more symbols, intraday bars or an earlier start"
+            )
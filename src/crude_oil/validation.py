@@ -0,0 +1,300 @@
+"""Validation module.
+
+This module provides the DataValidator class, the data-quality gate between
+collection and the raw store, so bad bars never reach enrichment. Every
+check is a vectorised pass over whole columns, with no per-row Python:
+
+* ``schema``: required columns present, dates parsed and closes numeric.
+* ``duplicate``: a (symbol, date) key repeated in the batch (the last row wins).
+* ``unordered``: a bar arriving after a later bar of the same symbol (the
+  collector hands each symbol over oldest first, so this is real disorder).
+* ``gap``: more than MAX_GAP_BUSINESS_DAYS business days missing before a bar.
+* ``non_positive``: a zero or negative price (``np.log`` cannot take it).
+* ``ohlc``: high below low, open or close outside [low, high], or negative volume.
+* ``outlier``: a log close further from the trailing rolling median of its
+  symbol than OUTLIER_THRESHOLD robust deviations, measured with the rolling
+  MAD of log returns, so a bad tick is caught but not the bar after it.
+
+Gaps and outliers need history, so the newest stored bars of each symbol can
+be passed as *context*. Rows failing a quarantining check are removed and
+appended to a side file together with the checks they failed; the other
+checks only count. Counts per check are logged, recorded in the stage
+metrics and returned.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Final, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from logger import Logger
+from metrics import INSTRUMENTATION
+from schema import RAW_SCHEMA, Schema
+
+
+@dataclass
+class ValidationResult:
+    """Rows that passed, rows quarantined and the number of rows failing each check."""
+
+    clean: pd.DataFrame
+    quarantined: pd.DataFrame
+    counts: dict[str, int] = field(default_factory=dict)
+
+
+class DataValidator:
+    CLASS_NAME: Final[str] = "DataValidator"
+    SYMBOL_COLUMN: Final[str] = "symbol"
+
+    QUARANTINE_PATH: Final[str] = "src/crude_oil/static/data/quarantine/raw_quarantine.csv"
+    CHECKS: Final[tuple[str, ...]] = ("schema", "duplicate", "unordered", "gap", "non_positive", "ohlc", "outlier")
+    # Failing any of these removes the row; the others are only reported
+    QUARANTINE_CHECKS: Final[frozenset[str]] = frozenset({"schema", "duplicate", "non_positive", "ohlc", "outlier"})
+    PRICE_COLUMNS: Final[tuple[str, ...]] = ("open", "high", "low", "close", "adj_close")
+
+    # Holidays leave one or two business days without bars
+    MAX_GAP_BUSINESS_DAYS: Final[int] = 3
+    # Bars per rolling window; the first window of a symbol's history is not checked
+    OUTLIER_WINDOW: Final[int] = 21
+    # Conservative, so a genuine one-day crash (tens of percent) passes and a bad tick does not
+    OUTLIER_THRESHOLD: Final[float] = 10.0
+    # Scales the MAD to a standard deviation for normally distributed data
+    MAD_SCALE: Final[float] = 1.4826
+    # Smallest MAD of log returns used, so flat stretches do not divide by zero
+    MIN_MAD: Final[float] = 1e-5
+    # Calendar span of stored bars read as context, enough for OUTLIER_CONTEXT_ROWS daily bars
+    CONTEXT_SPAN: Final[pd.Timedelta] = pd.Timedelta(days=90)
+    OUTLIER_CONTEXT_ROWS: Final[int] = 2 * OUTLIER_WINDOW
+    # Windows whose medians are taken at once
+    OUTLIER_BLOCK_ROWS: Final[int] = 65_536
+
+    def __init__(
+        self,
+        logger: Logger,
+        schema: Schema = RAW_SCHEMA,
+        quarantine_path: Optional[str] = QUARANTINE_PATH,
+        quarantine_checks: frozenset[str] = QUARANTINE_CHECKS,
+    ) -> None:
+        unknown: set[str] = set(quarantine_checks) - set(self.CHECKS)
+        if unknown:
+            raise ValueError(f"Unknown validation checks: {sorted(unknown)}")
+        self.logger: Logger = logger
+        self.schema: Schema = schema
+        self.quarantine_path: Optional[str] = quarantine_path
+        self.quarantine_checks: frozenset[str] = frozenset(quarantine_checks)
+
+    def validate(self, df: pd.DataFrame, context: Optional[pd.DataFrame] = None) -> ValidationResult:
+        """Check *df*, quarantine the rows failing a quarantining check and return the rest.
+
+        *context* holds already stored bars (symbol, date, close) that precede
+        the batch; they feed the gap and outlier checks but are never flagged.
+        """
+        with INSTRUMENTATION.stage("validate", self.CLASS_NAME) as probe:
+            probe.add_rows(rows_in=len(df))
+            if df.empty:
+                return ValidationResult(df, df.iloc[:0])
+            df = self.schema.enforce(df, check_required=False).reset_index(drop=True)
+            flags: dict[str, np.ndarray] = self.flags(df, context)
+
+            rejected: np.ndarray = np.zeros(len(df), dtype=bool)
+            for name in self.quarantine_checks:
+                rejected |= flags[name]
+            counts: dict[str, int] = {name: int(flags[name].sum()) for name in self.CHECKS}
+            clean: pd.DataFrame = df[~rejected].reset_index(drop=True)
+            quarantined: pd.DataFrame = df[rejected].reset_index(drop=True)
+            if not quarantined.empty:
+                quarantined.insert(len(quarantined.columns), "checks", self._failed_checks(flags, rejected))
+                self._quarantine(quarantined)
+
+            probe.add_rows(rows_out=len(clean))
+            probe.extra.update({f"{name}_rows": count for name, count in counts.items()})
+            probe.extra["quarantined_rows"] = len(quarantined)
+            failing: str = ", ".join(f"{name}={count}" for name, count in counts.items() if count) or "none"
+            log = self.logger.warning if len(quarantined) else self.logger.info
+            log(
+                self.CLASS_NAME,
+                "validate",
+                f"{len(df)} rows validated: {len(clean)} clean, {len(quarantined)} quarantined "
+                f"(failing checks: {failing}).",
+            )
+            return ValidationResult(clean, quarantined, counts)
+
+    def flags(self, df: pd.DataFrame, context: Optional[pd.DataFrame] = None) -> dict[str, np.ndarray]:
+        """One boolean array per check, aligned with the rows of *df* (schema-enforced)."""
+        n: int = len(df)
+        flags: dict[str, np.ndarray] = {name: np.zeros(n, dtype=bool) for name in self.CHECKS}
+        missing: list[str] = [column for column in self.schema.required if column not in df.columns]
+        if missing:
+            self.logger.error(self.CLASS_NAME, "flags", f"Missing required columns: {missing}")
+            flags["schema"][:] = True
+            return flags
+
+        flags["schema"] = df[list(self.schema.required)].isna().any(axis=1).to_numpy()
+        codes, categories = self._codes(df)
+        # NaT is the smallest int64, and those rows already fail the schema check
+        dates: np.ndarray = df[Schema.DATE_COLUMN].to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+        # Each symbol's rows in arrival order: a date earlier than the previous arrival is out of order
+        arrival: np.ndarray = np.argsort(codes, kind="stable")
+        arrived: np.ndarray = dates[arrival]
+        flags["unordered"][arrival[1:]] = (codes[arrival][1:] == codes[arrival][:-1]) & (arrived[1:] < arrived[:-1])
+        flags["unordered"] &= ~flags["schema"]
+
+        # Sorted by (symbol, date) with ties in arrival order, so every repeat but the last is flagged
+        order: np.ndarray = self._sort_order(codes, dates)
+        ordered_codes, ordered_dates = codes[order], dates[order]
+        flags["duplicate"][order[:-1]] = (
+            (ordered_codes[1:] == ordered_codes[:-1]) & (ordered_dates[1:] == ordered_dates[:-1])
+        )
+        flags["duplicate"] &= ~flags["schema"]
+
+        prices: np.ndarray = df[[column for column in self.PRICE_COLUMNS if column in df.columns]].to_numpy(
+            dtype=float, na_value=np.nan
+        )
+        flags["non_positive"] = (prices <= 0).any(axis=1)
+        flags["ohlc"] = self._ohlc_inconsistent(df)
+
+        # Gaps and outliers are judged against the stored history, skipping rows already rejected
+        eligible: np.ndarray = ~(flags["schema"] | flags["duplicate"] | flags["non_positive"] | flags["ohlc"])
+        rows: np.ndarray = order[eligible[order]]
+        series: pd.DataFrame = pd.DataFrame({
+            "code": codes[rows], "date": dates[rows], "close": self._column(df, "close")[rows], "row": rows,
+        })
+        if context is not None and not context.empty and {Schema.DATE_COLUMN, "close"} <= set(context.columns):
+            series = self._with_history(series, context, categories)
+        gap, outlier = self._series_checks(series)
+        batch_rows: np.ndarray = series["row"].to_numpy()
+        in_batch: np.ndarray = batch_rows >= 0
+        flags["gap"][batch_rows[in_batch]] = gap[in_batch]
+        flags["outlier"][batch_rows[in_batch]] = outlier[in_batch]
+        return flags
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _codes(self, df: pd.DataFrame, categories: Optional[pd.Index] = None) -> tuple[np.ndarray, pd.Index]:
+        """Integer symbol codes of *df* (against *categories* when given; -1 if unknown) and their labels."""
+        if self.SYMBOL_COLUMN not in df.columns:
+            return np.zeros(len(df), dtype=np.int64), pd.Index([""])
+        symbols: pd.Series = df[self.SYMBOL_COLUMN]
+        if categories is not None:
+            return pd.Categorical(symbols.astype(str), categories=categories).codes.astype(np.int64), categories
+        if isinstance(symbols.dtype, pd.CategoricalDtype):
+            return symbols.cat.codes.to_numpy(dtype=np.int64), symbols.cat.categories.astype(str)
+        codes, labels = pd.factorize(symbols.astype(str))
+        return codes.astype(np.int64), pd.Index(labels)
+
+    @staticmethod
+    def _sort_order(codes: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """Stable (symbol, date) order; batches usually arrive sorted, which is checked in one pass."""
+        if len(codes) < 2 or (
+            (codes[1:] >= codes[:-1]).all() and ((codes[1:] > codes[:-1]) | (dates[1:] >= dates[:-1])).all()
+        ):
+            return np.arange(len(codes))
+        return np.lexsort((dates, codes))
+
+    @staticmethod
+    def _column(df: pd.DataFrame, column: str) -> np.ndarray:
+        if column not in df.columns:
+            return np.full(len(df), np.nan)
+        return df[column].to_numpy(dtype=float, na_value=np.nan)
+
+    def _ohlc_inconsistent(self, df: pd.DataFrame) -> np.ndarray:
+        """High below low, open or close outside the bar's range, or negative volume (NaN never fails)."""
+        high: np.ndarray = self._column(df, "high")
+        low: np.ndarray = self._column(df, "low")
+        inconsistent: np.ndarray = high < low
+        for column in ("open", "close"):
+            values: np.ndarray = self._column(df, column)
+            inconsistent |= (values > high) | (values < low)
+        inconsistent |= self._column(df, "volume") < 0
+        return inconsistent
+
+    def _with_history(self, series: pd.DataFrame, context: pd.DataFrame, categories: pd.Index) -> pd.DataFrame:
+        """Prepend the newest stored bars of the batch's symbols (row -1) and re-sort by (symbol, date)."""
+        codes, _ = self._codes(context, categories)
+        history: pd.DataFrame = pd.DataFrame({
+            "code": codes,
+            "date": context[Schema.DATE_COLUMN].to_numpy(dtype="datetime64[ns]").view(np.int64),
+            "close": self._column(context, "close"),
+            "row": -1,
+        })
+        history = history[history["code"] >= 0].sort_values(["code", "date"], kind="stable")
+        history = history.groupby("code", sort=False).tail(self.OUTLIER_CONTEXT_ROWS)
+        # A batch row replaces the stored bar with the same key; only batch rows up to the history can
+        overlap: pd.DataFrame = series[series["date"] <= history["date"].max()] if len(history) else series.iloc[:0]
+        if len(overlap):
+            stored: pd.MultiIndex = pd.MultiIndex.from_frame(history[["code", "date"]])
+            history = history[~stored.isin(pd.MultiIndex.from_frame(overlap[["code", "date"]]))]
+        combined: pd.DataFrame = pd.concat([history, series], ignore_index=True)
+        order: np.ndarray = self._sort_order(combined["code"].to_numpy(), combined["date"].to_numpy())
+        return combined.iloc[order].reset_index(drop=True)
+
+    def _series_checks(self, series: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Calendar gaps and rolling-MAD outliers over (symbol, date)-sorted bars."""
+        codes: np.ndarray = series["code"].to_numpy()
+        if not len(codes):
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+        first: np.ndarray = np.concatenate([[True], codes[1:] != codes[:-1]])
+        starts: np.ndarray = np.flatnonzero(first)
+        position: np.ndarray = np.arange(len(codes)) - starts[np.cumsum(first) - 1]
+
+        days: np.ndarray = series["date"].to_numpy().view("datetime64[ns]").astype("datetime64[D]")
+        missing: np.ndarray = np.zeros(len(days), dtype=np.int64)
+        if len(days) > 1:
+            missing[1:] = np.busday_count(days[:-1], days[1:]) - 1
+        gap: np.ndarray = ~first & (missing > self.MAX_GAP_BUSINESS_DAYS)
+
+        window: int = self.OUTLIER_WINDOW
+        score: np.ndarray = np.full(len(codes), np.nan)
+        # Only batch rows whose window stays within their own symbol are scored
+        scored: np.ndarray = np.flatnonzero((series["row"].to_numpy() >= 0) & (position >= window))
+        if len(scored):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                log_close: np.ndarray = np.log(series["close"].to_numpy())
+            absolute_returns: np.ndarray = np.abs(np.diff(log_close, prepend=np.nan))
+            closes: np.ndarray = sliding_window_view(log_close, window)
+            returns: np.ndarray = sliding_window_view(absolute_returns, window)
+            middle: int = window // 2
+            # Block-wise medians of the trailing windows keep the copied windows small
+            for begin in range(0, len(scored), self.OUTLIER_BLOCK_ROWS):
+                block: np.ndarray = scored[begin:begin + self.OUTLIER_BLOCK_ROWS]
+                median: np.ndarray = np.partition(closes[block - window + 1], middle, axis=1)[:, middle]
+                spread: np.ndarray = np.partition(returns[block - window + 1], middle, axis=1)[:, middle]
+                # A close drifts about sqrt(window / 2) typical returns away from the trailing median
+                scale: np.ndarray = self.MAD_SCALE * np.fmax(spread, self.MIN_MAD) * np.sqrt(window / 2)
+                score[block] = np.abs(log_close[block] - median) / scale
+        outlier: np.ndarray = score > self.OUTLIER_THRESHOLD
+        return gap, outlier
+
+    def _failed_checks(self, flags: dict[str, np.ndarray], rejected: np.ndarray) -> np.ndarray:
+        """Semicolon-separated names of the checks each rejected row failed."""
+        names: np.ndarray = np.full(int(rejected.sum()), "", dtype=object)
+        for name in self.CHECKS:
+            failed: np.ndarray = flags[name][rejected]
+            names[failed] = names[failed] + f"{name};"
+        return np.char.rstrip(names.astype(str), ";")
+
+    def _quarantine(self, quarantined: pd.DataFrame) -> None:
+        """Append *quarantined* rows to the side file (CSV, header written once)."""
+        if not self.quarantine_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.quarantine_path) or ".", exist_ok=True)
+            header: bool = not os.path.exists(self.quarantine_path)
+            stamped: pd.DataFrame = quarantined.assign(
+                quarantined_at=pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds")
+            )
+            stamped.to_csv(self.quarantine_path, mode="a", header=header, index=False)
+            self.logger.warning(
+                self.CLASS_NAME,
+                "_quarantine",
+                f"{len(quarantined)} rows quarantined to {self.quarantine_path}",
+            )
+        except Exception as error:  # noqa: BLE001
+            self.logger.error(self.CLASS_NAME, "_quarantine", f"Failed to write quarantine file: {error}")
+            INSTRUMENTATION.record_error(f"{self.CLASS_NAME}._quarantine: {error}")
@@ -0,0 +1,38 @@
+"""Shared fixtures.
+
+The pipeline modules use script-style imports (``from logger import Logger``)
+and paths relative to the repository root, so tests import them from
+``src/crude_oil`` and run from an empty scratch directory.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+PACKAGE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "crude_oil")
+sys.path.insert(0, PACKAGE_DIR)
+
+from logger import Logger  # noqa: E402
+from schema import RAW_SCHEMA  # noqa: E402
+from store import PartitionedStore  # noqa: E402
+from synthetic import OHLCVGenerator  # noqa: E402
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Empty repository root: every store, model and log starts empty."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def raw_history() -> pd.DataFrame:
+    """Synthetic daily bars of the modelled symbol."""
+    return OHLCVGenerator(seed=3).history("CL=F", 400)
+
+
+@pytest.fixture
+def raw_store(workspace) -> PartitionedStore:
+    return PartitionedStore(root="src/crude_oil/static/data/raw", name="crude_oil", logger=Logger(), schema=RAW_SCHEMA)
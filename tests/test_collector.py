@@ -0,0 +1,32 @@
+import pandas as pd
+
+from benchmark import history_page
+from collector import Collector, FetchJob
+from logger import Logger
+from validation import DataValidator
+
+
+def test_newest_first_pages_validate_in_order(workspace, monkeypatch):
+    collector: Collector = Collector(Logger(), symbols=["CL=F"], max_workers=1)
+    pages: dict[int, str] = {0: history_page(300, seed=1), 1: history_page(200, seed=1)}
+    monkeypatch.setattr(collector, "_get_with_retries", lambda url: pages[int(url.split("period1=")[1].split("&")[0])])
+
+    df: pd.DataFrame = collector.fetch_jobs([FetchJob("CL=F", 0, 1), FetchJob("CL=F", 1, 2)])
+
+    assert df["date"].is_monotonic_increasing and df["date"].is_unique
+    assert DataValidator(Logger()).validate(df).counts["unordered"] == 0
+
+
+def test_empty_history_table_is_not_an_error(workspace, monkeypatch):
+    collector: Collector = Collector(Logger(), symbols=["CL=F"], max_workers=1)
+    empty: str = history_page(0)
+    calls: list[tuple[str, str]] = []
+    monkeypatch.setattr(collector.logger, "info", lambda *args: calls.append(("info", args[2])))
+    monkeypatch.setattr(collector.logger, "error", lambda *args: calls.append(("error", args[2])))
+
+    for page in (empty, empty.replace('data-testid="history-table"', "")):
+        monkeypatch.setattr(collector, "_get_with_retries", lambda url: page)
+        assert collector._fetch_job(FetchJob("CL=F", 0, 1)).empty
+
+    assert [level for level, _ in calls] == ["info", "error"]
+    assert "not found" in calls[1][1]
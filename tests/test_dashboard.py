@@ -0,0 +1,28 @@
+import pandas as pd
+
+from dashboard import Dashboard
+from logger import Logger
+from synthetic import OHLCVGenerator
+
+
+def test_only_changed_symbols_are_read(raw_store, monkeypatch):
+    generator: OHLCVGenerator = OHLCVGenerator(seed=2)
+    histories: dict[str, pd.DataFrame] = {
+        symbol: generator.history(symbol, 300, index=number) for number, symbol in enumerate(["BZ=F", "CL=F"])
+    }
+    for history in histories.values():
+        raw_store.upsert(history.iloc[:250])
+    dashboard: Dashboard = Dashboard(Logger(), max_workers=1)
+    assert set(dashboard.engine.render(dashboard._symbol_specs()).values()) == {"rendered"}
+
+    raw_store.upsert(histories["CL=F"].iloc[250:])
+    loads: list[list[str]] = []
+    load = dashboard.raw_store.load
+    monkeypatch.setattr(dashboard.raw_store, "load", lambda **kwargs: loads.append(kwargs["symbols"]) or load(**kwargs))
+
+    status: dict[str, str] = dashboard.engine.render(dashboard._symbol_specs())
+    assert loads == [["CL=F"]]
+    assert status == {"close_price_chart_BZ_F": "skipped", "close_price_chart_CL_F": "rendered"}
+    # Every chart is current again, so no partition is read
+    dashboard._symbol_specs()
+    assert loads == [["CL=F"]]
@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+import pytest
+
+from enricher import Enricher
+from logger import Logger
+from storage import CsvStorage
+from synthetic import OHLCVGenerator
+
+CHUNK_ROWS: int = 37
+
+
+@pytest.mark.parametrize("in_memory", [False, True], ids=["store", "new_rows"])
+def test_incremental_replay_matches_full_recompute(raw_history, raw_store, in_memory):
+    raw_store.upsert(raw_history.iloc[:CHUNK_ROWS * 3])
+    Enricher(Logger()).enrich()
+    for start in range(CHUNK_ROWS * 3, len(raw_history), CHUNK_ROWS):
+        chunk: pd.DataFrame = raw_history.iloc[start:start + CHUNK_ROWS]
+        since: pd.Timestamp = raw_store.max_date("CL=F")
+        raw_store.upsert(chunk)
+        if in_memory:
+            Enricher(Logger()).enrich(new_rows=chunk, since=since)
+        else:
+            Enricher(Logger()).enrich()
+    incremental: pd.DataFrame = Enricher(Logger()).dataset()
+
+    Enricher(Logger()).enrich(full=True)
+    full: pd.DataFrame = Enricher(Logger()).dataset()
+
+    # Every bar but the last (still waiting for its target) is published
+    assert full["date"].iloc[-1] == raw_history["date"].iloc[-2]
+    pd.testing.assert_frame_equal(incremental, full)
+
+
+def test_float32_prices_reach_the_target_as_scraped(raw_history, raw_store):
+    prices: list[str] = ["open", "high", "low", "close"]
+    raw_store.upsert(raw_history.assign(**{column: raw_history[column].round(2) for column in prices}))
+
+    enriched: pd.DataFrame = Enricher(Logger()).enrich()
+
+    assert enriched["target"].dtype == "float64"
+    pd.testing.assert_series_equal(enriched["target"], enriched["target"].round(2), check_exact=True)
+
+
+def test_aggregated_bars_are_published_once(raw_store):
+    minutes: pd.DataFrame = OHLCVGenerator(freq="min", seed=4).history("CL=F", 60 * 24 * 4)
+    # Each run ends in the middle of an hour, so its last bar is still open
+    cuts: list[int] = [60 * 24 * 2 + 37 + 137 * run for run in range(15)]
+    raw_store.upsert(minutes.iloc[:cuts[0]])
+    Enricher(Logger(), freq="h").enrich()
+    revisions: list[str] = []
+    for start, end in zip(cuts, cuts[1:] + [len(minutes)]):
+        raw_store.upsert(minutes.iloc[start:end])
+        Enricher(Logger(), freq="h").enrich()
+        revisions.append(Enricher(Logger(), freq="h").enriched_store.revision("CL=F"))
+    incremental: pd.DataFrame = Enricher(Logger(), freq="h").dataset()
+    exported: pd.DataFrame = CsvStorage().read(os.path.splitext(Enricher.ENRICHED_DATA_PATH)[0])
+
+    Enricher(Logger(), freq="h").enrich(full=True)
+    full: pd.DataFrame = Enricher(Logger(), freq="h").dataset()
+
+    # Appending new bars never rewrites a published one
+    assert len(set(revisions)) == 1
+    assert exported["date"].tolist() == incremental["date"].tolist()
+    assert incremental["date"].dt.hour.nunique() > 1
+    pd.testing.assert_frame_equal(incremental, full)
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from kpi import KpiEngine
+from logger import Logger
+from synthetic import OHLCVGenerator
+
+
+def test_refresh_appends_only_new_rows(raw_history, raw_store):
+    raw_store.upsert(raw_history.iloc[:300])
+    KpiEngine(Logger()).refresh(raw_store)
+    close_path: str = os.path.join(KpiEngine.STATE_FILE_PATH, "CL_F_close.bin")
+    with open(close_path, "rb") as handle:
+        head: bytes = handle.read()
+
+    raw_store.upsert(raw_history.iloc[300:])
+    engine: KpiEngine = KpiEngine(Logger())
+    assert engine.refresh(raw_store) == 100
+
+    with open(close_path, "rb") as handle:
+        assert handle.read(len(head)) == head
+    reloaded: KpiEngine = KpiEngine(Logger())
+    memory: KpiEngine = KpiEngine(Logger(), path=None)
+    # Same batches as the refreshes, so the prefix sums are summed in the same order
+    memory.update(raw_history.iloc[:300])
+    memory.update(raw_history.iloc[300:])
+    for name in ("dates", "close", "prefix_sum", "prefix_sq"):
+        np.testing.assert_array_equal(getattr(reloaded.states["CL=F"], name), getattr(memory.states["CL=F"], name))
+    assert reloaded.kpis("CL=F") == memory.kpis("CL=F")
+
+
+def test_short_window_counts_sessions():
+    bars: pd.DataFrame = OHLCVGenerator(freq="h", seed=5).history("SYM", 24 * 20)
+    engine: KpiEngine = KpiEngine(Logger(), path=None)
+    engine.update(bars)
+
+    days: pd.Series = bars["date"].dt.normalize()
+    window: pd.Series = bars.loc[days >= days.unique()[-KpiEngine.SHORT_WINDOW], "close"]
+    kpis: dict[str, float] = engine.kpis("SYM")
+    assert np.isclose(kpis["media_movil"], window.mean())
+    assert np.isclose(kpis["volatilidad"], window.std())
+
+
+def test_float32_closes_are_folded_as_scraped(raw_history, raw_store):
+    raw_store.upsert(raw_history.assign(close=raw_history["close"].round(2)))
+    engine: KpiEngine = KpiEngine(Logger(), path=None)
+    engine.refresh(raw_store)
+
+    close: np.ndarray = engine.states["CL=F"].close
+    np.testing.assert_array_equal(close, close.round(2))
+
+
+def state_files() -> dict[str, bytes]:
+    files: dict[str, bytes] = {}
+    for name in sorted(os.listdir(KpiEngine.STATE_FILE_PATH)):
+        with open(os.path.join(KpiEngine.STATE_FILE_PATH, name), "rb") as handle:
+            files[name] = handle.read()
+    return files
+
+
+def test_read_only_engine_leaves_the_state_files(raw_history, raw_store):
+    raw_store.upsert(raw_history.iloc[:300])
+    KpiEngine(Logger()).refresh(raw_store)
+    before: dict[str, bytes] = state_files()
+
+    raw_store.upsert(raw_history.iloc[300:])
+    reader: KpiEngine = KpiEngine(Logger(), read_only=True)
+    assert reader.refresh(raw_store) == 100
+
+    assert state_files() == before
+    assert reader.states["CL=F"].last_date == raw_history["date"].iloc[-1]
@@ -0,0 +1,12 @@
+from main import CrudeOilDataPipeline
+
+
+def test_dashboard_runs_alongside_training(workspace, monkeypatch):
+    # The pipeline resolves its data folder from the package; seed the scratch copy instead
+    monkeypatch.setattr(CrudeOilDataPipeline, "DATA_DIR", workspace)
+    monkeypatch.setattr(CrudeOilDataPipeline, "RAW_STORE_DIR", workspace / "raw")
+    monkeypatch.setattr(CrudeOilDataPipeline, "LEGACY_RAW_PATH", workspace / "crude_oil.csv")
+    dag = CrudeOilDataPipeline().dag
+
+    assert dag.upstream("dashboard") == {"enrich"}
+    assert dag.upstream("residuals") == {"enrich", "train"}
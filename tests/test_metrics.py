@@ -0,0 +1,28 @@
+import pandas as pd
+
+from dag import PipelineDAG, Stage
+from logger import Logger
+from metrics import INSTRUMENTATION
+
+
+def test_outer_stage_counts_dag_worker_threads(workspace):
+    def produce() -> dict[str, object]:
+        INSTRUMENTATION.record_read(100)
+        return {"frame": pd.DataFrame({"value": range(5)})}
+
+    def consume(frame: pd.DataFrame) -> None:
+        INSTRUMENTATION.record_written(40)
+
+    dag: PipelineDAG = PipelineDAG(
+        [Stage("produce", produce, outputs={"frame": pd.DataFrame}), Stage("consume", consume, inputs=("frame",))],
+        Logger(),
+        cache_path="dag",
+    )
+    INSTRUMENTATION.configure(report_path=None)
+    with INSTRUMENTATION.stage("pipeline") as probe:
+        assert dag.run() == {"produce": "ran", "consume": "ran"}
+
+    assert (probe.bytes_read, probe.bytes_written) == (100, 40)
+    assert (probe.rows_in, probe.rows_out) == (5, 5)
+    record: dict = INSTRUMENTATION.summary().set_index("stage").loc["pipeline"].to_dict()
+    assert record["rss_delta_bytes"] is not None and record["max_rss_bytes"] > 0
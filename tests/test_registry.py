@@ -0,0 +1,19 @@
+import os
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from logger import Logger
+from registry import ModelRegistry
+
+
+def test_only_newest_versions_are_kept(workspace):
+    registry: ModelRegistry = ModelRegistry(Logger(), keep=3)
+    model: LinearRegression = LinearRegression().fit(np.arange(10.0)[:, None], np.arange(10.0))
+    saved: list[str] = [registry.save("CL_F/h1/linear", model, {"features": ["x"]}) for _ in range(5)]
+    registry.save("grid/CL_F/h1/linear", model, {"features": ["x"]})
+
+    assert [entry["version"] for entry in registry.versions("CL_F/h1/linear")] == saved[-3:]
+    assert sorted(os.listdir(os.path.join(registry.root, "CL_F/h1/linear"))) == saved[-3:]
+    assert registry.latest("CL_F/h1/linear") == saved[-1]
+    assert len(registry.versions("grid/CL_F/h1/linear")) == 1
@@ -0,0 +1,15 @@
+from logger import Logger
+from modeller import Modeller
+from registry import ModelRegistry
+from scheduler import TrainingScheduler
+
+
+def test_grid_never_replaces_served_model(raw_history, raw_store):
+    raw_store.upsert(raw_history)
+    registry: ModelRegistry = ModelRegistry(Logger())
+
+    results = TrainingScheduler(Logger(), horizons=(1,), estimators=["linear"], max_workers=1).run()
+
+    assert results["key"].tolist() == ["grid/CL_F/h1/linear"]
+    assert registry.latest(Modeller.MODEL_KEY) is None
+    assert registry.load("grid/CL_F/h1/linear") is not None